@@ -2,6 +2,7 @@ DEV_DEFAULT_VID = 0x04D8
 DEV_DEFAULT_PID = 0x00DD
 
 PACKET_SIZE = 64
+ZERO_PACKET = bytes(PACKET_SIZE)
 DIR_OUTPUT  = 0
 DIR_INPUT   = 1
 
@@ -88,7 +88,7 @@ class I2C_Slave:
         - Read ``length`` bytes
         - Stop
 
-        See :func:`EasyMCP2221.Device.I2C_read` for more information.
+        See :func:`EasyMCP2221.Device.I2C_write_read` for more information.
 
         Parameters:
             register      (int): Register to read, memory position or command.
@@ -117,17 +117,10 @@ class I2C_Slave:
         if reg_byteorder is None:
             reg_byteorder = self.reg_byteorder
 
-        self.mcp.I2C_write(
+        return self.mcp.I2C_write_read(
             self.addr,
             register.to_bytes(reg_bytes, byteorder = reg_byteorder),
-            kind = 'nonstop')
-
-        data = self.mcp.I2C_read(
-            self.addr,
-            length,
-            kind = 'restart')
-
-        return data
+            length)
 
 
     def read(self, length = 1):
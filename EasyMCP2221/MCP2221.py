@@ -1,10 +1,32 @@
 import hid
+import io
+import os
+import stat
 import time
+import threading
+import functools
+import contextlib
+import weakref
+import concurrent.futures
 
 from .Constants import *
 from . import I2C_Slave
+from . import stats
+from . import tracer
+from . import flashcache
 from .exceptions import NotAckError, TimeoutError, LowSCLError, LowSDAError
 
+
+def _locked(method):
+    """ Run the method holding the device lock. See :func:`Device.transaction`. """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class Device:
     """ Creates a MCP2221(A) device instance.
 
@@ -14,8 +36,9 @@ class Device:
     device informs its serial number to the operating system, both for the CDC and the HID interfaces.
 
     You still can select by Serial Number a device with disabled serial enumeration using ``scan_serial`` parameter.
-    This will open every device and reads the flash one by one looking for the serial.
+    This will open every device at the same time and read the serial number from its flash.
     However, this may interfere with any other MCP2221 working in the system.
+    The serial numbers found are remembered, so other devices can be opened later without scanning again.
 
     If more than one device with the same Serial is found, the first one will be selected.
 
@@ -30,6 +53,26 @@ class Device:
         cmd_retries (int, optional): Times to retry an USB command if it fails.
         debug_messages (bool, optional): Print debugging messages.
         trace_packets (bool, optional): For debug only. Print all binary commands and responses.
+        deferred_write_check (bool, optional): Return from :func:`I2C_write` as soon as the last chunk is accepted,
+            without waiting for the transfer to finish. Errors are raised by the next I2C operation.
+            Default is ``False``. See :func:`I2C_flush`.
+        adaptive_polling (bool, optional): Wait until an I2C chunk is expected to be finished before
+            polling its status, instead of polling continuously. The time is estimated from the bus speed
+            set in :func:`I2C_speed`. It saves USB bandwidth and CPU at low speeds. Default is ``False``.
+        collect_stats (bool, optional): Collect counters and latency of every USB command. See :func:`stats`.
+            Default is ``False``.
+        packet_tracer (PacketTracer, optional): Store all binary commands and responses in this ring buffer.
+            Faster than ``trace_packets``. See :class:`EasyMCP2221.tracer.PacketTracer`.
+        transport (optional): USB HID backend. Default is the ``hid`` module.
+            Use it to record or replay a session, see :mod:`EasyMCP2221.transport`.
+        fast_open (bool, optional): Open the device with fewer USB commands. The USB serial is read
+            from flash when first used, the SRAM reinforcement is delayed until the first ADC or DAC
+            function, and the I2C bus is released before the first transfer instead of now.
+            Default is ``False``.
+        flash_cache (bool or str, optional): Keep flash settings in a file, indexed by the factory serial number
+            and the USB path. :func:`read_flash_info` then reads only the factory serial from the device. ``True``
+            uses the default file in the user cache directory, a string is the file path. Default is ``None`` (no cache).
+            See :mod:`EasyMCP2221.flashcache`.
 
     Raises:
         RuntimeError: if no device found with given VID and PID, devnum index or USB serial.
@@ -43,6 +86,11 @@ class Device:
         and a second one is created elsewhere in the main program to control GPIO, or by another library also using SMBus class.
 
         In this case, the same object will be returned instead of create a second instance of the class.
+        If it is already open and working, it is returned unchanged: its state, settings and any transfer
+        in progress in other threads are kept, and the parameters of the second call are ignored.
+
+        The object is thread safe: each method holds the device while it runs.
+        Use :func:`transaction` to run a sequence of calls without other threads in between.
 
     Example:
         >>> import EasyMCP2221
@@ -71,6 +119,20 @@ class Device:
     Catalog index is the USB path
     """
 
+    enumeration_ttl = 1.0
+    """
+    Seconds to reuse the result of a USB HID enumeration. Enumerating walks the OS device tree,
+    which is slow on busy hosts. Set it to 0 to enumerate every time.
+    See :func:`clear_enumeration_cache`.
+    """
+
+    _enumerations = weakref.WeakKeyDictionary()
+    _enumerations_lock = threading.Lock()
+
+    # Devices found by scan_serial, per transport and (VID, PID): USB serial to path and enumeration entry.
+    # An entry is dropped when the enumeration at its path changes.
+    _scanned_serials = weakref.WeakKeyDictionary()
+
     # Use __new__ instead of __init__ to allow returning an existing object.
     def __new__(cls,
                 VID            = DEV_DEFAULT_VID,
@@ -82,7 +144,14 @@ class Device:
                 read_timeout   = -1,
                 cmd_retries    = 1,
                 debug_messages = 0,
-                trace_packets  = False):
+                trace_packets  = False,
+                deferred_write_check = False,
+                adaptive_polling = False,
+                collect_stats  = False,
+                packet_tracer  = None,
+                transport      = None,
+                fast_open      = False,
+                flash_cache    = None):
 
 
         ## Check if this is one of the already initialized devices.
@@ -95,7 +164,8 @@ class Device:
                         devnum      = devnum,
                         usbserial   = usbserial,
                         scan_serial = False,
-                        debug_messages = debug_messages)
+                        debug_messages = debug_messages,
+                        transport   = transport)
 
         # not interested in errors at this point, only to know if we must
         # create a new object or return an existing one
@@ -105,10 +175,15 @@ class Device:
         if usbpath and usbpath in Device._catalog:
             # Re-use object.
             if debug_messages: print("Cataloged device found:", usbpath)
-            return Device._catalog[usbpath]
+            obj = Device._catalog[usbpath]
+
+        else:
+            # Create a new device, init will catalog it
+            obj = super().__new__(cls)
 
-        # Create a new device, init will catalog it
-        return super().__new__(cls)
+        # Tell __init__ which device to open, so it does not need to look for it again
+        obj._usbpath = usbpath
+        return obj
 
 
     def __init__(self,
@@ -121,82 +196,156 @@ class Device:
                  read_timeout   = -1,
                  cmd_retries    = 1,
                  debug_messages = 0,
-                 trace_packets  = False):
+                 trace_packets  = False,
+                 deferred_write_check = False,
+                 adaptive_polling = False,
+                 collect_stats  = False,
+                 packet_tracer  = None,
+                 transport      = None,
+                 fast_open      = False,
+                 flash_cache    = None):
 
         """
         Some options, like USB power attributes, are read from Flash into SRAM at start-up
         and cannot be changed in SRAM at run time. So we must store them somewhere to save
         them in save_config.
         """
-        self.unsaved_SRAM = {}
+        # Keep the lock of a cataloged device being initialized again
+        self._lock = getattr(self, "_lock", None) or threading.RLock()
+
+        # Other threads may be using a cataloged device: initialize it holding its lock
+        with self._lock:
+            # Path selected by __new__, if any
+            usbpath = self.__dict__.pop("_usbpath", None)
+
+            # Cataloged device already open and working: keep it as it is.
+            # Re-opening it would reset its state and the I2C engine in the middle of other transfers.
+            if (usbpath is not None and Device._catalog.get(usbpath) is self and
+                    "hidhandler" in self.__dict__ and not self.status["usb_error"]):
+                if debug_messages: print("Cataloged device already open:", usbpath)
+                return
 
-        self.status = {
-            "GPIO": {
-                "gp0": None,
-                "gp1": None,
-                "gp2": None,
-                "gp3": None
-            },
-            "dac_ref": None,
-            "dac_value": None,
-            "adc_ref": None,
-            "vdd_voltage": None,
-            # mark i2c bus as dirty, so to call cancel before then next operation
-            "i2c_dirty": None
-        }
+            self.unsaved_SRAM = {}
 
-        # Save init() parameters for the reset() function
-        self.parm_VID            = VID
-        self.parm_PID            = PID
-        self.parm_devnum         = devnum
-        self.parm_usbserial      = usbserial
-        self.parm_scan_serial    = scan_serial
-        self.parm_open_timeout   = open_timeout
-        self.parm_read_timeout   = read_timeout
-        self.parm_cmd_retries    = cmd_retries
-        self.parm_trace_packets  = trace_packets
-        self.parm_debug_messages = debug_messages
-
-        # Save some parameters for ourselves
-        self.debug_messages = debug_messages
-        self.trace_packets  = trace_packets
-        self.cmd_retries    = cmd_retries
-        self.read_timeout   = read_timeout
-
-        # must to find a way to pass this path from __new__ to __init__ to prevent call _select_device twice
-        usbpath = self._select_device(
-                    VID         = VID,
-                    PID         = PID,
-                    devnum      = devnum,
-                    usbserial   = usbserial,
-                    scan_serial = scan_serial,
-                    debug_messages = debug_messages)
-
-        self.hidhandler = hid.device()
-
-        # Try to open the selected device. Re-try multiple times until timeout
-        timeout = time.perf_counter() + open_timeout
-        while True:
-            try:
-                self.hidhandler.open_path(usbpath)
-                break
+            # SRAM_config arguments collected inside configure(), None outside
+            self._sram_pending = None
 
-            # Ignore any exceptions and keep trying until the timeout
-            except:
-                if time.perf_counter() > timeout:
-                    raise
-                else:
-                    continue
+            self.status = {
+                "GPIO": {
+                    "gp0": None,
+                    "gp1": None,
+                    "gp2": None,
+                    "gp3": None
+                },
+                "dac_ref": None,
+                "dac_value": None,
+                "adc_ref": None,
+                "vdd_voltage": None,
+                # mark i2c bus as dirty, so to call cancel before then next operation
+                "i2c_dirty": None,
+                # token of the I2C_read_iter transfer in progress, cleared on cancel
+                "i2c_reader": None,
+                # last known I2C engine state, None if unknown (must be read before next transfer)
+                "i2c_state": None,
+                # timeout of the last I2C write if its completion has not been checked yet
+                "i2c_pending": None,
+                # I2C speed divider set by I2C_speed
+                "i2c_div": None,
+                # when the current I2C chunk is expected to be finished (adaptive polling)
+                "i2c_ready_at": 0,
+                # SRAM reinforcement delayed by fast_open
+                "sram_reinforce": False,
+                # last clock output and interrupt settings written to SRAM, to restore them in reconnect
+                "clk_output": None,
+                "int_conf": None,
+                # the USB handler failed, the device may have been unplugged
+                "usb_error": False
+            }
+
+            # Save init() parameters for the reset() function
+            self.parm_VID            = VID
+            self.parm_PID            = PID
+            self.parm_devnum         = devnum
+            self.parm_usbserial      = usbserial
+            self.parm_scan_serial    = scan_serial
+            self.parm_open_timeout   = open_timeout
+            self.parm_read_timeout   = read_timeout
+            self.parm_cmd_retries    = cmd_retries
+            self.parm_trace_packets  = trace_packets
+            self.parm_debug_messages = debug_messages
+            self.parm_deferred_write_check = deferred_write_check
+            self.parm_adaptive_polling = adaptive_polling
+            self.parm_collect_stats  = collect_stats
+            self.parm_packet_tracer  = packet_tracer
+            self.parm_transport      = transport
+            self.parm_fast_open      = fast_open
+
+            # Save some parameters for ourselves
+            self.debug_messages = debug_messages
+            self.trace_packets  = trace_packets
+            self.cmd_retries    = cmd_retries
+            self.read_timeout   = read_timeout
+            self.deferred_write_check = deferred_write_check
+            self.adaptive_polling = adaptive_polling
+            self._stats = stats.Stats() if collect_stats else None
+            self.packet_tracer  = packet_tracer
+            self.transport      = transport or hid
+            self._init_buffers()
+
+            if isinstance(flash_cache, flashcache.FlashCache):
+                self.flash_cache = flash_cache
+            elif flash_cache:
+                self.flash_cache = flashcache.FlashCache(flash_cache if isinstance(flash_cache, str) else None)
+            else:
+                self.flash_cache = None
+            self._factory_serial = None
+
+            if usbpath is None:
+                usbpath = self._select_device(
+                            VID         = VID,
+                            PID         = PID,
+                            devnum      = devnum,
+                            usbserial   = usbserial,
+                            scan_serial = scan_serial,
+                            debug_messages = debug_messages,
+                            transport   = self.transport)
+
+            self.hidhandler = self.transport.device()
+
+            # Try to open the selected device. Re-try multiple times until timeout
+            timeout = time.perf_counter() + open_timeout
+            while True:
+                try:
+                    self.hidhandler.open_path(usbpath)
+                    break
+
+                # Ignore any exceptions and keep trying until the timeout
+                except:
+                    if time.perf_counter() > timeout:
+                        # The device may have gone since it was enumerated, look for it again next time
+                        Device.clear_enumeration_cache()
+                        raise
+                    else:
+                        continue
+
+            self.usbpath = usbpath
+
+            # get the serial number stored in flash: useful to identify a cataloged device that
+            # has not serial enumeration enabled but has been previously opened
+            self._usbserial = None
+            if not fast_open:
+                self._usbserial = self.usbserial
 
-        # get the serial number stored in flash: useful to identify a cataloged device that
-        # has not serial enumeration enabled but has been previously opened
-        self.usbserial = self.read_flash_info()['USB_SERIAL']
+            # Device opened, catalog it by its path
+            if debug_messages:
+                print("New device cataloged: %s with serial number %s" % (usbpath, self._usbserial))
+            Device._catalog[usbpath] = self
 
-        # Device opened, catalog it by its path
-        if debug_messages:
-            print("New device cataloged: %s with serial number %s" % (usbpath, self.usbserial))
-        Device._catalog[usbpath] = self
+            self._init_state(fast_open)
 
+
+    def _init_state(self, fast_open = False):
+        """ Learn the SRAM settings loaded at power-up and prepare the I2C engine. """
         # Initialize current GPIO settings
         settings = self.send_cmd([CMD_GET_SRAM_SETTINGS])
         self.status["GPIO"]["gp0"] = settings[22]
@@ -210,14 +359,21 @@ class Device:
         self.status["adc_ref"]   = (settings[7] >> 2) & 0b00000111
 
         ## After power-up, Vrm may be set-up but not working, it's like when you apply new GPIO in SRAM
-        self._reinforce_SRAM()
+        if fast_open:
+            self.status["sram_reinforce"] = True
+        else:
+            self._reinforce_SRAM()
 
         # Read I2C status and try to release the bus if needed.
         # (i2c lines might not be up right now)
-        try:
-            self._i2c_release()
-        except:
-            pass
+        if fast_open:
+            # release it before the first transfer
+            self.status["i2c_dirty"] = True
+        else:
+            try:
+                self._i2c_release()
+            except:
+                pass
 
         # Set I2C speed to a safer value. In some device revision, default speed is 500kHz.
         self.I2C_speed(100_000)
@@ -232,7 +388,8 @@ class Device:
                        devnum,
                        usbserial,
                        scan_serial,
-                       debug_messages):
+                       debug_messages,
+                       transport = None):
         """
         Try to get the device path from initialization parameters.
 
@@ -250,7 +407,16 @@ class Device:
         Always return a path or raise an exception.
         """
 
-        devices = hid.enumerate(VID, PID)
+        if transport is None:
+            transport = hid
+
+        devices = Device._enumerate(transport, VID, PID)
+        refreshed = False
+
+        # A device plugged after the cached enumeration is missing, enumerate again.
+        if len(devices) < (devnum + 1 if usbserial is None else 1):
+            devices = Device._enumerate(transport, VID, PID, refresh = True)
+            refreshed = True
 
         if not devices:
             raise RuntimeError("No devices found with VID %04X and PID %04X." % (VID, PID))
@@ -283,29 +449,58 @@ class Device:
                 else:
                     if debug_messages: print("Device found by serial in the catalog, but moved.")
 
+        # Not found in a cached enumeration, it may be new.
+        if not refreshed:
+            devices = Device._enumerate(transport, VID, PID, refresh = True)
+
+            for device in devices:
+                if device["serial_number"] == usbserial:
+                    if debug_messages: print("Device found by serial enumeration.")
+                    return device["path"]
+
         # Last resort. Select by serial, but scanning the flash.
         if scan_serial:
-            self.hidhandler = hid.device()
+            current = {device["path"]: device for device in devices}
 
-            for device in devices:
-                if device["path"] in Device._catalog:
-                    continue
+            # Found by a previous scan (only remembered while enumerations are cached)
+            with Device._enumerations_lock:
+                scanned = {}
+                if Device.enumeration_ttl > 0:
+                    try:
+                        scanned = Device._scanned_serials.setdefault(transport, {}).setdefault((VID, PID), {})
+                    except TypeError:
+                        pass  # transport cannot be weak referenced
 
-                try:
-                    self.hidhandler.open_path(device["path"])
-                    serial = self.read_flash_info()['USB_SERIAL']
-                    if debug_messages: print("Scanned device %s: serial %s" % (device["path"], serial))
-                    self.hidhandler.close()
+                found = scanned.get(usbserial)
+                known = [path for path, device in scanned.values()]
 
-                    if usbserial == serial:
-                        del self.hidhandler
-                        if debug_messages: print("Device found by scanning all devices.")
-                        return device["path"]
+            if found is not None and current.get(found[0]) == found[1]:
+                if debug_messages: print("Device found by serial in a previous scan.")
+                return found[0]
 
-                except:
-                    pass
+            timeout_ms = getattr(self, "read_timeout", -1)
+            if timeout_ms is None or timeout_ms < 0:
+                timeout_ms = 1000
 
-            del self.hidhandler
+            # Open all the unknown devices at the same time
+            candidates = [path for path in current if path not in Device._catalog and path not in known]
+
+            if candidates:
+                with concurrent.futures.ThreadPoolExecutor(max_workers = len(candidates)) as executor:
+                    serials = list(executor.map(
+                        lambda path: Device._probe_serial(transport, path, timeout_ms), candidates))
+
+                with Device._enumerations_lock:
+                    for path, serial in zip(candidates, serials):
+                        if debug_messages: print("Scanned device %s: serial %s" % (path, serial))
+                        if serial is not None:
+                            scanned[serial] = (path, current[path])
+
+                    found = scanned.get(usbserial)
+
+            if found is not None and current.get(found[0]) == found[1]:
+                if debug_messages: print("Device found by scanning all devices.")
+                return found[0]
 
             raise RuntimeError("No device found with serial number %s or cannot open it." % usbserial)
 
@@ -314,6 +509,91 @@ class Device:
 
 
 
+    @staticmethod
+    def _enumerate(transport, VID, PID, refresh = False):
+        """ Same as ``transport.enumerate(VID, PID)``, reusing results younger than :attr:`enumeration_ttl`.
+
+        With ``refresh``, always enumerate and update the cache.
+        """
+        if Device.enumeration_ttl <= 0:
+            return transport.enumerate(VID, PID)
+
+        now = time.perf_counter()
+
+        with Device._enumerations_lock:
+            try:
+                cache = Device._enumerations.setdefault(transport, {})
+            except TypeError:
+                # transport cannot be weak referenced, do not cache it
+                return transport.enumerate(VID, PID)
+
+            entry = cache.get((VID, PID))
+            if entry and not refresh and now - entry[0] < Device.enumeration_ttl:
+                return entry[1]
+
+        devices = transport.enumerate(VID, PID)
+
+        with Device._enumerations_lock:
+            cache[(VID, PID)] = (now, devices)
+
+            # Forget scanned serial numbers of devices that left or changed
+            scanned = Device._scanned_serials.get(transport, {}).get((VID, PID))
+            if scanned:
+                current = {device["path"]: device for device in devices}
+                for serial, (path, device) in list(scanned.items()):
+                    if current.get(path) != device:
+                        del scanned[serial]
+
+        return devices
+
+
+    @staticmethod
+    def _probe_serial(transport, path, timeout_ms):
+        """ Open a device, read the USB serial number from its flash and close it.
+
+        Used by ``scan_serial``. Return ``None`` if the device cannot be opened or read.
+        """
+        handle = transport.device()
+
+        try:
+            handle.open_path(path)
+            try:
+                return Device._read_serial(handle, timeout_ms)
+            finally:
+                handle.close()
+        except Exception:
+            return None
+
+
+    @staticmethod
+    def _read_serial(handle, timeout_ms):
+        """ Read the USB serial number from flash with an open HID handle. Return ``None`` if it fails. """
+        handle.write(bytes([0, CMD_READ_FLASH_DATA, FLASH_DATA_USB_SERIALNUM]) + bytes(PACKET_SIZE - 2))
+        r = handle.read(PACKET_SIZE, timeout_ms)
+
+        if (len(r) < 4 or
+            r[RESPONSE_ECHO_BYTE]   != CMD_READ_FLASH_DATA or
+            r[RESPONSE_STATUS_BYTE] != RESPONSE_RESULT_OK):
+            return None
+
+        return Device._parse_wchar_structure(r)
+
+
+    @staticmethod
+    def clear_enumeration_cache():
+        """ Forget cached USB enumerations, so the next device selection enumerates again.
+
+        Call it after plugging or unplugging a device, if you want to open it within
+        :attr:`enumeration_ttl` seconds. It also forgets the serial numbers found by ``scan_serial``.
+
+        Example:
+            >>> EasyMCP2221.Device.clear_enumeration_cache()
+        """
+        with Device._enumerations_lock:
+            Device._enumerations.clear()
+            Device._scanned_serials.clear()
+
+
     def __repr__(self):
         import json
         data = self.read_flash_info(human=True)
@@ -327,6 +607,26 @@ class Device:
             del self.hidhandler
 
 
+    @property
+    def usbserial(self):
+        """ USB serial number stored in flash.
+
+        Read once, when the device is opened or, with ``fast_open``, the first time it is used.
+        """
+        if self._usbserial is None:
+            with self._lock:
+                self._usbserial = self._parse_wchar_structure(
+                    self._read_flash_raw(FLASH_DATA_USB_SERIALNUM))
+
+        return self._usbserial
+
+
+    @usbserial.setter
+    def usbserial(self, value):
+        self._usbserial = value
+
+
+    @_locked
     def send_cmd(self, buf):
         """ Write a raw USB command to device and get the response.
 
@@ -337,9 +637,18 @@ class Device:
 
         Parameters:
             buf (list of bytes): Full data to write, including command (64 bytes max).
+                Or the device's own buffer, see :func:`_cmd_buffer`.
 
         Returns:
             list of bytes: Full response data (64 bytes).
+            When ``buf`` is the device's own buffer, the response is a ``memoryview`` of a reused buffer,
+            only valid until the next command.
+
+        Note:
+            Commands built in the device's own buffer are sent without new objects only if the
+            HID backend reads into a buffer (``readinto``, e.g. :mod:`EasyMCP2221.hidraw` or the emulator).
+            The default hidapi backend still creates a response list on every read, which is copied
+            into the reused buffer.
 
         Example:
             >>> from EasyMCP2221.Constants import *
@@ -358,39 +667,139 @@ class Device:
         if self.trace_packets:
             print("CMD:", " ".join("%02x" % i for i in buf))
 
-        REPORT_NUM = 0x00
-        padding = [0x00] * (PACKET_SIZE - len(buf))
+        # Any other command may change the I2C engine state or disturb the bus
+        # (e.g. a GPIO wired to SDA). Forget it until the next status read.
+        if buf[0] not in (CMD_GET_GPIO_VALUES, CMD_GET_SRAM_SETTINGS, CMD_READ_FLASH_DATA):
+            self.status["i2c_state"] = None
+
+        if self._stats is None:
+            return self._send_cmd(buf)
+
+        start = time.perf_counter()
+
+        try:
+            r = self._send_cmd(buf)
+        except:
+            self._stats.failure(buf[0])
+            raise
+
+        self._stats.record(buf[0], int((time.perf_counter() - start) * 1_000_000), r)
+
+        return r
+
+
+    def _init_buffers(self):
+        """ Allocate the reusable USB packet buffers.
+
+        This is a private method, the **API could change** without previous notice.
+        """
+        # Report number (always 0x00) followed by the command
+        self._out = bytearray(PACKET_SIZE + 1)
+        self._cmd = memoryview(self._out)[1:]
+
+        # Response, for handlers that can read into a buffer (e.g. hidraw)
+        self._in  = bytearray(PACKET_SIZE)
+        self._res = memoryview(self._in)
+
+
+    def _cmd_buffer(self, cmd):
+        """ Clear the reusable command buffer and set the command code.
+
+        Fill the rest of the command in place and pass it to :func:`send_cmd`.
+        It saves building new lists for every command in tight loops.
+        Its response is only valid until the next command.
+
+        This is a private method, the **API could change** without previous notice.
+
+        Parameters:
+            cmd (int): command code.
+
+        Return:
+            memoryview: 64 bytes command buffer.
+
+        Example:
+            >>> buf = mcp._cmd_buffer(CMD_GET_GPIO_VALUES)
+            >>> mcp.send_cmd(buf)[2]
+            1
+        """
+        buf = self._cmd
+        buf[:] = ZERO_PACKET
+        buf[0] = cmd
+        return buf
+
+
+    def _send_cmd(self, buf):
+        """ Write a raw USB command and read the response, retry on failure. See :func:`send_cmd`.
+
+        This is a private method, the **API could change** without previous notice.
+        """
+        fast = buf is self._cmd
+
+        # Copy other commands into the packet buffer, padded with zeros
+        if not fast:
+            length = len(buf)
+            if length > PACKET_SIZE:
+                raise ValueError("Command longer than %d bytes." % PACKET_SIZE)
+
+            self._out[1:length+1] = bytes(buf)
+            self._cmd[length:] = ZERO_PACKET[length:]
+
+        readinto = getattr(self.hidhandler, "readinto", None) if fast else None
 
         for retry in range(0, self.cmd_retries + 1):
 
-            if self.debug_messages and retry > 0:
-                print("Command re-try", retry)
+            if retry > 0:
+                if self.debug_messages:
+                    print("Command re-try", retry)
+
+                if self._stats is not None:
+                    self._stats.retry(buf[0])
+
+            if self.packet_tracer is not None:
+                t_cmd = tracer.now_ns()
 
             # Write command
             try:
-                self.hidhandler.write([REPORT_NUM] + buf + padding)
+                self.hidhandler.write(self._out)
             except OSError:
                 if retry < self.cmd_retries:
                     continue
                 else:
+                    self.status["usb_error"] = True
                     raise
 
             # This command does not return anything
             if buf[0] == CMD_RESET_CHIP:
+                if self.packet_tracer is not None:
+                    self.packet_tracer.record(t_cmd, buf, tracer.now_ns(), None)
                 return None
 
             # Read response
             try:
                 # timeout removed due to Issue #7 and added again in #23.
-                r = self.hidhandler.read(PACKET_SIZE, self.read_timeout)
+                if readinto is not None:
+                    r = self._res if readinto(self._in, self.read_timeout) else []
+                else:
+                    r = self.hidhandler.read(PACKET_SIZE, self.read_timeout)
+
+                    # Same reused buffer as with readinto
+                    if fast and len(r) == PACKET_SIZE:
+                        self._in[:] = r
+                        r = self._res
+
                 if len(r) == 0:
                     raise TimeoutError("HID read timeout.")
-            except (OSError, TimeoutError):
+            except (OSError, TimeoutError) as e:
                 if retry < self.cmd_retries:
                     continue
                 else:
+                    if isinstance(e, OSError):
+                        self.status["usb_error"] = True
                     raise
 
+            if self.packet_tracer is not None:
+                self.packet_tracer.record(t_cmd, buf, tracer.now_ns(), r)
+
             if self.trace_packets:
                 print("RES:", " ".join("%02x" % i for i in r))
 
@@ -419,6 +828,89 @@ class Device:
         raise RuntimeError("Command failed.")
 
 
+    @contextlib.contextmanager
+    def transaction(self):
+        """ Hold the device for a sequence of commands.
+
+        All methods of :class:`EasyMCP2221.Device` lock the device while they run, so
+        it can be shared between threads (e.g. polling GPIO in one thread and using I2C in another).
+        But between two calls, other threads may send their own commands.
+
+        Use this context to run several calls without interruption. The lock is reentrant:
+        the same thread may call any method or nest transactions.
+
+        Example:
+            Write a register address and read it back with restart, no other thread in between:
+
+            >>> with mcp.transaction():
+            ...     mcp.I2C_write(0x50, b"\x00\x10", "nonstop")
+            ...     data = mcp.I2C_read(0x50, 4, "restart")
+            >>>
+
+            Change pin functions and outputs at once:
+
+            >>> with mcp.transaction():
+            ...     mcp.set_pin_function(gp0 = "GPIO_OUT", gp1 = "GPIO_OUT")
+            ...     mcp.GPIO_write(gp0 = 1, gp1 = 0)
+            >>>
+        """
+        with self._lock:
+            yield self
+
+
+    def stats(self):
+        """ Get USB command statistics.
+
+        Only available if the device was created with ``collect_stats = True``.
+        Statistics are cleared on :func:`reset`.
+
+        For each command code, it returns:
+
+            count
+                Commands sent.
+            retries
+                Commands sent again after a USB error or an error response. See :attr:`cmd_retries`.
+            failures
+                Commands that raised an exception (USB error, HID read timeout).
+            rejected
+                Responses with error status. Usually the I2C engine was busy.
+            bytes_out, bytes_in
+                I2C data bytes accepted by write commands and received in ``CMD_I2C_READ_DATA_GET_I2C_DATA``
+                responses. Always 0 for other commands.
+            latency_us
+                Round-trip time in microseconds: ``min``, ``mean``, ``p50``, ``p90``, ``p99`` and ``max``.
+
+        Return:
+            dict: statistics by command name.
+
+        Raises:
+            RuntimeError: if statistics are not enabled.
+
+        Example:
+            >>> mcp = EasyMCP2221.Device(collect_stats = True)
+            >>> mcp.I2C_read(0x50, 100)
+            >>> mcp.stats()["CMD_I2C_READ_DATA_GET_I2C_DATA"]
+            {'count': 4, 'retries': 0, 'failures': 0, 'rejected': 1, 'bytes_out': 0, 'bytes_in': 100,
+            'latency_us': {'min': 880, 'mean': 950, 'p50': 928, 'p90': 992, 'p99': 992, 'max': 1004}}
+        """
+        if self._stats is None:
+            raise RuntimeError("Statistics are not enabled. Use collect_stats parameter.")
+
+        return self._stats.snapshot()
+
+
+    def stats_reset(self):
+        """ Clear USB command statistics. See :func:`stats`.
+
+        Raises:
+            RuntimeError: if statistics are not enabled.
+        """
+        if self._stats is None:
+            raise RuntimeError("Statistics are not enabled. Use collect_stats parameter.")
+
+        self._stats.reset()
+
+
     def _update_gp_setting_out(self, gp, out):
         """Update the GP setting (like in SRAM setting) with output values from Set GPIO Output Values command."""
         if out == True:
@@ -430,6 +922,7 @@ class Device:
     #######################################################################
     # Flash
     #######################################################################
+    @_locked
     def save_config(self):
         """
         Write current status (pin assignments, GPIO output values,
@@ -528,7 +1021,12 @@ class Device:
         if setting == FLASH_DATA_CHIP_SETTINGS and (data[0] & 0b11) != 0:
             raise AssertionError("Chip protection prevented!")
 
-        rbuf = self.send_cmd([CMD_WRITE_FLASH_DATA, setting] + data)
+        if self.flash_cache is not None:
+            if self._factory_serial is None:
+                self._factory_serial = self._parse_factory_serial(self._read_flash_raw(FLASH_DATA_CHIP_SERIALNUM))
+            self.flash_cache.invalidate(self._flash_cache_key())
+
+        rbuf = self.send_cmd([CMD_WRITE_FLASH_DATA, setting] + list(data))
 
         if rbuf[RESPONSE_STATUS_BYTE] != RESPONSE_RESULT_OK:
             raise RuntimeError("Write flash data command failed.")
@@ -536,6 +1034,7 @@ class Device:
         return rbuf[0:64]
 
 
+    @_locked
     def read_flash_info(self, raw=False, human=False):
         """ Read flash data.
 
@@ -596,17 +1095,38 @@ class Device:
         Hint:
             When called with `human = true` parameter, this is the function used to
             stringfy the object.
+
+        Hint:
+            With ``flash_cache``, only the factory serial number is read from the device.
+            The other settings are read once and then taken from the cache.
         """
+        sections = {
+            "CHIP_SETTINGS"   : FLASH_DATA_CHIP_SETTINGS,
+            "GP_SETTINGS"     : FLASH_DATA_GP_SETTINGS,
+            "USB_VENDOR"      : FLASH_DATA_USB_MANUFACTURER,
+            "USB_PRODUCT"     : FLASH_DATA_USB_PRODUCT,
+            "USB_SERIAL"      : FLASH_DATA_USB_SERIALNUM,
+        }
 
+        if self.flash_cache is None:
+            data = {name: self.send_cmd([CMD_READ_FLASH_DATA, sub]) for name, sub in sections.items()}
+            data["USB_FACT_SERIAL"] = self.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_CHIP_SERIALNUM])
 
-        data = {
-            "CHIP_SETTINGS"   : self.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_CHIP_SETTINGS]),
-            "GP_SETTINGS"     : self.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_GP_SETTINGS]),
-            "USB_VENDOR"      : self.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_USB_MANUFACTURER]),
-            "USB_PRODUCT"     : self.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_USB_PRODUCT]),
-            "USB_SERIAL"      : self.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_USB_SERIALNUM]),
-            "USB_FACT_SERIAL" : self.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_CHIP_SERIALNUM]),
-        }
+        else:
+            fact_serial = self.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_CHIP_SERIALNUM])
+            self._factory_serial = self._parse_factory_serial(fact_serial)
+
+            key  = self._flash_cache_key()
+            data = self.flash_cache.get(key)
+
+            if (data is None or any(name not in data for name in sections) or
+                    not self._flash_cache_matches(data)):
+                data = {name: self.send_cmd([CMD_READ_FLASH_DATA, sub]) for name, sub in sections.items()}
+
+                if all(r[RESPONSE_STATUS_BYTE] == RESPONSE_RESULT_OK for r in data.values()):
+                    self.flash_cache.put(key, data)
+
+            data["USB_FACT_SERIAL"] = fact_serial
 
         if raw:
             return data
@@ -624,7 +1144,42 @@ class Device:
         return self._humanify(data)
 
 
-    def _parse_wchar_structure(self, buf):
+    def _flash_cache_key(self):
+        """ Flash cache entry of this chip: factory serial number and USB path.
+
+        Many chips share the same factory serial number, it does not identify a chip on its own.
+        """
+        path = self.usbpath
+        if isinstance(path, bytes):
+            path = path.decode("utf-8", "backslashreplace")
+
+        return "%s %s" % (self._factory_serial, path)
+
+
+    def _flash_cache_matches(self, data):
+        """ Check cached USB strings against the ones reported in the USB enumeration.
+
+        Detect another chip with the same factory serial number plugged in the same port.
+        """
+        try:
+            devices = Device._enumerate(self.transport, self.parm_VID, self.parm_PID)
+        except OSError:
+            return True
+
+        for device in devices:
+            if device["path"] != self.usbpath:
+                continue
+
+            for field, section in (("serial_number", "USB_SERIAL"), ("product_string", "USB_PRODUCT")):
+                value = device.get(field)
+                if value and value != self._parse_wchar_structure(data[section]):
+                    return False
+
+        return True
+
+
+    @staticmethod
+    def _parse_wchar_structure(buf):
         cmd_echo  = buf[RESPONSE_ECHO_BYTE]
         cmd_error = buf[RESPONSE_STATUS_BYTE]
         strlen    = buf[2] - 2
@@ -818,6 +1373,7 @@ class Device:
     #######################################################################
     # SRAM
     #######################################################################
+    @_locked
     def SRAM_config(self,
         clk_output = None,
         dac_ref    = None,
@@ -903,6 +1459,18 @@ class Device:
         else:
             self.status["dac_value"] = dac_value
 
+        # Remember them for reconnect()
+        if clk_output is not None: self.status["clk_output"] = clk_output
+        if int_conf   is not None: self.status["int_conf"]   = int_conf
+
+        # Inside configure(), the new settings are sent all together at the end
+        if self._sram_pending is not None:
+            if new_gpconf:             self._sram_pending["gpconf"]     = True
+            if clk_output is not None: self._sram_pending["clk_output"] = clk_output
+            if int_conf   is not None: self._sram_pending["int_conf"]   = int_conf
+            self._sram_pending.setdefault("gpconf", False)
+            return
+
         # Must turn off VRM when applying new GPIO configuration
         # otherwise it fails if ADC_ref = VDD and DAC_ref = VRM
         # dac value seems also to be lost
@@ -917,8 +1485,7 @@ class Device:
         if dac_ref    is not None: dac_ref    |= ALTER_DAC_REF
         if adc_ref    is not None: adc_ref    |= ALTER_ADC_REF
 
-        cmd = [0] * 12
-        cmd[0]  = CMD_SET_SRAM_SETTINGS
+        cmd = self._cmd_buffer(CMD_SET_SRAM_SETTINGS)
         cmd[1]  = 0   # don't care
         cmd[2]  = clk_output or PRESERVE_CLK_OUTPUT # Clock Output Divider value
         cmd[3]  = dac_ref                           # DAC Voltage Reference
@@ -956,8 +1523,138 @@ class Device:
             raise RuntimeError("SRAM write error.")
 
 
+    @contextlib.contextmanager
+    def configure(self):
+        """ Merge several configuration calls into the minimum number of SRAM commands.
+
+        Each call to :func:`set_pin_function`, :func:`ADC_config`, :func:`DAC_config`,
+        :func:`clock_config` or :func:`IOC_config` sends one to three SRAM commands, and some of them
+        turn Vrm off and on again (a 2ms gap in DAC output). Inside this context, they only validate
+        their parameters and record the new settings. All of them are sent when the context exits:
+        one command, plus one more if the DAC reference changes or a GPIO change has to reclaim Vrm.
+
+        :func:`DAC_write` is deferred too. The device is locked while the context is active.
+        Other functions (e.g. :func:`GPIO_write` or :func:`IOC_clear`) run immediately. If an exception is raised, nothing is sent and the previous settings are kept.
+
+        Raises:
+            RuntimeError: if command failed.
+
+        Example:
+            >>> with mcp.configure():
+            ...     mcp.set_pin_function(gp0 = "GPIO_OUT", gp1 = "CLK_OUT", gp2 = "DAC", gp3 = "ADC")
+            ...     mcp.clock_config(50, "375kHz")
+            ...     mcp.DAC_config(ref = "2.048V", out = 16)
+            ...     mcp.ADC_config(ref = "4.096V")
+            ...     mcp.IOC_config(edge = "none")
+            >>>
+
+        See also:
+            :func:`apply_config`.
+        """
+        with self._lock:
+            # Nested: join the outer one
+            if self._sram_pending is not None:
+                yield self
+                return
+
+            saved = {key: self.status[key] for key in
+                ("dac_ref", "dac_value", "adc_ref", "vdd_voltage", "clk_output", "int_conf", "sram_reinforce")}
+            saved_gpio = dict(self.status["GPIO"])
+
+            self._sram_pending = {}
+            try:
+                yield self
+            except BaseException:
+                self.status.update(saved)
+                self.status["GPIO"].update(saved_gpio)
+                raise
+            else:
+                self._flush_SRAM(saved["dac_ref"])
+            finally:
+                self._sram_pending = None
+
+
+    def _flush_SRAM(self, dac_ref_before):
+        """ Send the settings collected by :func:`configure`. """
+        pending, self._sram_pending = self._sram_pending, None
+
+        if not pending:
+            return
+
+        gpconf = pending["gpconf"]
+        reclaim_vrm = gpconf and ( (self.status["dac_ref"] & DAC_REF_VRM) or (self.status["adc_ref"] & ADC_REF_VRM) )
+
+        # Turn off DAC before switching to a new reference (see DAC_config).
+        # Not needed if the GPIO change already turns Vrm off before reclaiming it.
+        if self.status["dac_ref"] != dac_ref_before and not reclaim_vrm:
+            cmd = [0] * 12
+            cmd[0]  = CMD_SET_SRAM_SETTINGS
+            cmd[3]  = DAC_REF_VRM | DAC_VRM_OFF | ALTER_DAC_REF
+            cmd[4]  = 0 | ALTER_DAC_VALUE
+            r = self.send_cmd(cmd)
+            if r[RESPONSE_STATUS_BYTE] != RESPONSE_RESULT_OK:
+                raise RuntimeError("SRAM write error.")
+
+        gpio = self.status["GPIO"] if gpconf else {}
+
+        self.SRAM_config(
+            clk_output = pending.get("clk_output"),
+            int_conf   = pending.get("int_conf"),
+            gp0        = gpio.get("gp0"),
+            gp1        = gpio.get("gp1"),
+            gp2        = gpio.get("gp2"),
+            gp3        = gpio.get("gp3"))
+
+
+    def apply_config(self, config):
+        """ Apply several settings at once, with the minimum number of SRAM commands.
+
+        Same as calling the configuration functions inside :func:`configure`.
+        ``config`` keys select the function and values are its keyword arguments:
+
+            - **pins**: :func:`set_pin_function`
+            - **clock**: :func:`clock_config`
+            - **adc**: :func:`ADC_config`
+            - **dac**: :func:`DAC_config`
+            - **ioc**: :func:`IOC_config`
+
+        Parameters:
+            config (dict): settings to apply.
+
+        Raises:
+            ValueError: if a key or any setting is not valid. Nothing is sent in that case.
+            RuntimeError: if command failed.
+
+        Example:
+            >>> mcp.apply_config({
+            ...     "pins":  {"gp0": "GPIO_OUT", "out0": True, "gp2": "DAC", "gp3": "ADC"},
+            ...     "dac":   {"ref": "2.048V", "out": 16},
+            ...     "adc":   {"ref": "VDD", "vdd": 3.3},
+            ...     "ioc":   {"edge": "none"},
+            ... })
+            >>>
+        """
+        functions = {
+            "pins"  : self.set_pin_function,
+            "clock" : self.clock_config,
+            "adc"   : self.ADC_config,
+            "dac"   : self.DAC_config,
+            "ioc"   : self.IOC_config,
+            }
+
+        for key in config:
+            if key not in functions:
+                raise ValueError("Invalid config key '%s'. Could be: %s" % (key, ", ".join(functions)))
+
+        with self.configure():
+            for key, function in functions.items():
+                if key in config:
+                    function(**config[key])
+
+
     def _reinforce_SRAM(self):
         """ The only purpose of this function is to solve some weird bugs on MCP2221. """
+        self.status["sram_reinforce"] = False
         self.SRAM_config(
             dac_ref    = self.status["dac_ref"],
             dac_value  = self.status["dac_value"],
@@ -972,6 +1669,7 @@ class Device:
     #######################################################################
     # GPIO
     #######################################################################
+    @_locked
     def GPIO_write(self, gp0 = None, gp1 = None, gp2 = None, gp3 = None):
         """ Set pin output values.
 
@@ -1008,16 +1706,15 @@ class Device:
         PRESERVE_VALUE = 0
         GPIO_ERROR = 0xEE
 
-        buf = [0] * 18
-        buf[0]  = CMD_SET_GPIO_OUTPUT_VALUES
+        buf = self._cmd_buffer(CMD_SET_GPIO_OUTPUT_VALUES)
         buf[2]  = PRESERVE_VALUE if gp0 is None else ALTER_VALUE
-        buf[3]  = gp0 or 0
+        buf[3]  = 1 if gp0 else 0
         buf[6]  = PRESERVE_VALUE if gp1 is None else ALTER_VALUE
-        buf[7]  = gp1 or 0
+        buf[7]  = 1 if gp1 else 0
         buf[10] = PRESERVE_VALUE if gp2 is None else ALTER_VALUE
-        buf[11] = gp2 or 0
+        buf[11] = 1 if gp2 else 0
         buf[14] = PRESERVE_VALUE if gp3 is None else ALTER_VALUE
-        buf[15] = gp3 or 0
+        buf[15] = 1 if gp3 else 0
 
         r = self.send_cmd(buf)
 
@@ -1036,6 +1733,7 @@ class Device:
             raise RuntimeError("Pin GP3 is not assigned to GPIO function.")
 
 
+    @_locked
     def GPIO_read(self):
         """ Read all GPIO pins logic state.
 
@@ -1049,7 +1747,7 @@ class Device:
             >>> mcp.GPIO_read()
             (None, 0, 1, None)
         """
-        r = self.send_cmd([CMD_GET_GPIO_VALUES])
+        r = self.send_cmd(self._cmd_buffer(CMD_GET_GPIO_VALUES))
         gp0 = r[2] if r[2] != 0xEE else None
         gp1 = r[4] if r[4] != 0xEE else None
         gp2 = r[6] if r[6] != 0xEE else None
@@ -1058,6 +1756,7 @@ class Device:
         return (gp0, gp1, gp2, gp3)
 
 
+    @_locked
     def GPIO_poll(self, id=None):
         """ List GPIO changes in list format.
 
@@ -1199,6 +1898,7 @@ class Device:
         return events
 
 
+    @_locked
     def set_pin_function(
         self,
         gp0 = None, gp1 = None, gp2 = None, gp3 = None,
@@ -1349,6 +2049,7 @@ class Device:
     #######################################################################
     # CLOCK
     #######################################################################
+    @_locked
     def clock_config(self, duty, freq):
         """ Configure clock output frequency and Duty Cycle.
 
@@ -1427,6 +2128,7 @@ class Device:
     #######################################################################
     # ADC
     #######################################################################
+    @_locked
     def ADC_config(self, ref = "VDD", vdd = None):
         """ Configure ADC reference voltage source.
 
@@ -1490,6 +2192,7 @@ class Device:
                 raise ValueError("Supply voltage must be positive.")
 
 
+    @_locked
     def ADC_read(self, norm = False, volts = False):
         """ Read all Analog to Digital Converter (ADC) channels.
 
@@ -1547,8 +2250,10 @@ class Device:
         if norm and volts:
             raise ValueError("Parameters 'norm' and 'volt' cannot be used at the same time.")
 
+        if self.status["sram_reinforce"]:
+            self._reinforce_SRAM()
 
-        buf = self.send_cmd([CMD_POLL_STATUS_SET_PARAMETERS])
+        buf = self.send_cmd(self._cmd_buffer(CMD_POLL_STATUS_SET_PARAMETERS))
         adc1 = buf[I2C_POLL_RESP_ADC_CH0_LSB] + 256*buf[I2C_POLL_RESP_ADC_CH0_MSB]
         adc2 = buf[I2C_POLL_RESP_ADC_CH1_LSB] + 256*buf[I2C_POLL_RESP_ADC_CH1_MSB]
         adc3 = buf[I2C_POLL_RESP_ADC_CH2_LSB] + 256*buf[I2C_POLL_RESP_ADC_CH2_MSB]
@@ -1578,6 +2283,7 @@ class Device:
     #######################################################################
     # DAC
     #######################################################################
+    @_locked
     def DAC_config(self, ref = "VDD", out = None, vdd = None):
         """ Configure Digital to Analog Converter (DAC) reference.
 
@@ -1641,6 +2347,9 @@ class Device:
         if out is not None and out not in range(0, 32):
             raise ValueError("Accepted values for out are from 0 to 31.")
 
+        if self.status["sram_reinforce"]:
+            self._reinforce_SRAM()
+
         # Turn off DAC before switching to a new reference in order to prevent a crash.
         if self.status["dac_ref"] != (ref | vrm):
             self.SRAM_config(
@@ -1658,6 +2367,7 @@ class Device:
                 raise ValueError("Supply voltage must be positive.")
 
 
+    @_locked
     def DAC_write(self, out, norm=False, volts=False):
         """ Set the DAC output value.
 
@@ -1787,7 +2497,13 @@ class Device:
             dac = out
             v = dac
 
-        self.SRAM_config(dac_value = dac)
+        if self.status["sram_reinforce"]:
+            # same command, with the new value
+            self.status["dac_value"] = dac
+            self._reinforce_SRAM()
+        else:
+            self.SRAM_config(dac_value = dac)
+
         return v
 
 
@@ -1795,6 +2511,7 @@ class Device:
     # Interrupt On Change
     #######################################################################
 
+    @_locked
     def IOC_read(self):
         """ Read Interruption On Change flag.
 
@@ -1808,11 +2525,12 @@ class Device:
             1
 
         """
-        rbuf = self.send_cmd([CMD_POLL_STATUS_SET_PARAMETERS])
+        rbuf = self.send_cmd(self._cmd_buffer(CMD_POLL_STATUS_SET_PARAMETERS))
         intflag = rbuf[I2C_POLL_RESP_INT_FLAG]
         return intflag
 
 
+    @_locked
     def IOC_clear(self):
         """ Clear Interruption On Change flag.
 
@@ -1823,12 +2541,22 @@ class Device:
             >>> mcp.IOC_read()
             0
             >>>
-        """
-        self.SRAM_config(int_conf = INT_FLAG_CLEAR)
-
 
-    def IOC_config(self, edge = "both"):
-        """ Configure Interruption On Change edge.
+        Note:
+            The flag is cleared immediately, also inside :func:`configure`.
+            Only the flag is changed, other SRAM settings are not sent.
+        """
+        cmd = [0] * 12
+        cmd[0]  = CMD_SET_SRAM_SETTINGS
+        cmd[6]  = INT_FLAG_CLEAR | ALTER_INT_CONF
+        r = self.send_cmd(cmd)
+        if r[RESPONSE_STATUS_BYTE] != RESPONSE_RESULT_OK:
+            raise RuntimeError("SRAM write error.")
+
+
+    @_locked
+    def IOC_config(self, edge = "both"):
+        """ Configure Interruption On Change edge.
 
         Valid values for ``edge``:
             - **none**: disable interrupt detection
@@ -1869,6 +2597,7 @@ class Device:
     #######################################################################
     # I2C
     #######################################################################
+    @_locked
     def I2C_speed(self, speed=100000):
         """ Set I2C bus speed.
 
@@ -1893,6 +2622,9 @@ class Device:
         if bus_speed < 0 or bus_speed > 255:
             raise ValueError("Speed must be between 47kHz and 400kHz.")
 
+        # Speed cannot change while a deferred write is running.
+        self.I2C_flush()
+
         buf = [0] * 5
         buf[0] = CMD_POLL_STATUS_SET_PARAMETERS
         buf[1] = 0
@@ -1912,8 +2644,11 @@ class Device:
             self.status["i2c_dirty"] = True
             raise RuntimeError("I2C speed is not valid or bus is busy.")
 
+        self.status["i2c_div"] = bus_speed
 
 
+
+    @_locked
     def I2C_write(self, addr, data, kind = "regular", timeout_ms = 20):
         """ Write data to an address on I2C bus.
 
@@ -1961,10 +2696,20 @@ class Device:
             the minimum supported rate (47 kHz).
 
             MCP2221's internal I2C engine has additional timeout controls.
+
+            With ``deferred_write_check`` enabled, this function does not wait for the last chunk
+            to be sent. Any error in this write is raised by the next I2C operation or by
+            :func:`I2C_flush`. If it is raised by another :func:`I2C_write`, that new data was not sent.
         """
         if addr < 0 or addr > 127:
             raise ValueError("Slave address not valid.")
 
+        # Chunks will be sliced from a view, without copying data
+        try:
+            data = memoryview(data).cast('B')
+        except TypeError:
+            data = bytes(data)
+
         # If data length is 0, MCP2221 will do nothing at all
         if len(data) < 1:
             raise ValueError("Minimum data length is 1 byte.")
@@ -1980,18 +2725,200 @@ class Device:
         else:
             raise ValueError("Invalid kind of transfer. Allowed: 'regular', 'restart', 'nonstop'.")
 
+        self._i2c_write(cmd, addr, data, timeout_ms)
+
+
+    @_locked
+    def I2C_write_stream(self, addr, source, total_len, kind = "regular", timeout_ms = 20):
+        """ Write data from a file or an iterator to an address on I2C bus.
+
+        Same as :func:`I2C_write`, but data is read from ``source`` only when it is about to be sent.
+        Large amounts of data can be written using constant memory.
+
+        ``source`` can be:
+
+            - a bytes-like object (e.g. ``bytes``, ``bytearray`` or ``memoryview``).
+            - a binary file or any object with a ``read`` method (e.g. ``io.BytesIO``).
+            - an iterable of bytes-like objects of any length (e.g. a generator).
+
+        Only ``total_len`` bytes are taken from the source.
+
+        For bytes-like objects, regular files and ``io.BytesIO``, the available length is checked before
+        sending anything. Other sources (iterators, pipes) are only known to be short when they end:
+        the transfer is cancelled then, but the chunks already sent **remain written** on the slave
+        (e.g. a partially written EEPROM page).
+
+        Parameters:
+            addr (int): I2C slave device **base** address.
+            source (file or iterable): where to get data from.
+            total_len (int): bytes to write. Maximum is 65535 bytes, minimum is 1.
+            kind (str, optional): kind of transfer (see :func:`I2C_write`).
+            timeout_ms (int, optional): maximum time to write data chunk in milliseconds (default 20 ms).
+
+        Raises:
+            ValueError: if any parameter is not valid or ``source`` ends before ``total_len`` bytes.
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the writing timeout is exceeded.
+            LowSDAError: if I2C engine detects the **SCL** line does not go up (read exception description).
+            LowSCLError: if I2C engine detects the **SDA** line does not go up (read exception description).
+            RuntimeError: if some other error occurs.
+
+        Example:
+            >>> with open("page.bin", "rb") as f:
+            ...     mcp.I2C_write_stream(0x50, f, 64)
+            >>>
+        """
+        if addr < 0 or addr > 127:
+            raise ValueError("Slave address not valid.")
+
+        if total_len < 1:
+            raise ValueError("Minimum data length is 1 byte.")
+        elif total_len > 2**16-1:
+            raise ValueError("Data too long (max. 65535).")
+
+        if kind == "regular":
+            cmd = CMD_I2C_WRITE_DATA
+        elif kind == "restart":
+            cmd = CMD_I2C_WRITE_DATA_REPEATED_START
+        elif kind == "nonstop":
+            cmd = CMD_I2C_WRITE_DATA_NO_STOP
+        else:
+            raise ValueError("Invalid kind of transfer. Allowed: 'regular', 'restart', 'nonstop'.")
+
+        available = self._stream_available(source)
+        if available is not None and available < total_len:
+            raise ValueError("Not enough data in source (%d bytes missing)." % (total_len - available))
+
+        self._i2c_write(cmd, addr, self._stream_chunks(source, total_len), timeout_ms, length = total_len)
+
+
+    @staticmethod
+    def _stream_available(source):
+        """ Bytes left in a sized source, ``None`` if it cannot be known without reading it. """
+        try:
+            return memoryview(source).nbytes
+        except TypeError:
+            pass
+
+        if isinstance(source, io.BytesIO):
+            with source.getbuffer() as view:
+                return view.nbytes - source.tell()
+
+        try:
+            st = os.fstat(source.fileno())
+            if stat.S_ISREG(st.st_mode):
+                return st.st_size - source.tell()
+        except (AttributeError, OSError, ValueError):
+            pass
+
+        return None
+
+
+    def _stream_chunks(self, source, total_len):
+        """ Take ``total_len`` bytes from a buffer, file or iterable, yield them in I2C chunks.
+
+        This is a private method, the **API could change** without previous notice.
+
+        Raises:
+            ValueError: if ``source`` ends before ``total_len`` bytes. The transfer is cancelled
+                if some chunk was already sent.
+        """
+        # Slices of a buffer, without copies
+        try:
+            view = memoryview(source).cast("B")
+        except TypeError:
+            pass
+        else:
+            for i in range(0, total_len, I2C_CHUNK_SIZE):
+                yield view[i:min(i + I2C_CHUNK_SIZE, total_len)]
+            return
+
+        # Read a file until EOF
+        if hasattr(source, "read"):
+            f = source
+            source = iter(lambda: f.read(I2C_CHUNK_SIZE), b'')
+
+        pending = bytearray()
+        remaining = total_len
+
+        for piece in source:
+            pending += piece
+
+            while len(pending) >= I2C_CHUNK_SIZE and remaining > 0:
+                chunk = bytes(pending[:min(I2C_CHUNK_SIZE, remaining)])
+                del pending[:I2C_CHUNK_SIZE]
+                remaining -= len(chunk)
+                yield chunk
+
+            if remaining <= len(pending):
+                break
+
+        if remaining > len(pending):
+            # Stop the write in progress
+            if remaining < total_len:
+                self._i2c_release()
+            raise ValueError("Not enough data in source (%d bytes missing)." % (remaining - len(pending)))
+
+        if remaining > 0:
+            yield bytes(pending[:remaining])
+
+
+    def _i2c_write(self, cmd, addr, data, timeout_ms, length = None):
+        """ Prepare the bus, send I2C write command and wait for it to finish.
+
+        This is a private method, the **API could change** without previous notice.
+
+        ``data`` is a bytes-like object, or an iterable of chunks of ``length`` bytes in total.
+
+        Raises:
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the timeout is exceeded.
+            RuntimeError: if some other error occurs.
+        """
         # Try to clean last I2C error condition
         # Also test for bus confusion due to external SDA activity
-        if self.status["i2c_dirty"] or self._i2c_status()["confused"]:
+        # (only if the engine state is not known from the last transfer)
+        # The result of a deferred write comes in the response to the first chunk.
+        if self.status["i2c_pending"] is None and (self.status["i2c_dirty"] or self._i2c_confused()):
             self._i2c_release()
 
-        header = [0] * 4
-        header[0] = cmd
-        header[1] = len(data)      & 0xFF
-        header[2] = len(data) >> 8 & 0xFF
-        header[3] = addr << 1      & 0xFF
+        try:
+            self._i2c_send_write(cmd, addr, data, timeout_ms, length)
+        except:
+            # If raised by the first chunk, the error was in the deferred write
+            self.status["i2c_pending"] = None
+            raise
+
+        # Do not wait, the next I2C operation will check the result.
+        if self.deferred_write_check:
+            self.status["i2c_pending"] = timeout_ms
+            return
+
+        self._i2c_wait_write(timeout_ms)
 
-        chunks = [data[i:i+I2C_CHUNK_SIZE] for i in range(0, len(data), I2C_CHUNK_SIZE)]
+
+    def _i2c_send_write(self, cmd, addr, data, timeout_ms, length = None):
+        """ Send I2C write command and data in 60 bytes chunks.
+
+        This is a private method, the **API could change** without previous notice.
+
+        ``data`` is a bytes-like object, or an iterable of chunks of ``length`` bytes in total.
+
+        It does not wait for the last chunk to be sent. See :func:`_i2c_wait_write`.
+
+        Raises:
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the timeout is exceeded.
+            RuntimeError: if some other error occurs.
+        """
+        if length is None:
+            length = len(data)
+            chunks = (data[i:i+I2C_CHUNK_SIZE] for i in range(0, length, I2C_CHUNK_SIZE))
+        else:
+            chunks = data
+
+        # first chunk also sends the address byte
+        first = True
 
         # send data in 60 bytes chunks, repeating the header above
         for chunk in chunks:
@@ -2006,39 +2933,58 @@ class Device:
 
 
                 # Send more data when buffer is empty.
-                rbuf = self.send_cmd(header + list(chunk))
+                buf = self._cmd_buffer(cmd)
+                buf[1] = length      & 0xFF
+                buf[2] = length >> 8 & 0xFF
+                buf[3] = addr << 1   & 0xFF
+                buf[4:4+len(chunk)] = chunk
+
+                rbuf = self.send_cmd(buf)
 
                 # data sent, ok, try to send next chunk
+                # (previous write, if any, has finished successfully)
                 if rbuf[RESPONSE_STATUS_BYTE] == RESPONSE_RESULT_OK:
+                    self.status["i2c_pending"] = None
+                    self._i2c_expect(len(chunk) + first)
+                    first = False
+
+                    if self._stats is not None:
+                        self._stats.i2c_sent(cmd, len(chunk))
                     break
 
                 # data not sent, why?
                 else:
+                    state = rbuf[I2C_INTERNAL_STATUS_BYTE]
+
                     # MCP2221 state machine is busy, try again until timeout
-                    if rbuf[I2C_INTERNAL_STATUS_BYTE] in (
+                    # (stop states: still finishing a deferred write)
+                    if state in (
                         I2C_ST_WRADDRL,
                         I2C_ST_WRADDRL_WAITSEND,
                         I2C_ST_WRADDRL_ACK,
                         I2C_ST_WRADDRL_NACK_STOP_PEND,
                         I2C_ST_WRITEDATA,
                         I2C_ST_WRITEDATA_WAITSEND,
-                        I2C_ST_WRITEDATA_ACK):
+                        I2C_ST_WRITEDATA_ACK,
+                        I2C_ST_STOP,
+                        I2C_ST_STOP_WAIT):
+                        self._i2c_wait_ready()
                         continue
 
                     # internal timeout condition
-                    elif rbuf[I2C_INTERNAL_STATUS_BYTE] in (
+                    elif state in (
                         I2C_ST_WRITEDATA_TOUT,
                         I2C_ST_STOP_TOUT):
                         self._i2c_release()
                         raise RuntimeError("Internal I2C engine timeout.")
 
                     # device did not ack last transfer
-                    elif rbuf[I2C_INTERNAL_STATUS_BYTE] == I2C_ST_WRADDRL_NACK_STOP:
+                    elif state == I2C_ST_WRADDRL_NACK_STOP:
                         self._i2c_release()
                         raise NotAckError("Device did not ACK.")
 
                     # after non-stop
-                    elif rbuf[I2C_INTERNAL_STATUS_BYTE] == I2C_ST_WRITEDATA_END_NOSTOP:
+                    elif state == I2C_ST_WRITEDATA_END_NOSTOP:
                         self._i2c_release()
                         raise RuntimeError("You must use 'restart' mode to write after a 'nonstop' write.")
 
@@ -2046,8 +2992,19 @@ class Device:
                     else:
                         self._i2c_release()
                         raise RuntimeError("I2C write error. Internal status %02x. Try again." %
-                            (rbuf[I2C_INTERNAL_STATUS_BYTE]))
+                            (state))
+
+
+    def _i2c_wait_write(self, timeout_ms):
+        """ Wait until the last I2C write finishes.
 
+        This is a private method, the **API could change** without previous notice.
+
+        Raises:
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the timeout is exceeded.
+            RuntimeError: if some other error occurs.
+        """
         # check final status using CMD_POLL_STATUS_SET_PARAMETERS instead another write
         watchdog = time.perf_counter() + timeout_ms/1000
 
@@ -2057,6 +3014,8 @@ class Device:
                 self._i2c_release()
                 raise TimeoutError("Timeout.")
 
+            self._i2c_wait_ready()
+
             i2c_status = self._i2c_status()
 
             if i2c_status["st"] in (I2C_ST_IDLE, I2C_ST_WRITEDATA_END_NOSTOP):
@@ -2102,6 +3061,36 @@ class Device:
 
 
 
+    @_locked
+    def I2C_flush(self):
+        """ Wait for the last I2C write to finish and check its result.
+
+        Only useful when ``deferred_write_check`` is enabled (see :class:`EasyMCP2221.Device`).
+        In that mode, :func:`I2C_write` returns as soon as MCP2221 accepts the data and its
+        errors are raised later, by the next :func:`I2C_write`, :func:`I2C_read` or :func:`I2C_speed`.
+        Call this function to get them now, for example after the last write of a sequence.
+
+        Raises:
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the writing timeout is exceeded.
+            RuntimeError: if some other error occurs.
+
+        Example:
+            >>> mcp = EasyMCP2221.Device(deferred_write_check = True)
+            >>> mcp.I2C_write(0x60, b'This is data')
+            >>> mcp.I2C_flush()
+            Traceback (most recent call last):
+            ...
+            EasyMCP2221.exceptions.NotAckError: Device did not ACK.
+        """
+        timeout_ms = self.status["i2c_pending"]
+
+        if timeout_ms is not None:
+            self.status["i2c_pending"] = None
+            self._i2c_wait_write(timeout_ms)
+
+
+    @_locked
     def I2C_read(self, addr, size = 1, kind = "regular", timeout_ms = 20):
         """ Read data from I2C bus.
 
@@ -2188,6 +3177,180 @@ class Device:
             If a timeout or other error occurs in the middle of character reading, the I2C may get locked.
             See :any:`LowSDAError`.
         """
+        if size < 1:
+            raise ValueError("Minimum read size is 1 byte.")
+        elif size > 2**16-1:
+            raise ValueError("Data too long (max. 65535).")
+
+        data = bytearray(size)
+        self.I2C_readinto(addr, data, kind, timeout_ms)
+
+        return bytes(data)
+
+
+
+    @_locked
+    def I2C_readinto(self, addr, buffer, kind = "regular", timeout_ms = 20):
+        """ Read data from I2C bus into a buffer.
+
+        Same as :func:`I2C_read`, but data is placed directly into a pre-allocated buffer
+        instead of a new bytes object. It reads as many bytes as the buffer length.
+
+        The buffer can be any writable object supporting the buffer protocol:
+        ``bytearray``, ``memoryview``, ``array`` or a contiguous NumPy array.
+        Reuse the same buffer to read large amounts of data without new allocations.
+
+        Parameters:
+            addr (int): I2C slave device **base** address.
+            buffer (bytearray): where to put the data. Length must be between 1 and 65535 bytes.
+            kind (str, optional): kind of transfer, ``regular`` or ``restart`` (see :func:`I2C_read`).
+            timeout_ms (int, optional): time to wait for the data in milliseconds (default 20 ms).
+                Note this time applies for each 60 bytes chunk.
+
+        Return:
+            int: number of bytes read
+
+        Raises:
+            ValueError: if any parameter is not valid.
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the writing timeout is exceeded.
+            LowSDAError: if I2C engine detects the **SCL** line does not go up (read exception description).
+            LowSCLError: if I2C engine detects the **SDA** line does not go up (read exception description).
+            RuntimeError: if some other error occurs.
+
+        Example:
+            >>> buf = bytearray(12)
+            >>> mcp.I2C_readinto(0x50, buf)
+            12
+            >>> buf
+            bytearray(b'This is data')
+
+            Read 1000 bytes in blocks of 100:
+
+            .. code-block:: python
+
+                buf = bytearray(100)
+                view = memoryview(buf)
+
+                mcp.I2C_write(0x50, b'\x00\x00')
+
+                for i in range(10):
+                    mcp.I2C_readinto(0x50, view)
+                    out.write(view)
+        """
+        buffer = memoryview(buffer).cast('B')
+
+        self._i2c_start_read(addr, len(buffer), kind, timeout_ms)
+
+        return self._i2c_read_into(buffer, timeout_ms)
+
+
+
+    def I2C_read_iter(self, addr, size, kind = "regular", timeout_ms = 20):
+        """ Read data from I2C bus chunk by chunk.
+
+        Same as :func:`I2C_read`, but returns an iterator. Each chunk (up to 60 bytes) is
+        returned as soon as MCP2221 has it, while the next one is being read from the bus.
+        Use it to process or save large amounts of data without keeping them in memory.
+
+        The device is only locked while each chunk is collected, so the iterator can be passed to
+        another thread. Any other I2C operation started before the end, from any thread, cancels the
+        transfer: the next chunk will raise ``RuntimeError``. Other commands (GPIO, ADC...) do not
+        interfere with it. If you stop before the end, close the iterator (or delete it) to cancel the
+        transfer.
+
+        Parameters:
+            addr (int): I2C slave device **base** address.
+            size (int): how many bytes to read. Maximum is 65535 bytes. Minimum is 1 byte.
+            kind (str, optional): kind of transfer, ``regular`` or ``restart`` (see :func:`I2C_read`).
+            timeout_ms (int, optional): time to wait for each chunk in milliseconds (default 20 ms).
+
+        Return:
+            Iterator of bytes.
+
+        Raises:
+            ValueError: if any parameter is not valid.
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the writing timeout is exceeded.
+            LowSDAError: if I2C engine detects the **SCL** line does not go up (read exception description).
+            LowSCLError: if I2C engine detects the **SDA** line does not go up (read exception description).
+            RuntimeError: if some other error occurs, or the transfer was cancelled by another I2C
+                operation while iterating.
+
+        Example:
+            Save 64kB of EEPROM to a file:
+
+            .. code-block:: python
+
+                mcp.I2C_write(0x50, b'\x00\x00', 'nonstop')
+
+                with open("eeprom.bin", "wb") as f:
+                    for chunk in mcp.I2C_read_iter(0x50, 65535, 'restart'):
+                        f.write(chunk)
+        """
+        with self._lock:
+            self._i2c_start_read(addr, size, kind, timeout_ms)
+
+            # Until the last chunk is collected, next I2C operation must cancel the transfer.
+            token = object()
+            self.status["i2c_dirty"] = True
+            self.status["i2c_reader"] = token
+
+        return self._i2c_read_iter(token, size, timeout_ms)
+
+
+    def _i2c_read_iter(self, token, size, timeout_ms):
+        """ Generator for :func:`I2C_read_iter`. Take the device lock for each chunk.
+
+        This is a private method, the **API could change** without previous notice.
+
+        ``token`` identifies the transfer in ``status["i2c_reader"]``. :func:`_i2c_release` clears it,
+        so a transfer cancelled by another operation is detected before sending anything.
+        """
+        chunks = self._i2c_read_chunks(size, timeout_ms)
+
+        try:
+            while True:
+                with self._lock:
+                    if self.status["i2c_reader"] is not token:
+                        raise RuntimeError("I2C read cancelled by another I2C operation.")
+
+                    chunk = bytes(next(chunks))
+
+                    # Last chunk, engine back to idle
+                    last = not self.status["i2c_dirty"]
+                    if last:
+                        self.status["i2c_reader"] = None
+
+                yield chunk
+
+                if last:
+                    return
+
+        finally:
+            # Closed before the end: cancel now if nobody is using the device.
+            # Otherwise, the transfer is still marked dirty and the next I2C operation cancels it.
+            if self.status["i2c_reader"] is token and self._lock.acquire(blocking = False):
+                try:
+                    if self.status["i2c_reader"] is token:
+                        self._i2c_release()
+                except Exception:
+                    pass
+                finally:
+                    self._lock.release()
+
+
+    def _i2c_start_read(self, addr, size, kind, timeout_ms):
+        """ Check parameters, prepare the bus and send I2C read command.
+
+        This is a private method, the **API could change** without previous notice.
+
+        Raises:
+            ValueError: if any parameter is not valid.
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the timeout is exceeded.
+            RuntimeError: if some other error occurs.
+        """
         if addr < 0 or addr > 127:
             raise ValueError("Slave address not valid.")
 
@@ -2207,39 +3370,352 @@ class Device:
         #if not self.I2C_is_idle():
         #    raise RuntimeError("I2C read error, engine is not in idle state.")
 
+        # A deferred write must finish before reading.
+        self.I2C_flush()
+
         # Try to clean last I2C error condition
-        if self.status["i2c_dirty"] or self._i2c_status()["confused"]:
+        if self.status["i2c_dirty"] or self._i2c_confused():
             self._i2c_release()
 
-        buf = [0] * 4
-        buf[0] = cmd
-        buf[1] = size      & 0xFF
-        buf[2] = size >> 8 & 0xFF
-        buf[3] = (addr << 1 & 0xFF) + 1  # address for read operation
+        self._i2c_send_read(cmd, addr, size, timeout_ms)
 
-        # Send read command to i2c bus.
-        # This command return OK always unless bus were busy.
-        # Also triggers data reading and place it into a buffer (until 60 bytes).
-        rbuf = self.send_cmd(buf)
 
-        if rbuf[RESPONSE_STATUS_BYTE] != RESPONSE_RESULT_OK:
+
+    @_locked
+    def I2C_write_read(self, addr, wdata, rsize, timeout_ms = 20):
+        """ Write data then read from an I2C slave without releasing the bus.
+
+        It will send **start**, *wdata*, **repeated start**, *read rsize bytes*, **stop**.
+
+        This is the same as a *nonstop* :func:`I2C_write` followed by a *restart* :func:`I2C_read`,
+        but faster. The read command is sent as soon as MCP2221 accepts the last chunk of data,
+        without waiting for the write to finish. Reading a register takes 3 USB commands instead of 4.
+
+        Parameters:
+            addr (int): I2C slave device **base** address.
+            wdata (bytes): bytes to write (register, memory position or command).
+                Maximum length is 65535 bytes, minimum is 1.
+            rsize (int): how many bytes to read. Maximum is 65535 bytes. Minimum is 1 byte.
+            timeout_ms (int, optional): maximum time to write or read each chunk in milliseconds (default 20 ms).
+
+        Return:
+            bytes: data read
+
+        Raises:
+            ValueError: if any parameter is not valid.
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the timeout is exceeded.
+            LowSDAError: if I2C engine detects the **SCL** line does not go up (read exception description).
+            LowSCLError: if I2C engine detects the **SDA** line does not go up (read exception description).
+            RuntimeError: if some other error occurs.
+
+        Example:
+            Read 12 bytes from EEPROM position 0:
+
+            >>> mcp.I2C_write_read(0x50, b'\x00\x00', 12)
+            b'This is data'
+        """
+        if addr < 0 or addr > 127:
+            raise ValueError("Slave address not valid.")
+
+        # Same data types as I2C_write
+        try:
+            wdata = memoryview(wdata).cast('B')
+        except TypeError:
+            wdata = bytes(wdata)
+
+        if len(wdata) < 1:
+            raise ValueError("Minimum data length is 1 byte.")
+        elif len(wdata) > 2**16-1:
+            raise ValueError("Data too long (max. 65535).")
+
+        if rsize < 1:
+            raise ValueError("Minimum read size is 1 byte.")
+        elif rsize > 2**16-1:
+            raise ValueError("Data too long (max. 65535).")
+
+        # Try to clean last I2C error condition
+        # The result of a deferred write comes in the response to the first chunk.
+        if self.status["i2c_pending"] is None and (self.status["i2c_dirty"] or self._i2c_confused()):
+            self._i2c_release()
+
+        try:
+            self._i2c_send_write(CMD_I2C_WRITE_DATA_NO_STOP, addr, wdata, timeout_ms)
+        except:
+            self.status["i2c_pending"] = None
+            raise
+
+        # The write is still in progress, read command will be retried until it ends.
+        self._i2c_send_read(CMD_I2C_READ_DATA_REPEATED_START, addr, rsize, timeout_ms, after_write = True)
+
+        data = bytearray(rsize)
+        self._i2c_read_into(memoryview(data), timeout_ms)
+
+        return bytes(data)
+
+
+    @_locked
+    def I2C_transaction(self, segments, timeout_ms = 20):
+        """ Run a sequence of I2C reads and writes back-to-back.
+
+        Each segment is a tuple:
+
+            ``("write", addr, data)`` or ``("write", addr, data, kind)``
+                Write *data* to slave *addr*. Valid kinds are the same as in :func:`I2C_write`.
+                Default is ``regular``.
+            ``("read", addr, size)`` or ``("read", addr, size, kind)``
+                Read *size* bytes from slave *addr*. Valid kinds are the same as in :func:`I2C_read`.
+                Default is ``regular``.
+
+        Commands are sent without waiting for each write to finish. The result of a write is taken
+        from the response to the next command, so I2C status is only read at the end
+        or after an error.
+
+        An error does not stop the transaction. The bus is released and the exception is reported
+        for the segment that caused it. Following ``restart`` segments depend on the failed one,
+        they are not run and get the same error.
+
+        Parameters:
+            segments (list): segments to run (see description).
+            timeout_ms (int, optional): maximum time to write or read each chunk in milliseconds (default 20 ms).
+
+        Return:
+            Tuple of two lists ``(results, errors)`` with one item per segment.
+            *results* contains the bytes read in read segments and ``None`` otherwise.
+            *errors* contains ``None`` for successful segments or the exception raised.
+
+        Raises:
+            ValueError: if any segment is not valid. Nothing is sent in that case.
+
+        Example:
+            Configure an ADS1115, read its conversion register, then probe an empty address:
+
+            >>> results, errors = mcp.I2C_transaction([
+            ...     ("write", 0x48, b'\x01\xC3\x83'),
+            ...     ("write", 0x48, b'\x00', "nonstop"),
+            ...     ("read",  0x48, 2, "restart"),
+            ...     ("read",  0x51, 1)])
+            >>> results
+            [None, None, b'\x7f\xf0', None]
+            >>> errors
+            [None, None, None, NotAckError('Device did not ACK read command.')]
+        """
+        write_cmds = {
+            "regular" : CMD_I2C_WRITE_DATA,
+            "restart" : CMD_I2C_WRITE_DATA_REPEATED_START,
+            "nonstop" : CMD_I2C_WRITE_DATA_NO_STOP}
+
+        read_cmds = {
+            "regular" : CMD_I2C_READ_DATA,
+            "restart" : CMD_I2C_READ_DATA_REPEATED_START}
+
+        # Validate all segments before sending anything
+        plan = []
+
+        for segment in segments:
+            if len(segment) not in (3, 4):
+                raise ValueError("Invalid segment %s." % (segment,))
+
+            op, addr, arg, kind = (*segment, "regular")[:4]
+
+            if addr < 0 or addr > 127:
+                raise ValueError("Slave address not valid.")
+
+            if op == "write":
+                # Same data types as I2C_write
+                try:
+                    arg = memoryview(arg).cast('B')
+                except TypeError:
+                    arg = bytes(arg)
+
+                if len(arg) < 1:
+                    raise ValueError("Minimum data length is 1 byte.")
+                elif len(arg) > 2**16-1:
+                    raise ValueError("Data too long (max. 65535).")
+
+                if kind not in write_cmds:
+                    raise ValueError("Invalid kind of transfer. Allowed: 'regular', 'restart', 'nonstop'.")
+
+                plan.append((op, write_cmds[kind], addr, arg, kind))
+
+            elif op == "read":
+                if arg < 1:
+                    raise ValueError("Minimum read size is 1 byte.")
+                elif arg > 2**16-1:
+                    raise ValueError("Data too long (max. 65535).")
+
+                if kind not in read_cmds:
+                    raise ValueError("Invalid kind of transfer. Allowed: 'regular' or 'restart'.")
+
+                plan.append((op, read_cmds[kind], addr, arg, kind))
+
+            else:
+                raise ValueError("Invalid segment type. Allowed: 'write' or 'read'.")
+
+        for prev, seg in zip(plan, plan[1:]):
+            if prev[4] == "nonstop" and seg[4] != "restart":
+                raise ValueError("You must use 'restart' after a 'nonstop' write.")
+
+        results = [None] * len(plan)
+        errors  = [None] * len(plan)
+
+        # A deferred write must finish before.
+        self.I2C_flush()
+
+        # Try to clean last I2C error condition
+        if self.status["i2c_dirty"] or self._i2c_confused():
+            self._i2c_release()
+
+        i = 0
+        while i < len(plan):
+            op, cmd, addr, arg, kind = plan[i]
+
+            # Depends on a failed segment
+            if kind == "restart" and i > 0 and errors[i-1] is not None:
+                errors[i] = errors[i-1]
+                i += 1
+                continue
+
+            try:
+                if op == "write":
+                    self._i2c_send_write(cmd, addr, arg, timeout_ms)
+                    # Checked by the response to the next command
+                    self.status["i2c_pending"] = timeout_ms
+                else:
+                    self._i2c_send_read(cmd, addr, arg, timeout_ms)
+                    data = bytearray(arg)
+                    self._i2c_read_into(memoryview(data), timeout_ms)
+                    results[i] = bytes(data)
+
+            except (NotAckError, TimeoutError, LowSCLError, LowSDAError, RuntimeError) as e:
+                # The error belongs to the previous write, this segment was not sent
+                if self.status["i2c_pending"] is not None:
+                    self.status["i2c_pending"] = None
+                    errors[i-1] = e
+                    continue
+
+                errors[i] = e
+
+            i += 1
+
+        # Check the last write
+        if self.status["i2c_pending"] is not None:
+            self.status["i2c_pending"] = None
+
+            try:
+                self._i2c_wait_write(timeout_ms)
+            except (NotAckError, TimeoutError, LowSCLError, LowSDAError, RuntimeError) as e:
+                errors[-1] = e
+
+        return results, errors
+
+
+    def _i2c_send_read(self, cmd, addr, size, timeout_ms, after_write = False):
+        """ Send I2C read command.
+
+        This is a private method, the **API could change** without previous notice.
+
+        If a previous write is still in progress, try again until it ends.
+        With ``after_write``, the read command is sent right after a write that has not been checked:
+        a NACK found before the read command is accepted belongs to that write.
+
+        Raises:
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the timeout is exceeded.
+            RuntimeError: if some other error occurs.
+        """
+        watchdog = time.perf_counter() + timeout_ms/1000
+
+        while True:
+            # Protect against infinite loop due to noise in I2C bus
+            if time.perf_counter() > watchdog:
+                self._i2c_release()
+                raise TimeoutError("Timeout.")
+
+            # Send read command to i2c bus.
+            # This command return OK always unless bus were busy.
+            # Also triggers data reading and place it into a buffer (until 60 bytes).
+            buf = self._cmd_buffer(cmd)
+            buf[1] = size      & 0xFF
+            buf[2] = size >> 8 & 0xFF
+            buf[3] = (addr << 1 & 0xFF) + 1  # address for read operation
+
+            rbuf = self.send_cmd(buf)
+
+            if rbuf[RESPONSE_STATUS_BYTE] == RESPONSE_RESULT_OK:
+                self.status["i2c_pending"] = None
+                self._i2c_expect(min(size, I2C_CHUNK_SIZE) + 1)
+                return
+
+            state = rbuf[I2C_INTERNAL_STATUS_BYTE]
+
+            # previous write not finished yet
+            if state in (
+                I2C_ST_WRADDRL,
+                I2C_ST_WRADDRL_WAITSEND,
+                I2C_ST_WRADDRL_ACK,
+                I2C_ST_WRADDRL_NACK_STOP_PEND,
+                I2C_ST_WRITEDATA,
+                I2C_ST_WRITEDATA_WAITSEND,
+                I2C_ST_WRITEDATA_ACK,
+                I2C_ST_STOP,
+                I2C_ST_STOP_WAIT):
+                self._i2c_wait_ready()
+                continue
 
             self._i2c_release()
 
-            if rbuf[I2C_INTERNAL_STATUS_BYTE] == I2C_ST_WRADDRL_NACK_STOP:
+            # the write has failed, the read command was not accepted
+            if state == I2C_ST_WRADDRL_NACK_STOP and after_write:
+                raise NotAckError("Device did not ACK.")
+
+            elif state == I2C_ST_WRADDRL_NACK_STOP:
                 raise NotAckError("Device did not ACK read command.")
 
             # after non-stop
-            elif rbuf[I2C_INTERNAL_STATUS_BYTE] == I2C_ST_WRITEDATA_END_NOSTOP:
+            elif state == I2C_ST_WRITEDATA_END_NOSTOP:
                 raise RuntimeError("You must use 'restart' mode to read after a 'nonstop' write.")
 
             else:
                 raise RuntimeError("I2C command read error. Internal status %02x. Try again." %
-                    (rbuf[I2C_INTERNAL_STATUS_BYTE]))
+                    (state))
+
 
+    def _i2c_read_into(self, buffer, timeout_ms):
+        """ Collect data after an I2C read command into a byte memoryview.
+
+        This is a private method, the **API could change** without previous notice.
 
-        data = []
+        Return:
+            int: number of bytes read
 
+        Raises:
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the timeout is exceeded.
+            RuntimeError: if some other error occurs.
+        """
+        pos = 0
+
+        for chunk in self._i2c_read_chunks(len(buffer), timeout_ms):
+            buffer[pos:pos+len(chunk)] = chunk
+            pos += len(chunk)
+
+        return pos
+
+
+    def _i2c_read_chunks(self, size, timeout_ms):
+        """ Collect data after an I2C read command, yield each chunk.
+
+        This is a private method, the **API could change** without previous notice.
+
+        The caller must hold the device lock until the last chunk.
+        Chunks are views of the reused response buffer: copy them before the next command.
+
+        Raises:
+            NotAckError: if the I2C slave didn't acknowledge.
+            TimeoutError: if the timeout is exceeded.
+            RuntimeError: if some other error occurs.
+        """
         watchdog = time.perf_counter() + timeout_ms/1000
 
         while True:
@@ -2248,14 +3724,18 @@ class Device:
                 self._i2c_release()
                 raise TimeoutError("Timeout.")
 
-            # Try to read  MCP's buffer content
-            rbuf = self.send_cmd([CMD_I2C_READ_DATA_GET_I2C_DATA])
+            self._i2c_wait_ready()
+
+            # Try to read  MCP's buffer content.
+            rbuf = self.send_cmd(self._cmd_buffer(CMD_I2C_READ_DATA_GET_I2C_DATA))
+            state = rbuf[I2C_INTERNAL_STATUS_BYTE]
+            chunk = rbuf[4:4+rbuf[3]]
 
             if self.debug_messages:
-                print("Internal status: %02x" % (rbuf[I2C_INTERNAL_STATUS_BYTE]))
+                print("Internal status: %02x" % (state))
 
             # still reading...
-            if rbuf[I2C_INTERNAL_STATUS_BYTE] in (
+            if state in (
                 I2C_ST_WRADDRL,
                 I2C_ST_WRADDRL_WAITSEND,
                 I2C_ST_WRADDRL_ACK,
@@ -2266,26 +3746,29 @@ class Device:
                 continue
 
             # buffer ready, more to come
-            elif rbuf[I2C_INTERNAL_STATUS_BYTE] == I2C_ST_READDATA_WAIT:
-                chunk_size = rbuf[3]
-                data += rbuf[4:4+chunk_size]
+            elif state == I2C_ST_READDATA_WAIT:
+                size -= len(chunk)
+                self._i2c_expect(min(size, I2C_CHUNK_SIZE))
+                yield chunk
                 # reset watchdog
                 watchdog = time.perf_counter() + timeout_ms/1000
                 continue
 
             # buffer ready, no more data expected
-            elif rbuf[I2C_INTERNAL_STATUS_BYTE] == I2C_ST_READDATA_WAITGET:
-                chunk_size = rbuf[3]
-                data += rbuf[4:4+chunk_size]
-                return bytes(data)
+            elif state == I2C_ST_READDATA_WAITGET:
+                # last chunk collected, engine goes back to idle
+                self.status["i2c_state"] = I2C_ST_IDLE
+                self.status["i2c_dirty"] = False
+                yield chunk
+                return
 
-            elif rbuf[I2C_INTERNAL_STATUS_BYTE] in (I2C_ST_WRADDRL_NACK_STOP, I2C_ST_WRADDRL_TOUT):
+            elif state in (I2C_ST_WRADDRL_NACK_STOP, I2C_ST_WRADDRL_TOUT):
                 self._i2c_release()
                 raise NotAckError("Device did not ACK read command.")
 
             else:
                 self._i2c_release()
-                raise RuntimeError("I2C read error. Internal status %02x." % (rbuf[I2C_INTERNAL_STATUS_BYTE]))
+                raise RuntimeError("I2C read error. Internal status %02x." % (state))
 
 
 
@@ -2321,6 +3804,34 @@ class Device:
 
 
 
+    def _i2c_expect(self, nbytes):
+        """ Estimate when the I2C engine will finish sending or receiving ``nbytes``.
+
+        This is a private method, the **API could change** without previous notice.
+
+        Only used with ``adaptive_polling``. See :func:`_i2c_wait_ready`.
+        """
+        if self.adaptive_polling and self.status["i2c_div"] is not None:
+            # 9 clock cycles per byte (8 bits + ack), clock period is (div + 2) / 12MHz
+            self.status["i2c_ready_at"] = (time.perf_counter() +
+                nbytes * 9 * (self.status["i2c_div"] + 2) / 12_000_000)
+
+
+    def _i2c_wait_ready(self):
+        """ Sleep until the I2C engine is expected to be ready, instead of polling.
+
+        This is a private method, the **API could change** without previous notice.
+
+        Only used with ``adaptive_polling``. See :func:`_i2c_expect`.
+        """
+        if self.adaptive_polling:
+            delay = self.status["i2c_ready_at"] - time.perf_counter()
+
+            if delay > 0:
+                time.sleep(delay)
+
+
+    @_locked
     def _i2c_release(self):
         """ Try to make the I2C bus ready for the next operation.
 
@@ -2338,6 +3849,9 @@ class Device:
         Note:
             Calling *Cancel* command on an uninitialized I2C engine can make it crash in 0x62 status until next reset. This function uses :func:`_i2c_status` heuristics to determine if it can issue a Cancel now or not.
         """
+        # Any transfer in progress is lost
+        self.status["i2c_reader"] = None
+
         i2c_status = self._i2c_status()
 
         # Only call a cancel command if I2C has been used already,
@@ -2385,6 +3899,7 @@ class Device:
         raise RuntimeError("Unable to cancel. I2C crashed.")
 
 
+    @_locked
     def _i2c_status(self):
         """ Return I2C status based on POLL_STATUS_SET_PARAMETERS command.
 
@@ -2411,6 +3926,13 @@ class Device:
         Hint:
             If your project does not use I2C, you could reuse SCL and SDA as digital inputs. Call this method to get its logic value.
 
+        Hint:
+            The state read here is remembered until the next command that may alter the I2C bus
+            (any command but *Get GPIO values*, *Get SRAM settings* or *Read flash data*).
+            While it is known, :func:`I2C_write` and :func:`I2C_read` skip their initial status check.
+            If something else may have disturbed the bus, forget it with
+            ``mcp.status["i2c_state"] = None``.
+
         Note:
             About **confused** status.
 
@@ -2450,12 +3972,33 @@ class Device:
             "initialized" : rbuf[I2C_POLL_RESP_UNDOCUMENTED_21] != 0
         }
 
+        # Remember the engine state, so the next transfer does not need to read it again.
+        self.status["i2c_state"] = None if i2c_status["confused"] else i2c_status["st"]
+
         return i2c_status
 
 
+    def _i2c_confused(self):
+        """ Tell if the I2C engine needs a Cancel before the next transfer.
+
+        This is a private method, the **API could change** without previous notice.
+
+        Use the engine state learned from previous responses. Only read the
+        status (one more USB command) when the state is unknown.
+
+        Returns:
+            bool: ``confused`` value from :func:`_i2c_status`.
+        """
+        if self.status["i2c_state"] is not None:
+            return False
+
+        return self._i2c_status()["confused"]
+
+
     #######################################################################
     # Advanced USB
     #######################################################################
+    @_locked
     def enable_power_management(self, enable=True):
         """ Enable or disable USB Power Management options for this device.
 
@@ -2498,6 +4041,7 @@ class Device:
         self.unsaved_SRAM[FLASH_CHIP_SETTINGS_USBPWR] = USBPWRATTR
 
 
+    @_locked
     def enable_cdc_serial(self, enable=True):
         """ Enable or disable USB CDC serial number enumeration.
 
@@ -2560,7 +4104,8 @@ class Device:
     #######################################################################
     # Reset
     #######################################################################
-    def reset(self, wait=0.5):
+    @_locked
+    def reset(self, wait=0.5, fast=False):
         """ Reset MCP2221.
 
         Reboot the device and load stored configuration from flash.
@@ -2571,19 +4116,43 @@ class Device:
         The reset function waits the specified seconds (default = 0.5) after the command.
         You may need to sleep additional time on your device for USB re-enumeration.
 
+        With ``fast``, ``wait`` is the maximum time instead. The device is reopened as soon as it
+        answers again, found by its path or USB serial number. Only the SRAM settings are read
+        again: no enumeration before the device is back and no flash reads.
+
         Parameters:
             wait (float, optional) Time in seconds to wait before reinitializing (default 0.5 seconds).
+            fast (bool, optional) Poll for the device instead of waiting a fixed time (default ``False``).
+
+        Raises:
+            RuntimeError: if ``fast`` and the device is not back after ``wait`` seconds.
 
+        Example:
+            >>> mcp.reset(wait = 2, fast = True)
         """
         buf = [0] * 4
         buf[0] = CMD_RESET_CHIP
         buf[1] = RESET_CHIP_SURE
         buf[2] = RESET_CHIP_VERY_SURE
         buf[3] = RESET_CHIP_VERY_VERY_SURE
+
+        if fast:
+            # Needed to find it if it comes back at another path (not read yet with fast_open)
+            self.usbserial
+
         self.send_cmd(buf)
+
+        if fast:
+            self._reopen_after_reset(time.perf_counter() + wait)
+            return
+
         time.sleep(wait)
 
+        # The device enumerates again after reset
+        Device.clear_enumeration_cache()
+
         self.status["i2c_dirty"] = False
+        self.status["i2c_reader"] = None
 
         self.__init__(
             VID            = self.parm_VID,
@@ -2595,12 +4164,161 @@ class Device:
             read_timeout   = self.parm_read_timeout,
             cmd_retries    = self.parm_cmd_retries,
             trace_packets  = self.parm_trace_packets,
-            debug_messages = self.parm_debug_messages)
+            debug_messages = self.parm_debug_messages,
+            deferred_write_check = self.parm_deferred_write_check,
+            adaptive_polling = self.parm_adaptive_polling,
+            collect_stats  = self.parm_collect_stats,
+            packet_tracer  = self.parm_packet_tracer,
+            transport      = self.parm_transport,
+            fast_open      = self.parm_fast_open,
+            flash_cache    = self.flash_cache)
+
+
+    def _reopen_after_reset(self, deadline):
+        """ Poll until the device answers again, then reinitialize it. See :func:`reset`. """
+        # The old handler is kept until the new one works
+        timeout_ms = 100 if self.read_timeout is None or self.read_timeout < 0 else min(self.read_timeout, 100)
+
+        while True:
+            time.sleep(0.01)
+
+            devices = Device._enumerate(self.transport, self.parm_VID, self.parm_PID, refresh = True)
+            paths = [device["path"] for device in devices]
+
+            if self.usbpath in paths:
+                candidates = [self.usbpath]
+            else:
+                candidates = [path for path in paths if path not in Device._catalog]
+
+            for path in candidates:
+                handler = self.transport.device()
+                try:
+                    handler.open_path(path)
+                    serial = Device._read_serial(handler, timeout_ms)
+                except Exception:
+                    serial = None
+
+                if serial is not None and serial == self._usbserial:
+                    break
+
+                handler.close()
+
+            else:
+                if time.perf_counter() > deadline:
+                    raise RuntimeError("Device did not come back after reset.")
+                continue
+
+            break
+
+        self._adopt_handler(handler, path)
+
+        # Settings loaded from flash
+        self.unsaved_SRAM = {}
+        self.status["clk_output"] = None
+        self.status["int_conf"] = None
+        self.status["i2c_dirty"] = False
+        self.status["i2c_reader"] = None
+
+        self._init_state()
+
+
+    def _adopt_handler(self, handler, path):
+        """ Use a new HID handler after the chip enumerated again. Forget the state lost on power-up. """
+        if handler is not self.hidhandler:
+            try:
+                self.hidhandler.close()
+            except Exception:
+                pass
+
+        self.hidhandler = handler
+
+        for old_path, obj in list(Device._catalog.items()):
+            if obj is self:
+                del Device._catalog[old_path]
+        Device._catalog[path] = self
+        self.usbpath = path
+
+        self.status["usb_error"] = False
+        self.status["sram_reinforce"] = False
+        self.status["i2c_state"] = None
+        self.status["i2c_pending"] = None
+        self.poll_data = None
+
+
+    @_locked
+    def reconnect(self, path = None):
+        """ Open the device again after it was unplugged or re-enumerated (e.g. after a USB glitch).
+
+        Restore the run-time settings known by this object with the minimum number of commands:
+        pin functions and output values, ADC and DAC references, DAC value, clock output and
+        interrupt edge in one SRAM write (two if Vrm is used, see :func:`SRAM_config`),
+        and the I2C speed. Flash is not read.
+
+        Usually called by :class:`EasyMCP2221.hotplug.HotplugMonitor`.
+
+        Parameters:
+            path (bytes, optional): USB path of the device. Default is to select it again with
+                its USB serial number if known, or with the initialization parameters.
+
+        Raises:
+            RuntimeError: if the device is not found.
+
+        Example:
+            >>> mcp.GPIO_read()
+            OSError: read error
+            >>> mcp.reconnect()
+            >>> mcp.GPIO_read()
+            (0, 1, None, None)
+        """
+        if path is None:
+            # The device cannot be asked for its serial now, use it only if already known
+            usbserial = self._usbserial if self._usbserial is not None else self.parm_usbserial
+
+            Device.clear_enumeration_cache()
+            path = self._select_device(
+                        VID         = self.parm_VID,
+                        PID         = self.parm_PID,
+                        devnum      = self.parm_devnum,
+                        usbserial   = usbserial,
+                        scan_serial = True,
+                        debug_messages = self.debug_messages,
+                        transport   = self.transport)
+
+        try:
+            self.hidhandler.close()
+        except Exception:
+            pass
+
+        handler = self.transport.device()
+        handler.open_path(path)
+        self._adopt_handler(handler, path)
+
+        if self.debug_messages:
+            print("Device reconnected: %s" % path)
+
+        # The chip has been powered up again
+        self.status["i2c_dirty"] = True
+        self.status["i2c_reader"] = None
+
+        self.SRAM_config(
+            clk_output = self.status["clk_output"],
+            int_conf   = self.status["int_conf"],
+            dac_ref    = self.status["dac_ref"],
+            dac_value  = self.status["dac_value"],
+            adc_ref    = self.status["adc_ref"],
+            gp0        = self.status["GPIO"]["gp0"],
+            gp1        = self.status["GPIO"]["gp1"],
+            gp2        = self.status["GPIO"]["gp2"],
+            gp3        = self.status["GPIO"]["gp3"])
+
+        if self.status["i2c_div"] is not None:
+            self.I2C_speed(12_000_000 / (self.status["i2c_div"] + 2))
 
 
     #######################################################################
     # Hardware and firmware revision
     #######################################################################
+    @_locked
     def revision(self):
         """ Get the hardware and firmware revision number.
 
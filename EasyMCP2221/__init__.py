@@ -32,5 +32,5 @@ SOFTWARE.
 """
 
 from .MCP2221 import Device
-from .smbus import SMBus
+from .smbus import SMBus, i2c_msg
 from .exceptions import NotAckError, TimeoutError
\ No newline at end of file
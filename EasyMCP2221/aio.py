@@ -0,0 +1,215 @@
+""" asyncio front-end for :class:`EasyMCP2221.Device`.
+
+Every USB command takes about 1-2 ms. Calling :class:`EasyMCP2221.Device` methods from a
+coroutine would block the event loop during that time. :class:`AsyncDevice` sends them to an
+I/O thread instead, one per physical device, and returns awaitables.
+
+Commands sent to the same chip run in the same order they were requested.
+
+Example:
+    >>> import asyncio
+    >>> from EasyMCP2221.aio import AsyncDevice
+    >>>
+    >>> async def main():
+    ...     async with await AsyncDevice.open() as dev:
+    ...         await dev.I2C_write(0x50, b"\\x00\\x00")
+    ...         data = await dev.I2C_read(0x50, 4)
+    ...         print(data, await dev.ADC_read())
+    >>>
+    >>> asyncio.run(main())
+    b'\\xff\\xff\\xff\\xff' (0, 512, 1023)
+"""
+import asyncio
+import queue
+import threading
+import weakref
+
+import EasyMCP2221
+
+
+def _set_result(future, result):
+    if not future.cancelled():
+        future.set_result(result)
+
+
+def _set_exception(future, exc):
+    if not future.cancelled():
+        future.set_exception(exc)
+
+
+
+class _Worker:
+    """ I/O thread running the calls for one device, in order. """
+
+    def __init__(self, name):
+        self.queue = queue.Queue()
+        self.users = 0
+        self.thread = threading.Thread(target = self._run, name = name, daemon = True)
+        self.thread.start()
+
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+
+            # stop
+            if item is None:
+                return
+
+            loop, future, func, args, kwargs = item
+
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                loop.call_soon_threadsafe(_set_exception, future, e)
+            else:
+                loop.call_soon_threadsafe(_set_result, future, result)
+
+
+    def submit(self, loop, func, args, kwargs):
+        future = loop.create_future()
+        self.queue.put((loop, future, func, args, kwargs))
+        return future
+
+
+    def stop(self):
+        self.queue.put(None)
+
+
+
+class AsyncDevice:
+    """ Awaitable version of :class:`EasyMCP2221.Device`.
+
+    All the instances wrapping the same :class:`EasyMCP2221.Device` share its I/O thread.
+    The device can still be used synchronously from other threads.
+
+    Parameters:
+        mcp (Device, optional): device to wrap. If omitted, a new one is created with ``kwargs``
+            (this blocks while the device is opened, use :func:`open` to avoid it).
+        **kwargs: parameters for :class:`EasyMCP2221.Device`.
+
+    Example:
+        >>> mcp = EasyMCP2221.Device()
+        >>> dev = AsyncDevice(mcp)
+        >>> await dev.GPIO_read()
+        (0, 1, None, None)
+    """
+
+    _workers = weakref.WeakKeyDictionary()
+    _workers_lock = threading.Lock()
+
+
+    def __init__(self, mcp = None, **kwargs):
+        self.mcp = mcp if mcp is not None else EasyMCP2221.Device(**kwargs)
+
+        with AsyncDevice._workers_lock:
+            worker = AsyncDevice._workers.get(self.mcp)
+
+            if worker is None:
+                worker = _Worker("EasyMCP2221-%x" % id(self.mcp))
+                AsyncDevice._workers[self.mcp] = worker
+
+            worker.users += 1
+
+        self._worker = worker
+
+
+    @classmethod
+    async def open(cls, **kwargs):
+        """ Open a new :class:`EasyMCP2221.Device` without blocking the event loop.
+
+        Parameters:
+            **kwargs: parameters for :class:`EasyMCP2221.Device`.
+
+        Return:
+            AsyncDevice
+        """
+        loop = asyncio.get_event_loop()
+        mcp = await loop.run_in_executor(None, lambda: EasyMCP2221.Device(**kwargs))
+        return cls(mcp)
+
+
+    def close(self):
+        """ Release the I/O thread. It is stopped after the pending commands when no other instance uses it. """
+        worker, self._worker = self._worker, None
+        if worker is None:
+            return
+
+        with AsyncDevice._workers_lock:
+            worker.users -= 1
+
+            if worker.users == 0:
+                worker.stop()
+                if AsyncDevice._workers.get(self.mcp) is worker:
+                    del AsyncDevice._workers[self.mcp]
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+    def run(self, func, *args, **kwargs):
+        """ Call any function in the device I/O thread.
+
+        Parameters:
+            func (str or callable): name of a :class:`EasyMCP2221.Device` method or any callable.
+            *args, **kwargs: its parameters.
+
+        Return:
+            Future with the function result.
+
+        Example:
+            >>> await dev.run("I2C_speed", 400_000)
+            >>> await dev.run(mcp.DAC_config, ref = "2.048V")
+        """
+        if self._worker is None:
+            raise RuntimeError("AsyncDevice is closed.")
+
+        if isinstance(func, str):
+            func = getattr(self.mcp, func)
+
+        return self._worker.submit(asyncio.get_event_loop(), func, args, kwargs)
+
+
+    async def GPIO_read(self):
+        """ See :func:`EasyMCP2221.Device.GPIO_read`. """
+        return await self.run(self.mcp.GPIO_read)
+
+
+    async def GPIO_write(self, gp0 = None, gp1 = None, gp2 = None, gp3 = None):
+        """ See :func:`EasyMCP2221.Device.GPIO_write`. """
+        return await self.run(self.mcp.GPIO_write, gp0, gp1, gp2, gp3)
+
+
+    async def GPIO_poll(self, id = None):
+        """ See :func:`EasyMCP2221.Device.GPIO_poll`. """
+        return await self.run(self.mcp.GPIO_poll, id)
+
+
+    async def ADC_read(self, norm = False, volts = False):
+        """ See :func:`EasyMCP2221.Device.ADC_read`. """
+        return await self.run(self.mcp.ADC_read, norm, volts)
+
+
+    async def DAC_write(self, out, norm = False, volts = False):
+        """ See :func:`EasyMCP2221.Device.DAC_write`. """
+        return await self.run(self.mcp.DAC_write, out, norm, volts)
+
+
+    async def I2C_write(self, addr, data, kind = "regular", timeout_ms = 20):
+        """ See :func:`EasyMCP2221.Device.I2C_write`. """
+        return await self.run(self.mcp.I2C_write, addr, data, kind, timeout_ms)
+
+
+    async def I2C_read(self, addr, size = 1, kind = "regular", timeout_ms = 20):
+        """ See :func:`EasyMCP2221.Device.I2C_read`. """
+        return await self.run(self.mcp.I2C_read, addr, size, kind, timeout_ms)
+
+
+    async def I2C_write_read(self, addr, wdata, rsize, timeout_ms = 20):
+        """ See :func:`EasyMCP2221.Device.I2C_write_read`. """
+        return await self.run(self.mcp.I2C_write_read, addr, wdata, rsize, timeout_ms)
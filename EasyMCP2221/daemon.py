@@ -0,0 +1,679 @@
+""" Share one MCP2221 between several processes.
+
+Only one process can drive a chip at a time. :class:`Broker` owns the :class:`EasyMCP2221.Device`
+and serves requests from other processes over a Unix domain socket. :class:`Client` has the same
+GPIO, ADC, DAC and I2C functions as :class:`EasyMCP2221.Device`, so it can be passed to
+:class:`EasyMCP2221.SMBus` or :class:`EasyMCP2221.I2C_Slave.I2C_Slave` too.
+
+Each request is run as a whole, so I2C transfers from different clients never get mixed.
+When several clients are waiting, consecutive GPIO or ADC reads are answered with a single USB command
+and consecutive GPIO writes to different pins are sent as one.
+
+Start the broker:
+
+.. code-block:: console
+
+    $ python -m EasyMCP2221.daemon
+
+Then, in any process:
+
+Example:
+    >>> from EasyMCP2221 import SMBus
+    >>> from EasyMCP2221.daemon import Client
+    >>> mcp = Client()
+    >>> mcp.ADC_read()
+    (0, 512, 1023)
+    >>> bus = SMBus(mcp = mcp)
+    >>> bus.read_byte_data(0x48, 0x01)
+    133
+
+Protocol:
+    Every message is a 5 bytes header, operation or status (1 byte) and payload length (4 bytes, little endian),
+    followed by the payload. Responses have status 0 for success, or the error kind followed by the
+    error message. See ``OP_*`` and ``ST_*`` constants.
+
+Note:
+    Unix domain sockets are not available on every platform.
+
+    By default, only the user running the broker can connect to it. See ``mode`` in :class:`Broker`.
+"""
+import argparse
+import os
+import queue
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+
+import EasyMCP2221
+from . import I2C_Slave
+from .exceptions import NotAckError, TimeoutError, LowSCLError, LowSDAError
+
+# Maximum number of queued requests taken at once to look for requests to merge
+BATCH_MAX = 64
+
+HEADER = struct.Struct("<BI")
+
+# Operations
+OP_GPIO_READ       = 1
+OP_GPIO_WRITE      = 2
+OP_ADC_READ        = 3
+OP_DAC_WRITE       = 4
+OP_I2C_WRITE       = 5
+OP_I2C_READ        = 6
+OP_I2C_WRITE_READ  = 7
+OP_I2C_TRANSACTION = 8
+OP_I2C_SPEED       = 9
+
+# Response status
+ST_OK          = 0
+ST_NOT_ACK     = 1
+ST_TIMEOUT     = 2
+ST_LOW_SCL     = 3
+ST_LOW_SDA     = 4
+ST_VALUE_ERROR = 5
+ST_ERROR       = 6
+
+_ERRORS = {
+    ST_NOT_ACK:     NotAckError,
+    ST_TIMEOUT:     TimeoutError,
+    ST_LOW_SCL:     LowSCLError,
+    ST_LOW_SDA:     LowSDAError,
+    ST_VALUE_ERROR: ValueError,
+    ST_ERROR:       RuntimeError,
+}
+
+_STATUS = {cls: status for status, cls in _ERRORS.items()}
+
+KINDS = ("regular", "restart", "nonstop")
+
+# Pin value that means "None"
+NO_VALUE = 0xFF
+
+I2C_WRITE       = struct.Struct("<BBH")    # addr, kind, timeout_ms
+I2C_READ        = struct.Struct("<BBHH")   # addr, kind, timeout_ms, size
+I2C_WRITE_READ  = struct.Struct("<BHH")    # addr, timeout_ms, rsize
+I2C_TRANSACTION = struct.Struct("<HH")     # timeout_ms, segments
+SEGMENT         = struct.Struct("<BBBH")   # read, addr, kind, size or data length
+SEGMENT_RESULT  = struct.Struct("<BH")     # status, data length
+ADC_VALUES      = struct.Struct("<3H")
+I2C_SPEED       = struct.Struct("<I")
+
+
+def default_path():
+    """ Default socket path, in the user runtime directory.
+
+    ``$XDG_RUNTIME_DIR/EasyMCP2221.sock`` or, if not set, ``EasyMCP2221-<uid>.sock`` in the temporary directory.
+    """
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], "EasyMCP2221.sock")
+
+    return os.path.join(tempfile.gettempdir(), "EasyMCP2221-%d.sock" % os.getuid())
+
+
+def _remove_stale_socket(path):
+    """ Remove a socket file left by a broker that is not running anymore.
+
+    Raises:
+        RuntimeError: if a broker is listening there or the file is not a socket.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(st.st_mode):
+        raise RuntimeError("%s exists and it is not a socket." % path)
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+    else:
+        raise RuntimeError("Another broker is running on %s." % path)
+    finally:
+        probe.close()
+
+
+def _error_status(e):
+    """ Status code for an exception. """
+    for cls in type(e).__mro__:
+        if cls in _STATUS:
+            return _STATUS[cls]
+    return ST_ERROR
+
+
+def _error(status, message):
+    """ Exception for a status code. """
+    return _ERRORS.get(status, RuntimeError)(message.decode("utf-8", "replace"))
+
+
+def _recv_exact(sock, size):
+    """ Receive exactly ``size`` bytes. Return ``None`` if the connection is closed. """
+    buf = bytearray(size)
+    view = memoryview(buf)
+    pos = 0
+
+    while pos < size:
+        n = sock.recv_into(view[pos:])
+        if n == 0:
+            return None
+        pos += n
+
+    return buf
+
+
+def _recv_message(sock):
+    """ Receive a message. Return ``(code, payload)`` or ``None`` if the connection is closed. """
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+
+    code, length = HEADER.unpack(header)
+
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        return None
+
+    return code, bytes(payload)
+
+
+def _send_message(sock, code, payload = b""):
+    sock.sendall(HEADER.pack(code, len(payload)) + payload)
+
+
+
+class Broker:
+    """ Serve one :class:`EasyMCP2221.Device` over a Unix domain socket.
+
+    Each client has its own thread reading requests and sending the responses, so a slow
+    client does not delay the others. A single thread runs the requests on the device, in arrival order.
+    Consecutive requests waiting at that moment (up to ``BATCH_MAX``) are merged when possible:
+    GPIO or ADC reads share one read, and GPIO writes to different pins share one write.
+
+    Parameters:
+        path (str, optional): socket path. Default is :func:`default_path`.
+            A socket left there by a broker that is not running anymore is removed.
+        mcp (Device, optional): device to share. If omitted, a new one is created with ``kwargs``.
+        mode (int, optional): socket file permissions. Default is ``0o600``, only for the current user.
+            Use ``0o660`` to share it with the group.
+        **kwargs: parameters for :class:`EasyMCP2221.Device`.
+
+    Raises:
+        RuntimeError: if another broker is running on ``path``, or ``path`` is not a socket.
+
+    Example:
+        >>> broker = Broker("/tmp/mcp2221.sock", devnum = 1)
+        >>> broker.start()
+        >>> ...
+        >>> broker.close()
+    """
+
+    def __init__(self, path = None, mcp = None, mode = 0o600, **kwargs):
+        self.path = path or default_path()
+
+        _remove_stale_socket(self.path)
+
+        self.mcp  = mcp if mcp is not None else EasyMCP2221.Device(**kwargs)
+        self.requests = queue.Queue()
+        self.clients = set()
+        self.merged = 0
+        self.running = False
+        self.running_lock = threading.Lock()
+
+        self.handlers = {
+            OP_GPIO_READ:       self._gpio_read,
+            OP_GPIO_WRITE:      self._gpio_write,
+            OP_ADC_READ:        self._adc_read,
+            OP_DAC_WRITE:       self._dac_write,
+            OP_I2C_WRITE:       self._i2c_write,
+            OP_I2C_READ:        self._i2c_read,
+            OP_I2C_WRITE_READ:  self._i2c_write_read,
+            OP_I2C_TRANSACTION: self._i2c_transaction,
+            OP_I2C_SPEED:       self._i2c_speed,
+        }
+
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        # Nobody else can connect before chmod: create the socket file private, then apply mode
+        umask = os.umask(0o177)
+        try:
+            self.server.bind(self.path)
+        finally:
+            os.umask(umask)
+
+        os.chmod(self.path, mode)
+        self.server.listen()
+
+        # To remove only our own socket file
+        self.inode = os.stat(self.path).st_ino
+
+
+    def start(self):
+        """ Serve in background threads. """
+        with self.running_lock:
+            self.running = True
+
+        self.device_thread = threading.Thread(target = self._run_device, name = "EasyMCP2221-broker", daemon = True)
+        self.device_thread.start()
+
+        self.accept_thread = threading.Thread(target = self._accept, name = "EasyMCP2221-accept", daemon = True)
+        self.accept_thread.start()
+
+
+    def serve_forever(self):
+        """ Serve until :func:`close` is called from another thread or the process is interrupted. """
+        self.start()
+        try:
+            self.device_thread.join()
+        finally:
+            self.close()
+
+
+    def close(self):
+        """ Stop serving, disconnect the clients and remove the socket file. The device remains open. """
+        # Requests already queued are still answered
+        with self.running_lock:
+            if self.running:
+                self.running = False
+                self.requests.put(None)
+
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)  # wake up accept()
+        except OSError:
+            pass
+        self.server.close()
+
+        for conn in list(self.clients):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        try:
+            if os.stat(self.path).st_ino == self.inode:
+                os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def _accept(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+
+            self.clients.add(conn)
+            threading.Thread(target = self._read_client, args = (conn,), daemon = True).start()
+
+
+    def _read_client(self, conn):
+        """ Queue the requests of one client and send back the responses. """
+        reply = queue.Queue()
+
+        try:
+            while True:
+                message = _recv_message(conn)
+                if message is None:
+                    break
+
+                with self.running_lock:
+                    if not self.running:
+                        break
+                    self.requests.put((reply, *message))
+
+                _send_message(conn, *reply.get())
+        except OSError:
+            pass
+        finally:
+            self.clients.discard(conn)
+            conn.close()
+
+
+    def _run_device(self):
+        """ Take the queued requests and run them. """
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+
+            batch = [request]
+            while len(batch) < BATCH_MAX:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+
+                if request is None:
+                    self.requests.put(None)
+                    break
+
+                batch.append(request)
+
+            self._run_batch(batch)
+
+
+    def _run_batch(self, batch):
+        """ Run requests in order, merging consecutive compatible ones. Put the responses in their reply queues. """
+        i = 0
+        while i < len(batch):
+            reply, op, payload = batch[i]
+            j = i + 1
+
+            if op in (OP_GPIO_READ, OP_ADC_READ):
+                # Same result for all of them
+                while j < len(batch) and batch[j][1] == op:
+                    j += 1
+
+                response = self._execute(op, payload)
+                for request in batch[i:j]:
+                    request[0].put(response)
+
+            elif op == OP_GPIO_WRITE and len(payload) == 4:
+                # Writes to different pins
+                values = bytearray(payload)
+                while (j < len(batch) and batch[j][1] == OP_GPIO_WRITE and len(batch[j][2]) == 4 and
+                       all(a == NO_VALUE or b == NO_VALUE for a, b in zip(values, batch[j][2]))):
+                    values = bytearray(b if b != NO_VALUE else a for a, b in zip(values, batch[j][2]))
+                    j += 1
+
+                response = self._execute(op, bytes(values))
+
+                if response[0] == ST_OK or j == i + 1:
+                    for request in batch[i:j]:
+                        request[0].put(response)
+                else:
+                    # Find out which one failed
+                    for request in batch[i:j]:
+                        request[0].put(self._execute(request[1], request[2]))
+
+            else:
+                reply.put(self._execute(op, payload))
+
+            self.merged += j - i - 1
+            i = j
+
+
+    def _execute(self, op, payload):
+        """ Run one request. Return status and response payload. """
+        try:
+            if op not in self.handlers:
+                raise ValueError("Unknown operation %d." % op)
+            return ST_OK, self.handlers[op](payload)
+        except Exception as e:
+            return _error_status(e), str(e).encode("utf-8")
+
+
+    def _gpio_read(self, payload):
+        return bytes(NO_VALUE if v is None else v for v in self.mcp.GPIO_read())
+
+
+    def _gpio_write(self, payload):
+        self.mcp.GPIO_write(*(None if v == NO_VALUE else v for v in payload[:4]))
+        return b""
+
+
+    def _adc_read(self, payload):
+        return ADC_VALUES.pack(*self.mcp.ADC_read())
+
+
+    def _dac_write(self, payload):
+        self.mcp.DAC_write(payload[0])
+        return b""
+
+
+    def _i2c_write(self, payload):
+        addr, kind, timeout_ms = I2C_WRITE.unpack_from(payload)
+        self.mcp.I2C_write(addr, payload[I2C_WRITE.size:], KINDS[kind], timeout_ms)
+        return b""
+
+
+    def _i2c_read(self, payload):
+        addr, kind, timeout_ms, size = I2C_READ.unpack(payload)
+        return self.mcp.I2C_read(addr, size, KINDS[kind], timeout_ms)
+
+
+    def _i2c_write_read(self, payload):
+        addr, timeout_ms, rsize = I2C_WRITE_READ.unpack_from(payload)
+        return self.mcp.I2C_write_read(addr, payload[I2C_WRITE_READ.size:], rsize, timeout_ms)
+
+
+    def _i2c_speed(self, payload):
+        self.mcp.I2C_speed(*I2C_SPEED.unpack(payload))
+        return b""
+
+
+    def _i2c_transaction(self, payload):
+        timeout_ms, count = I2C_TRANSACTION.unpack_from(payload)
+        pos = I2C_TRANSACTION.size
+
+        segments = []
+        for _ in range(count):
+            read, addr, kind, size = SEGMENT.unpack_from(payload, pos)
+            pos += SEGMENT.size
+
+            if read:
+                segments.append(("read", addr, size, KINDS[kind]))
+            else:
+                segments.append(("write", addr, payload[pos:pos+size], KINDS[kind]))
+                pos += size
+
+        results, errors = self.mcp.I2C_transaction(segments, timeout_ms)
+
+        out = bytearray()
+        for result, error in zip(results, errors):
+            if error is not None:
+                status, data = _error_status(error), str(error).encode("utf-8")
+            else:
+                status, data = ST_OK, result or b""
+
+            out += SEGMENT_RESULT.pack(status, len(data)) + data
+
+        return bytes(out)
+
+
+
+class Client:
+    """ Use a device shared by a :class:`Broker`.
+
+    Functions have the same parameters and return values as in :class:`EasyMCP2221.Device`,
+    except ADC and DAC functions, which only take raw values or ``norm``.
+    :func:`I2C_speed` changes the bus speed for all the clients.
+    Each call is run as a whole: no other client can use the device in the middle of it.
+
+    Parameters:
+        path (str, optional): broker socket path. Default is :func:`default_path`.
+
+    Raises:
+        ConnectionError: if the broker closes the connection.
+    """
+
+    def __init__(self, path = None):
+        self.path = path or default_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+        self.lock = threading.Lock()
+
+
+    def __repr__(self):
+        return "<EasyMCP2221.daemon.Client %s>" % self.path
+
+
+    def close(self):
+        """ Disconnect from the broker. """
+        self.sock.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def _request(self, op, payload = b""):
+        """ Send a request and wait for its response. Raise the remote error if any. """
+        with self.lock:
+            _send_message(self.sock, op, payload)
+            response = _recv_message(self.sock)
+
+        if response is None:
+            raise ConnectionError("Broker closed the connection.")
+
+        status, data = response
+        if status != ST_OK:
+            raise _error(status, data)
+
+        return data
+
+
+    def GPIO_read(self):
+        """ See :func:`EasyMCP2221.Device.GPIO_read`. """
+        return tuple(None if v == NO_VALUE else v for v in self._request(OP_GPIO_READ))
+
+
+    def GPIO_write(self, gp0 = None, gp1 = None, gp2 = None, gp3 = None):
+        """ See :func:`EasyMCP2221.Device.GPIO_write`. """
+        values = bytes(NO_VALUE if v is None else (1 if v else 0) for v in (gp0, gp1, gp2, gp3))
+        self._request(OP_GPIO_WRITE, values)
+
+
+    def ADC_read(self, norm = False):
+        """ See :func:`EasyMCP2221.Device.ADC_read`. """
+        values = ADC_VALUES.unpack(self._request(OP_ADC_READ))
+
+        if norm:
+            return tuple(v / 1024 for v in values)
+
+        return values
+
+
+    def DAC_write(self, out, norm = False):
+        """ See :func:`EasyMCP2221.Device.DAC_write`. """
+        if norm:
+            if not 0 <= out <= 1:
+                raise ValueError("Accepted values for out when norm=True are from 0 to 1.")
+
+            dac = min(round(out * 32), 31)
+            self._request(OP_DAC_WRITE, bytes([dac]))
+            return dac / 32
+
+        if out not in range(0, 32):
+            raise ValueError("Accepted values for out are from 0 to 31.")
+
+        self._request(OP_DAC_WRITE, bytes([out]))
+        return out
+
+
+    def I2C_write(self, addr, data, kind = "regular", timeout_ms = 20):
+        """ See :func:`EasyMCP2221.Device.I2C_write`. """
+        self._request(OP_I2C_WRITE, I2C_WRITE.pack(addr, KINDS.index(kind), timeout_ms) + bytes(data))
+
+
+    def I2C_read(self, addr, size = 1, kind = "regular", timeout_ms = 20):
+        """ See :func:`EasyMCP2221.Device.I2C_read`. """
+        return self._request(OP_I2C_READ, I2C_READ.pack(addr, KINDS.index(kind), timeout_ms, size))
+
+
+    def I2C_write_read(self, addr, wdata, rsize, timeout_ms = 20):
+        """ See :func:`EasyMCP2221.Device.I2C_write_read`. """
+        return self._request(OP_I2C_WRITE_READ, I2C_WRITE_READ.pack(addr, timeout_ms, rsize) + bytes(wdata))
+
+
+    def I2C_transaction(self, segments, timeout_ms = 20):
+        """ See :func:`EasyMCP2221.Device.I2C_transaction`. The whole list is sent in one request. """
+        payload = bytearray(I2C_TRANSACTION.pack(timeout_ms, len(segments)))
+
+        for segment in segments:
+            if len(segment) not in (3, 4):
+                raise ValueError("Invalid segment %s." % (segment,))
+
+            op, addr, arg, kind = (*segment, "regular")[:4]
+
+            if op == "read":
+                payload += SEGMENT.pack(1, addr, KINDS.index(kind), arg)
+            elif op == "write":
+                data = bytes(arg)
+                payload += SEGMENT.pack(0, addr, KINDS.index(kind), len(data)) + data
+            else:
+                raise ValueError("Invalid segment %s." % (segment,))
+
+        data = self._request(OP_I2C_TRANSACTION, bytes(payload))
+
+        results, errors = [], []
+        pos = 0
+        while pos < len(data):
+            status, length = SEGMENT_RESULT.unpack_from(data, pos)
+            pos += SEGMENT_RESULT.size
+            chunk = data[pos:pos+length]
+            pos += length
+
+            if status == ST_OK:
+                results.append(chunk if segments[len(results)][0] == "read" else None)
+                errors.append(None)
+            else:
+                results.append(None)
+                errors.append(_error(status, chunk))
+
+        return results, errors
+
+
+    def I2C_speed(self, speed = 100000):
+        """ See :func:`EasyMCP2221.Device.I2C_speed`. It applies to all the clients. """
+        self._request(OP_I2C_SPEED, I2C_SPEED.pack(speed))
+
+
+    def I2C_Slave(self, addr, force = False, speed = 100000, reg_bytes = 1, reg_byteorder = 'big'):
+        """ See :func:`EasyMCP2221.Device.I2C_Slave`. """
+        return I2C_Slave.I2C_Slave(
+            self,
+            addr = addr,
+            force = force,
+            speed = speed,
+            reg_bytes = reg_bytes,
+            reg_byteorder = reg_byteorder)
+
+
+
+def main(argv = None):
+    """ Run a broker from the command line. """
+    parser = argparse.ArgumentParser(prog = "python -m EasyMCP2221.daemon",
+        description = "Share an MCP2221 with other processes through a Unix socket.")
+    parser.add_argument("--path", default = default_path(), help = "socket path (default %(default)s)")
+    parser.add_argument("--mode", type = lambda s: int(s, 8), default = 0o600,
+        help = "socket permissions, in octal (default 600)")
+    parser.add_argument("--devnum", type = int, default = 0, help = "device index (default %(default)s)")
+    parser.add_argument("--usbserial", help = "device USB serial number")
+    parser.add_argument("--speed", type = int, default = 100_000, help = "I2C speed (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    mcp = EasyMCP2221.Device(devnum = args.devnum, usbserial = args.usbserial)
+    mcp.I2C_speed(args.speed)
+
+    broker = Broker(args.path, mcp, mode = args.mode)
+    print("Serving %r on %s" % (mcp, args.path))
+
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
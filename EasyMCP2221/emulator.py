@@ -0,0 +1,891 @@
+""" Pure Python emulation of the MCP2221A HID interface.
+
+The emulator behaves like the ``hid`` module used by :class:`EasyMCP2221.Device`:
+it exposes ``enumerate()`` and ``device()``. Pass it with the ``transport`` parameter to run
+the library without hardware.
+"""
+import threading
+import time
+
+from .Constants import *
+
+
+# States in which the I2C engine is working and rejects new transfers.
+_I2C_BUSY_WRITE  = (I2C_ST_WRADDRL, I2C_ST_WRITEDATA)
+_I2C_BUSY_READ   = (I2C_ST_WRADDRL, I2C_ST_READDATA)
+_I2C_ERRORS      = (I2C_ST_WRADDRL_NACK_STOP, I2C_ST_START_TOUT, I2C_ST_STOP_TOUT)
+
+# Bytes per I2C byte on the bus: 8 data bits plus ACK.
+_I2C_BITS_PER_BYTE = 9
+
+
+class Emulator:
+    """ Emulated USB bus with one or more MCP2221A chips.
+
+    Parameters:
+        chips (int, optional): How many chips to plug at start. Default 1.
+        VID (int, optional): Vendor Id of the emulated chips.
+        PID (int, optional): Product Id of the emulated chips.
+        usb_interval (float, optional): USB polling interval in seconds (default 1 ms).
+            Each command takes two intervals: one to send it and one to get the reply.
+        realtime (bool, optional): If ``False`` (default), time is virtual. It only advances
+            with USB transactions, so results are deterministic and tests run fast.
+            If ``True``, USB transactions sleep ``usb_interval`` and the I2C engine runs in wall time.
+
+    Example:
+        >>> from EasyMCP2221.emulator import Emulator, EEPROM
+        >>> emu = Emulator()
+        >>> emu.chips[0].attach(EEPROM(0x50))
+        >>> mcp = EasyMCP2221.Device(transport = emu)
+    """
+
+    def __init__(self, chips = 1, VID = DEV_DEFAULT_VID, PID = DEV_DEFAULT_PID,
+                 usb_interval = 0.001, realtime = False):
+        self.VID = VID
+        self.PID = PID
+        self.usb_interval = usb_interval
+        self.realtime = realtime
+        self.lock = threading.RLock()
+        self._vtime = 0.0
+        self.chips = []
+
+        for _ in range(chips):
+            self.add_chip()
+
+
+    def add_chip(self, **kwargs):
+        """ Plug a new emulated chip. Return the :class:`EmulatedMCP2221` object. """
+        chip = EmulatedMCP2221(
+            self,
+            path = b"emulator:%d" % len(self.chips),
+            factory_serial = "%08d" % (1000 + len(self.chips)),
+            **kwargs)
+        self.chips.append(chip)
+        return chip
+
+
+    def now(self):
+        """ Current time for the emulated devices. """
+        if self.realtime:
+            return time.perf_counter()
+        return self._vtime
+
+
+    def usb_frame(self):
+        """ Wait for the next USB transaction slot. """
+        if self.realtime:
+            if self.usb_interval:
+                time.sleep(self.usb_interval)
+        else:
+            with self.lock:
+                self._vtime += self.usb_interval
+
+
+    def sleep(self, seconds):
+        """ Let the emulated time pass (virtual time only). """
+        with self.lock:
+            if not self.realtime:
+                self._vtime += seconds
+
+
+    #######################################################################
+    # hid module interface
+    #######################################################################
+    def enumerate(self, vendor_id = 0, product_id = 0):
+        """ Same as ``hid.enumerate``. """
+        devices = []
+        for chip in self.chips:
+            if not chip.plugged:
+                continue
+            if vendor_id and vendor_id != chip.VID:
+                continue
+            if product_id and product_id != chip.PID:
+                continue
+
+            devices.append({
+                "path": chip.path,
+                "vendor_id": chip.VID,
+                "product_id": chip.PID,
+                "serial_number": chip.usb_serial if chip.cdc_serial_enabled() else "",
+                "release_number": 0x0100,
+                "manufacturer_string": chip.strings[FLASH_DATA_USB_MANUFACTURER],
+                "product_string": chip.strings[FLASH_DATA_USB_PRODUCT],
+                "usage_page": 0xFF00,
+                "usage": 0x01,
+                "interface_number": 2,
+            })
+
+        return devices
+
+
+    def device(self):
+        """ Same as ``hid.device``. Return an unopened handler. """
+        return EmulatedHandler(self)
+
+
+
+class EmulatedHandler:
+    """ Emulated ``hid.device`` object. """
+
+    def __init__(self, emulator):
+        self.emulator = emulator
+        self.chip = None
+        self.response = None
+        self.generation = None
+
+
+    def _check(self):
+        if self.chip is None:
+            raise ValueError("not open")
+        if not self.chip.plugged or self.generation != self.chip.generation:
+            raise OSError("read error")
+
+
+    def open_path(self, path):
+        for chip in self.emulator.chips:
+            if chip.path == path and chip.plugged:
+                self.chip = chip
+                self.generation = chip.generation
+                chip.handlers += 1
+                return
+        raise OSError("open failed")
+
+
+    def close(self):
+        if self.chip is not None:
+            self.chip.handlers -= 1
+        self.chip = None
+
+
+    def write(self, data):
+        self._check()
+        data = bytes(data)
+        self.emulator.usb_frame()
+        # First byte is the report number
+        self.response = self.chip.command(data[1:1+PACKET_SIZE])
+        return len(data)
+
+
+    def read(self, max_length, timeout_ms = 0):
+        self._check()
+        self.emulator.usb_frame()
+        r, self.response = self.response, None
+        if r is None:
+            return []
+        return list(r[:max_length])
+
+
+    def readinto(self, buffer, timeout_ms = 0):
+        """ Same as :func:`read`, into a buffer. Return the length. """
+        r = self.read(len(buffer), timeout_ms)
+        buffer[:len(r)] = bytes(r)
+        return len(r)
+
+
+
+class EmulatedMCP2221:
+    """ One emulated MCP2221A chip.
+
+    Attributes you may change to stimulate the chip:
+        - **inputs** (list of 4 int): logic level applied to GP0..GP3 when used as inputs.
+        - **analog** (list of 3 int): raw ADC values (0-1023) for GP1..GP3.
+        - **scl**, **sda** (int): I2C lines level (pull them to 0 to emulate a stuck bus).
+        - **confused** (bool): emulate the undocumented *confused* I2C status.
+
+    Counters:
+        - **commands** (dict): how many times each command code has been received.
+        - **transactions** (int): total commands received.
+        - **vrm_resets** (int): times the Vrm was reset by a GPIO reconfiguration (DAC glitch).
+    """
+
+    def __init__(self, emulator, path, factory_serial, usb_serial = "0000000000", cdc_serial = False):
+        self.emulator = emulator
+        self.path = path
+        self.VID = emulator.VID
+        self.PID = emulator.PID
+        self.plugged = True
+        self.generation = 0
+        self.handlers = 0
+
+        self.factory_serial = factory_serial
+        self.usb_serial = usb_serial
+        self.strings = {
+            FLASH_DATA_USB_MANUFACTURER: "Microchip Technology Inc.",
+            FLASH_DATA_USB_PRODUCT:      "MCP2221 USB-I2C/UART Combo",
+            FLASH_DATA_USB_SERIALNUM:    usb_serial,
+        }
+
+        # Flash chip settings, same order as in Read Flash Data command (10 bytes)
+        self.flash_chip = [
+            CDCSEC_CDCSNEN if cdc_serial else 0,  # CDCSEC
+            CLK_DUTY_50 | CLK_FREQ_12MHz,         # clock output
+            0,                                    # DAC ref and value
+            0b01100000,                           # IOC both edges, ADC ref VDD
+            self.VID & 0xFF, self.VID >> 8,
+            self.PID & 0xFF, self.PID >> 8,
+            0b10000000,                           # USB power attributes
+            50,                                   # 100 mA
+        ]
+        self.flash_gp = [GPIO_FUNC_ALT_0, GPIO_FUNC_ALT_1, GPIO_FUNC_DEDICATED, GPIO_FUNC_DEDICATED]
+
+        self.inputs = [0, 0, 0, 0]
+        self.analog = [0, 0, 0]
+        self.scl = 1
+        self.sda = 1
+        self.confused = False
+        self.int_flag = 0
+
+        self.slaves = {}
+
+        self.commands = {}
+        self.transactions = 0
+        self.vrm_resets = 0
+        self.resets = 0
+
+        self.power_up()
+
+
+    def cdc_serial_enabled(self):
+        return bool(self.flash_chip[FLASH_CHIP_SETTINGS_CDCSEC] & CDCSEC_CDCSNEN)
+
+
+    def attach(self, slave):
+        """ Connect a virtual I2C slave to the bus. """
+        self.slaves[slave.addr] = slave
+        slave.chip = self
+        return slave
+
+
+    def power_up(self):
+        """ Load flash settings into SRAM and reset the I2C engine. """
+        self.sram_clock  = self.flash_chip[FLASH_CHIP_SETTINGS_CLOCK]
+        self.dac_ref     = (self.flash_chip[FLASH_CHIP_SETTINGS_DAC] >> 5) & 0b111
+        self.dac_value   =  self.flash_chip[FLASH_CHIP_SETTINGS_DAC] & 0b11111
+        self.adc_ref     = (self.flash_chip[FLASH_CHIP_SETTINGS_INT_ADC] >> 2) & 0b111
+        self.ioc         = (self.flash_chip[FLASH_CHIP_SETTINGS_INT_ADC] >> 5) & 0b11
+        self.gp          = list(self.flash_gp)
+
+        self.i2c_div         = 22           # 500kHz in some revisions
+        self.i2c_state       = I2C_ST_IDLE
+        self.i2c_used        = False
+        self.i2c_xfer        = None
+        self.i2c_busy_until  = 0
+        self.i2c_rlen        = 0
+        self.i2c_txlen       = 0
+        self.i2c_buffer      = b""
+        self.i2c_ack         = 0
+
+
+    def set_input(self, pin, level):
+        """ Apply a logic level to a GP pin. Set the interrupt flag if GP1 is IOC and the edge matches. """
+        with self.emulator.lock:
+            old = self.inputs[pin]
+            self.inputs[pin] = level
+
+            if pin == 1 and self.gp[1] & 0b111 == GPIO_FUNC_ALT_2:
+                if (not old and level and self.ioc & 0b01) or (old and not level and self.ioc & 0b10):
+                    self.int_flag = 1
+
+
+    def unplug(self):
+        """ Emulate a device disconnection. Open handlers become stale. """
+        with self.emulator.lock:
+            self.plugged = False
+            self.generation += 1
+
+
+    def plug(self, path = None):
+        """ Emulate the device arrival, optionally with a new system path. """
+        with self.emulator.lock:
+            if path is not None:
+                self.path = path
+            self.power_up()
+            self.plugged = True
+
+
+    #######################################################################
+    # Command dispatcher
+    #######################################################################
+    def command(self, buf):
+        buf = bytes(buf) + bytes(PACKET_SIZE - len(buf))
+
+        with self.emulator.lock:
+            cmd = buf[0]
+            self.transactions += 1
+            self.commands[cmd] = self.commands.get(cmd, 0) + 1
+
+            self._i2c_update()
+
+            r = [0] * PACKET_SIZE
+            r[RESPONSE_ECHO_BYTE] = cmd
+
+            if cmd == CMD_POLL_STATUS_SET_PARAMETERS:
+                self._poll_status(buf, r)
+            elif cmd == CMD_SET_GPIO_OUTPUT_VALUES:
+                self._set_gpio(buf, r)
+            elif cmd == CMD_GET_GPIO_VALUES:
+                self._get_gpio(buf, r)
+            elif cmd == CMD_SET_SRAM_SETTINGS:
+                self._set_sram(buf, r)
+            elif cmd == CMD_GET_SRAM_SETTINGS:
+                self._get_sram(buf, r)
+            elif cmd == CMD_READ_FLASH_DATA:
+                self._read_flash(buf, r)
+            elif cmd == CMD_WRITE_FLASH_DATA:
+                self._write_flash(buf, r)
+            elif cmd in (CMD_I2C_WRITE_DATA, CMD_I2C_WRITE_DATA_REPEATED_START, CMD_I2C_WRITE_DATA_NO_STOP):
+                self._i2c_write(buf, r)
+            elif cmd in (CMD_I2C_READ_DATA, CMD_I2C_READ_DATA_REPEATED_START):
+                self._i2c_read(buf, r)
+            elif cmd == CMD_I2C_READ_DATA_GET_I2C_DATA:
+                self._i2c_get_data(buf, r)
+            elif cmd == CMD_RESET_CHIP:
+                if buf[1:4] == bytes([RESET_CHIP_SURE, RESET_CHIP_VERY_SURE, RESET_CHIP_VERY_VERY_SURE]):
+                    self.resets += 1
+                    self.power_up()
+                    # the chip enumerates again: open handlers become stale
+                    self.generation += 1
+                return None
+            else:
+                r[RESPONSE_STATUS_BYTE] = 0x01
+
+            return r
+
+
+    #######################################################################
+    # Status and I2C engine
+    #######################################################################
+    def _byte_time(self):
+        return _I2C_BITS_PER_BYTE * (self.i2c_div + 2) / 12_000_000
+
+
+    def _poll_status(self, buf, r):
+        # Cancel current transfer
+        if buf[2] == I2C_CMD_CANCEL_CURRENT_TRANSFER:
+            if not self.i2c_used:
+                # Undocumented: cancel on a never used engine makes it stall.
+                self.i2c_state = I2C_ST_STOP_TOUT
+                r[2] = 0x10
+            elif self.i2c_state == I2C_ST_IDLE:
+                r[2] = 0x11
+            else:
+                r[2] = 0x10
+                self.i2c_xfer = None
+                self.i2c_buffer = b""
+                self.i2c_state = I2C_ST_IDLE
+                self.confused = False
+
+        # Set speed
+        if buf[3] == I2C_CMD_SET_BUS_SPEED:
+            if self.i2c_state == I2C_ST_IDLE:
+                self.i2c_div = buf[4]
+                r[I2C_POLL_RESP_NEWSPEED_STATUS] = 0x20
+                r[4] = buf[4]
+            else:
+                r[I2C_POLL_RESP_NEWSPEED_STATUS] = 0x21
+
+        r[I2C_POLL_RESP_STATUS]   = self.i2c_state
+        r[I2C_POLL_RESP_REQ_LEN_L] = self.i2c_rlen & 0xFF
+        r[I2C_POLL_RESP_REQ_LEN_H] = self.i2c_rlen >> 8
+        r[I2C_POLL_RESP_TX_LEN_L]  = self.i2c_txlen & 0xFF
+        r[I2C_POLL_RESP_TX_LEN_H]  = self.i2c_txlen >> 8
+        r[I2C_POLL_RESP_CLKDIV]    = self.i2c_div
+        r[I2C_POLL_RESP_UNDOCUMENTED_18] = 8 if self.confused else (0x10 if self.i2c_used else 0)
+        r[I2C_POLL_RESP_ACK]       = self.i2c_ack
+        r[I2C_POLL_RESP_UNDOCUMENTED_21] = 0x60 if self.i2c_used else 0
+        r[I2C_POLL_RESP_SCL]       = self.scl
+        r[I2C_POLL_RESP_SDA]       = self.sda
+        r[I2C_POLL_RESP_INT_FLAG]  = self.int_flag
+        r[I2C_POLL_RESP_HARD_MAYOR] = ord("A")
+        r[I2C_POLL_RESP_HARD_MINOR] = ord("6")
+        r[I2C_POLL_RESP_FIRM_MAYOR] = ord("1")
+        r[I2C_POLL_RESP_FIRM_MINOR] = ord("2")
+
+        for i, v in enumerate(self._adc_values()):
+            r[I2C_POLL_RESP_ADC_CH0_LSB + 2*i] = v & 0xFF
+            r[I2C_POLL_RESP_ADC_CH0_MSB + 2*i] = v >> 8
+
+
+    def _i2c_start(self, kind, addr, length, restart):
+        """ Begin a new transfer. Return True if accepted. """
+        self.i2c_used = True
+        self.i2c_rlen = length
+        self.i2c_txlen = 0
+        self.i2c_ack = 0
+
+        if not self.scl or not self.sda:
+            self.i2c_state = I2C_ST_START_TOUT
+            self.i2c_xfer = None
+            return
+
+        slave = self.slaves.get(addr)
+        acked = slave is not None and slave.begin(kind == "read", restart)
+
+        self.i2c_xfer = {
+            "kind": kind,
+            "addr": addr,
+            "slave": slave if acked else None,
+            "remaining": length,
+            "first": True,
+        }
+
+        if not acked:
+            # NACK is known after the address byte
+            self.i2c_state = I2C_ST_WRADDRL
+            self.i2c_xfer["nack_at"] = self.emulator.now() + self._byte_time()
+        else:
+            self.i2c_xfer["nack_at"] = None
+
+
+    def _i2c_update(self):
+        """ Let the I2C engine progress until now. """
+        x = self.i2c_xfer
+        if x is None:
+            return
+
+        now = self.emulator.now()
+
+        if x["nack_at"] is not None:
+            if now >= x["nack_at"]:
+                self.i2c_state = I2C_ST_WRADDRL_NACK_STOP
+                self.i2c_ack = 1 << 6
+                self.i2c_xfer = None
+            return
+
+        if self.i2c_state in (I2C_ST_WRITEDATA, I2C_ST_READDATA) and now >= self.i2c_busy_until:
+            if x["kind"] == "write":
+                x["slave"].write(x.pop("chunk"))
+                if x["remaining"] > 0:
+                    self.i2c_state = I2C_ST_WRITEDATA_WAITSEND
+                elif x["nostop"]:
+                    self.i2c_state = I2C_ST_WRITEDATA_END_NOSTOP
+                    self.i2c_xfer = None
+                else:
+                    x["slave"].end()
+                    self.i2c_state = I2C_ST_IDLE
+                    self.i2c_xfer = None
+            else:
+                n = min(I2C_CHUNK_SIZE, x["remaining"])
+                self.i2c_buffer = bytes(x["slave"].read(n))
+                x["remaining"] -= n
+                self.i2c_txlen += n
+                self.i2c_state = I2C_ST_READDATA_WAIT if x["remaining"] else I2C_ST_READDATA_WAITGET
+
+
+    def _i2c_write(self, buf, r):
+        cmd = buf[0]
+        length = buf[1] + (buf[2] << 8)
+        addr = buf[3] >> 1
+        state = self.i2c_state
+
+        continuation = (self.i2c_xfer is not None and
+                        self.i2c_xfer["kind"] == "write" and
+                        state == I2C_ST_WRITEDATA_WAITSEND)
+
+        if continuation:
+            pass
+        elif state == I2C_ST_IDLE and cmd in (CMD_I2C_WRITE_DATA, CMD_I2C_WRITE_DATA_NO_STOP, CMD_I2C_WRITE_DATA_REPEATED_START):
+            self._i2c_start("write", addr, length, restart = False)
+        elif state == I2C_ST_WRITEDATA_END_NOSTOP and cmd == CMD_I2C_WRITE_DATA_REPEATED_START:
+            self._i2c_start("write", addr, length, restart = True)
+        else:
+            r[RESPONSE_STATUS_BYTE] = 0x01
+            r[I2C_INTERNAL_STATUS_BYTE] = state
+            return
+
+        x = self.i2c_xfer
+        if x is None or x["nack_at"] is not None:
+            r[I2C_INTERNAL_STATUS_BYTE] = self.i2c_state
+            return
+
+        n = min(I2C_CHUNK_SIZE, x["remaining"])
+        chunk = buf[4:4+n]
+        x["chunk"] = chunk
+        x["nostop"] = (cmd == CMD_I2C_WRITE_DATA_NO_STOP)
+        bytes_on_bus = n + (1 if x["first"] else 0)
+        x["first"] = False
+        x["remaining"] -= n
+        self.i2c_txlen += n
+        self.i2c_busy_until = self.emulator.now() + bytes_on_bus * self._byte_time()
+        self.i2c_state = I2C_ST_WRITEDATA
+        r[I2C_INTERNAL_STATUS_BYTE] = self.i2c_state
+
+
+    def _i2c_read(self, buf, r):
+        cmd = buf[0]
+        length = buf[1] + (buf[2] << 8)
+        addr = buf[3] >> 1
+        state = self.i2c_state
+
+        if state == I2C_ST_IDLE:
+            self._i2c_start("read", addr, length, restart = cmd == CMD_I2C_READ_DATA_REPEATED_START)
+        elif state == I2C_ST_WRITEDATA_END_NOSTOP and cmd == CMD_I2C_READ_DATA_REPEATED_START:
+            self._i2c_start("read", addr, length, restart = True)
+        else:
+            r[RESPONSE_STATUS_BYTE] = 0x01
+            r[I2C_INTERNAL_STATUS_BYTE] = state
+            return
+
+        x = self.i2c_xfer
+        if x is not None and x["nack_at"] is None:
+            n = min(I2C_CHUNK_SIZE, x["remaining"])
+            self.i2c_busy_until = self.emulator.now() + (n + 1) * self._byte_time()
+            self.i2c_state = I2C_ST_READDATA
+
+        r[I2C_INTERNAL_STATUS_BYTE] = self.i2c_state
+
+
+    def _i2c_get_data(self, buf, r):
+        state = self.i2c_state
+        r[I2C_INTERNAL_STATUS_BYTE] = state
+
+        if state not in (I2C_ST_READDATA_WAIT, I2C_ST_READDATA_WAITGET):
+            r[RESPONSE_STATUS_BYTE] = 0x41
+            r[3] = 127
+            return
+
+        data = self.i2c_buffer
+        r[3] = len(data)
+        r[4:4+len(data)] = data
+        self.i2c_buffer = b""
+
+        x = self.i2c_xfer
+        if state == I2C_ST_READDATA_WAIT:
+            n = min(I2C_CHUNK_SIZE, x["remaining"])
+            self.i2c_busy_until = self.emulator.now() + n * self._byte_time()
+            self.i2c_state = I2C_ST_READDATA
+        else:
+            x["slave"].end()
+            self.i2c_xfer = None
+            self.i2c_state = I2C_ST_IDLE
+
+
+    #######################################################################
+    # GPIO, ADC, SRAM
+    #######################################################################
+    def _is_gpio(self, pin):
+        return self.gp[pin] & 0b111 == GPIO_FUNC_GPIO
+
+
+    def _adc_values(self):
+        values = []
+        for ch in range(3):
+            pin = ch + 1
+            if self._is_gpio(pin) and not self.gp[pin] & GPIO_DIR_IN:
+                values.append(1023 if self.gp[pin] & GPIO_OUT_VAL_1 else 0)
+            else:
+                values.append(self.analog[ch])
+        return values
+
+
+    def _set_gpio(self, buf, r):
+        for pin in range(4):
+            base = 2 + 4 * pin
+            alter_out, out, alter_dir, direction = buf[base:base+4]
+            r[base:base+4] = [alter_out, out, alter_dir, direction]
+
+            if not self._is_gpio(pin):
+                if alter_out or alter_dir:
+                    r[base+1] = 0xEE
+                    r[base+3] = 0xEE
+                continue
+
+            if alter_out:
+                if out:
+                    self.gp[pin] |= GPIO_OUT_VAL_1
+                else:
+                    self.gp[pin] &= ~GPIO_OUT_VAL_1 & 0xFF
+            if alter_dir:
+                if direction:
+                    self.gp[pin] |= GPIO_DIR_IN
+                else:
+                    self.gp[pin] &= ~GPIO_DIR_IN & 0xFF
+
+
+    def _get_gpio(self, buf, r):
+        for pin in range(4):
+            if not self._is_gpio(pin):
+                r[2 + 2*pin] = 0xEE
+                r[3 + 2*pin] = 0xEE
+            elif self.gp[pin] & GPIO_DIR_IN:
+                r[2 + 2*pin] = 1 if self.inputs[pin] else 0
+                r[3 + 2*pin] = DIR_INPUT
+            else:
+                r[2 + 2*pin] = 1 if self.gp[pin] & GPIO_OUT_VAL_1 else 0
+                r[3 + 2*pin] = DIR_OUTPUT
+
+
+    def _set_sram(self, buf, r):
+        if buf[2] & ALTER_CLK_OUTPUT:
+            self.sram_clock = buf[2] & 0x7F
+        if buf[3] & ALTER_DAC_REF:
+            self.dac_ref = buf[3] & 0b111
+        if buf[4] & ALTER_DAC_VALUE:
+            self.dac_value = buf[4] & 0b11111
+        if buf[5] & ALTER_ADC_REF:
+            self.adc_ref = buf[5] & 0b111
+        if buf[6] & ALTER_INT_CONF:
+            if buf[6] & 0b10000:
+                pos = (buf[6] >> 3) & 0b11 == 0b11
+                neg = (buf[6] >> 1) & 0b11 == 0b11
+                self.ioc = (0b01 if pos else 0) | (0b10 if neg else 0)
+            if buf[6] & INT_FLAG_CLEAR:
+                self.int_flag = 0
+        if buf[7] & ALTER_GPIO_CONF:
+            self.gp = list(buf[8:12])
+            # Datasheet, section 1.8: new GPIO settings reinitialize the Vrm.
+            if self.dac_ref & DAC_REF_VRM or self.adc_ref & ADC_REF_VRM:
+                self.vrm_resets += 1
+            if self.dac_ref & DAC_REF_VRM:
+                self.dac_ref = DAC_REF_VRM | DAC_VRM_OFF
+            if self.adc_ref & ADC_REF_VRM:
+                self.adc_ref = ADC_REF_VRM | ADC_VRM_OFF
+
+
+    def _get_sram(self, buf, r):
+        r[4] = self.flash_chip[FLASH_CHIP_SETTINGS_CDCSEC]
+        r[5] = self.sram_clock
+        r[6] = (self.dac_ref << 5) | self.dac_value
+        r[7] = (self.ioc << 5) | (self.adc_ref << 2)
+        r[8:14] = self.flash_chip[FLASH_CHIP_SETTINGS_LVID:FLASH_CHIP_SETTINGS_USBMA+1]
+        r[22:26] = self.gp
+
+
+    #######################################################################
+    # Flash
+    #######################################################################
+    def _read_flash(self, buf, r):
+        sub = buf[1]
+        if sub == FLASH_DATA_CHIP_SETTINGS:
+            r[2] = len(self.flash_chip)
+            r[4:4+len(self.flash_chip)] = self.flash_chip
+        elif sub == FLASH_DATA_GP_SETTINGS:
+            r[2] = 4
+            r[4:8] = self.flash_gp
+        elif sub in self.strings:
+            s = self.strings[sub].encode("utf-16-le")
+            r[2] = len(s) + 2
+            r[3] = 0x03
+            r[4:4+len(s)] = s
+        elif sub == FLASH_DATA_CHIP_SERIALNUM:
+            s = self.factory_serial.encode("ascii")
+            r[2] = len(s)
+            r[4:4+len(s)] = s
+        else:
+            r[RESPONSE_STATUS_BYTE] = 0x01
+
+
+    def _write_flash(self, buf, r):
+        sub = buf[1]
+        if sub == FLASH_DATA_CHIP_SETTINGS:
+            self.flash_chip = list(buf[2:12])
+        elif sub == FLASH_DATA_GP_SETTINGS:
+            self.flash_gp = list(buf[2:6])
+        elif sub in self.strings:
+            length = buf[2] - 2
+            self.strings[sub] = bytes(buf[4:4+length]).decode("utf-16-le")
+            if sub == FLASH_DATA_USB_SERIALNUM:
+                self.usb_serial = self.strings[sub]
+        else:
+            r[RESPONSE_STATUS_BYTE] = 0x01
+
+
+
+#######################################################################
+# Virtual I2C slaves
+#######################################################################
+class I2CSlave:
+    """ Base class for virtual I2C slaves.
+
+    Parameters:
+        addr (int): I2C 7-bit address.
+    """
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.chip = None
+
+    def begin(self, read, restart):
+        """ Address phase. Return True to acknowledge. """
+        return True
+
+    def write(self, data):
+        """ Data bytes written by the master. """
+
+    def read(self, n):
+        """ Return ``n`` bytes for the master. """
+        return bytes(n)
+
+    def end(self):
+        """ Stop condition. """
+
+
+
+class EEPROM(I2CSlave):
+    """ 24LCxx serial EEPROM.
+
+    Parameters:
+        addr (int, optional): I2C address. Default 0x50.
+        size (int, optional): Memory size in bytes. Default 16384 (24LC128).
+        page (int, optional): Page size in bytes. Default 64.
+        addr_bytes (int, optional): Bytes of the memory address. Default 2.
+        write_time (float, optional): Write cycle time in seconds. The chip does not
+            acknowledge while writing. Default 5 ms.
+    """
+
+    def __init__(self, addr = 0x50, size = 16384, page = 64, addr_bytes = 2, write_time = 0.005):
+        super().__init__(addr)
+        self.memory = bytearray(b"\xff" * size)
+        self.page = page
+        self.addr_bytes = addr_bytes
+        self.write_time = write_time
+        self.pointer = 0
+        self.busy_until = 0
+        self._addr = None
+        self._pending = None
+
+
+    def begin(self, read, restart):
+        if self.chip.emulator.now() < self.busy_until:
+            return False
+        if not read:
+            self._addr = b""
+            self._pending = []
+        return True
+
+
+    def write(self, data):
+        for b in data:
+            if len(self._addr) < self.addr_bytes:
+                self._addr += bytes([b])
+                if len(self._addr) == self.addr_bytes:
+                    self.pointer = int.from_bytes(self._addr, "big") % len(self.memory)
+            else:
+                self._pending.append(b)
+
+
+    def read(self, n):
+        data = bytearray()
+        for _ in range(n):
+            data.append(self.memory[self.pointer])
+            self.pointer = (self.pointer + 1) % len(self.memory)
+        return data
+
+
+    def end(self):
+        if self._pending:
+            base = self.pointer - self.pointer % self.page
+            offset = self.pointer % self.page
+            for b in self._pending:
+                self.memory[base + offset] = b
+                offset = (offset + 1) % self.page
+            self.pointer = base + offset
+            self.busy_until = self.chip.emulator.now() + self.write_time
+        self._pending = None
+
+
+
+class ADS1115(I2CSlave):
+    """ ADS1115 16-bit ADC.
+
+    Set the input voltages through the ``voltages`` attribute (AIN0 to AIN3).
+
+    Parameters:
+        addr (int, optional): I2C address. Default 0x48.
+    """
+
+    PGA = (6.144, 4.096, 2.048, 1.024, 0.512, 0.256, 0.256, 0.256)
+
+    def __init__(self, addr = 0x48):
+        super().__init__(addr)
+        self.voltages = [0.0, 0.0, 0.0, 0.0]
+        self.registers = [0x0000, 0x8583, 0x8000, 0x7FFF]
+        self.pointer = 0
+        self._data = b""
+
+
+    def begin(self, read, restart):
+        self._data = b""
+        return True
+
+
+    def write(self, data):
+        self._data += bytes(data)
+        if len(self._data) >= 1:
+            self.pointer = self._data[0] & 0b11
+        if len(self._data) >= 3:
+            value = (self._data[1] << 8) | self._data[2]
+            if self.pointer == 1:
+                self.registers[1] = value & 0x7FFF
+                if value & 0x8000:
+                    self.registers[0] = self._convert()
+            elif self.pointer != 0:
+                self.registers[self.pointer] = value
+
+
+    def _convert(self):
+        config = self.registers[1]
+        mux = (config >> 12) & 0b111
+        fsr = self.PGA[(config >> 9) & 0b111]
+        v = self.voltages
+        diff = ((v[0] - v[1]), (v[0] - v[3]), (v[1] - v[3]), (v[2] - v[3]),
+                v[0], v[1], v[2], v[3])[mux]
+        code = int(round(diff / fsr * 32768))
+        code = max(-32768, min(32767, code))
+        return code & 0xFFFF
+
+
+    def read(self, n):
+        if self.pointer == 0 and not (self.registers[1] & 0x0100):
+            # Continuous conversion mode
+            self.registers[0] = self._convert()
+        value = self.registers[self.pointer]
+        if self.pointer == 1:
+            value |= 0x8000   # conversion done
+        data = bytes([value >> 8, value & 0xFF])
+        return (data * (n // 2 + 1))[:n]
+
+
+
+class PCF8591(I2CSlave):
+    """ PCF8591 8-bit ADC/DAC.
+
+    Set the input voltages as raw 8-bit values through the ``inputs`` attribute.
+    Read the analog output value from ``dac``.
+
+    Parameters:
+        addr (int, optional): I2C address. Default 0x48.
+    """
+
+    def __init__(self, addr = 0x48):
+        super().__init__(addr)
+        self.inputs = [0, 0, 0, 0]
+        self.control = 0
+        self.dac = 0
+        self.last = 0x80
+        self._first = True
+
+
+    def begin(self, read, restart):
+        self._first = True
+        return True
+
+
+    def write(self, data):
+        for b in data:
+            if self._first:
+                self.control = b
+                self._first = False
+            else:
+                self.dac = b
+
+
+    def read(self, n):
+        data = bytearray()
+        for _ in range(n):
+            data.append(self.last)
+            channel = self.control & 0b11
+            self.last = self.inputs[channel] & 0xFF
+            if self.control & 0b100:
+                self.control = (self.control & ~0b11) | ((channel + 1) & 0b11)
+        return data
@@ -0,0 +1,116 @@
+""" On-disk cache of MCP2221 flash settings.
+
+Flash contents rarely change, but :func:`EasyMCP2221.Device.read_flash_info` needs six USB commands
+to read them. With a cache, only the factory serial number is read (one command) and the rest
+is taken from a JSON file, indexed by that serial number and the USB path. Many chips share
+the same factory serial number, so it is not enough to tell them apart. Cached USB strings are also
+checked against the ones reported in the USB enumeration.
+
+Pass ``flash_cache = True`` to :class:`EasyMCP2221.Device` to use the default file, or a path
+to use another one.
+
+Note:
+    Only flash writes done by this library (:func:`EasyMCP2221.Device.save_config`) update the cache.
+    If the flash is changed with other tools, remove the cache file or call :func:`FlashCache.clear`.
+"""
+import json
+import os
+import threading
+
+
+def default_path():
+    """ Default cache file, in the user cache directory.
+
+    ``%LOCALAPPDATA%\\EasyMCP2221\\flash.json`` on Windows, ``$XDG_CACHE_HOME/EasyMCP2221/flash.json``
+    or ``~/.cache/EasyMCP2221/flash.json`` elsewhere.
+    """
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        root = os.environ["LOCALAPPDATA"]
+    else:
+        root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+    return os.path.join(root, "EasyMCP2221", "flash.json")
+
+
+
+class FlashCache:
+    """ Raw flash data of every chip seen, indexed by factory serial number and USB path.
+
+    The file is read once and rewritten on every change. Errors reading or writing
+    it are ignored: the cache is just not used.
+
+    Parameters:
+        path (str, optional): cache file. Default is :func:`default_path`.
+    """
+
+    def __init__(self, path = None):
+        self.path = path or default_path()
+        self.lock = threading.Lock()
+        self.entries = None
+
+
+    def _load(self):
+        if self.entries is not None:
+            return
+
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+
+    def _save(self):
+        tmp = "%s.%d.tmp" % (self.path, os.getpid())
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok = True)
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent = 1, sort_keys = True)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+    def get(self, key):
+        """ Return the cached responses for a chip, or ``None``.
+
+        Parameters:
+            key (str): factory serial number and USB path of the chip.
+
+        Return:
+            dict: section name to response (list of bytes).
+        """
+        with self.lock:
+            self._load()
+            entry = self.entries.get(key)
+
+        if entry is None:
+            return None
+
+        return {section: list(bytes.fromhex(data)) for section, data in entry.items()}
+
+
+    def put(self, key, data):
+        """ Store the responses read from a chip. """
+        entry = {section: bytes(r).hex() for section, r in data.items()}
+
+        with self.lock:
+            self._load()
+            self.entries[key] = entry
+            self._save()
+
+
+    def invalidate(self, key):
+        """ Forget a chip. """
+        with self.lock:
+            self._load()
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+
+    def clear(self):
+        """ Forget all chips. """
+        with self.lock:
+            self.entries = {}
+            self._save()
@@ -0,0 +1,154 @@
+""" Direct Linux hidraw backend.
+
+Talk to ``/dev/hidrawN`` with plain ``os.write`` and ``os.readv`` calls, without hidapi.
+It avoids hidapi's reader thread and intermediate copies, which is noticeable on slow
+hosts like ARM gateways. Responses are read into a pre-allocated buffer.
+
+It has the same interface as the ``hid`` module. Pass it with the ``transport`` parameter:
+
+Example:
+    >>> import EasyMCP2221
+    >>> from EasyMCP2221 import hidraw
+    >>> mcp = EasyMCP2221.Device(transport = hidraw)
+
+Note:
+    Linux only. The user needs read and write permission on ``/dev/hidrawN``
+    (see the udev rules in the installation section).
+"""
+import os
+import select
+
+from .Constants import PACKET_SIZE
+
+SYSFS_ROOT = "/sys/class/hidraw"
+DEV_ROOT   = "/dev"
+
+
+def _uevent(name):
+    """ Parse the uevent file of a hidraw node into a dictionary. """
+    values = {}
+
+    with open(os.path.join(SYSFS_ROOT, name, "device", "uevent")) as f:
+        for line in f:
+            key, _, value = line.rstrip("\n").partition("=")
+            values[key] = value
+
+    return values
+
+
+def enumerate(vendor_id = 0, product_id = 0):
+    """ Same as ``hid.enumerate``. List hidraw devices matching VID and PID (0 matches any).
+
+    Only the fields used by :class:`EasyMCP2221.Device` and a few informative ones are filled.
+    """
+    try:
+        names = os.listdir(SYSFS_ROOT)
+    except FileNotFoundError:
+        return []
+
+    # Stable order: hidraw2 before hidraw10
+    names = sorted((n for n in names if n.startswith("hidraw")), key = lambda n: int(n[6:] or 0))
+
+    devices = []
+    for name in names:
+        try:
+            info = _uevent(name)
+            bus, vid, pid = info["HID_ID"].split(":")
+        except (OSError, KeyError, ValueError):
+            continue
+
+        vid = int(vid, 16)
+        pid = int(pid, 16)
+
+        if vendor_id and vendor_id != vid:
+            continue
+        if product_id and product_id != pid:
+            continue
+
+        phys = info.get("HID_PHYS", "")
+        interface = phys.rpartition("/input")[2]
+
+        devices.append({
+            "path": os.path.join(DEV_ROOT, name).encode(),
+            "vendor_id": vid,
+            "product_id": pid,
+            "serial_number": info.get("HID_UNIQ", ""),
+            "product_string": info.get("HID_NAME", ""),
+            "interface_number": int(interface) if interface.isdigit() else -1,
+        })
+
+    return devices
+
+
+def device():
+    """ Same as ``hid.device``. Return an unopened :class:`HidrawDevice`. """
+    return HidrawDevice()
+
+
+
+class HidrawDevice:
+    """ Open hidraw node. """
+
+    def __init__(self):
+        self.fd = None
+        self.buffer = bytearray(PACKET_SIZE)
+        self.poller = None
+
+
+    def open_path(self, path):
+        if isinstance(path, bytes):
+            path = path.decode()
+
+        self.fd = os.open(path, os.O_RDWR | getattr(os, "O_CLOEXEC", 0))
+        self.poller = select.poll()
+        self.poller.register(self.fd, select.POLLIN)
+
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+    def write(self, data):
+        """ Write a report. First byte is the report number (0 for MCP2221). """
+        if self.fd is None:
+            raise ValueError("not open")
+
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+
+        return os.write(self.fd, data)
+
+
+    def readinto(self, buffer, timeout_ms = -1):
+        """ Read a report into ``buffer``. Return its length, or 0 on timeout.
+
+        Used by :func:`EasyMCP2221.Device.send_cmd` to avoid allocating a new response.
+        """
+        if self.fd is None:
+            raise ValueError("not open")
+
+        if timeout_ms is not None and timeout_ms >= 0:
+            if not self.poller.poll(timeout_ms):
+                return 0
+
+        return os.readv(self.fd, [buffer])
+
+
+    def read(self, max_length, timeout_ms = -1):
+        """ Read a report. Return an empty list on timeout, like hidapi.
+
+        The result is a copy of the internal buffer, callers may keep it.
+        """
+        if self.fd is None:
+            raise ValueError("not open")
+
+        if timeout_ms is not None and timeout_ms >= 0:
+            if not self.poller.poll(timeout_ms):
+                return []
+
+        with memoryview(self.buffer) as view:
+            n = os.readv(self.fd, [view[:max_length]])
+
+        return self.buffer[:n]
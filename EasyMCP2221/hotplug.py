@@ -0,0 +1,188 @@
+""" Reconnect devices after a USB disconnection.
+
+If a chip re-enumerates after a USB glitch, its handler becomes stale and every command raises ``OSError``.
+:class:`HotplugMonitor` polls the USB enumeration in a background thread and checks the handler of idle
+devices with a status command. When a watched device disappears and then comes back, even at the same path,
+it is found by its USB serial number, reopened with :func:`EasyMCP2221.Device.reconnect` and its run-time
+settings are restored before the next command.
+
+Example:
+    >>> from EasyMCP2221.hotplug import HotplugMonitor
+    >>> mcp = EasyMCP2221.Device()
+    >>> mcp.set_pin_function(gp2 = "ADC")
+    >>> monitor = HotplugMonitor([mcp], on_reconnected = lambda mcp: print("Back:", mcp.usbpath))
+    >>> monitor.start()
+    >>> # unplug and plug the device
+    Back: b'1-2:1.2'
+    >>> mcp.ADC_read()
+    (0, 512, 1023)
+
+Note:
+    Devices with the same USB serial number cannot be told apart. Give each one a different
+    serial number if several of them are watched.
+"""
+import threading
+
+from .Constants import CMD_POLL_STATUS_SET_PARAMETERS
+from .MCP2221 import Device
+
+
+class HotplugMonitor:
+    """ Watch devices and reconnect them when they come back.
+
+    A device is lost when its path leaves the USB enumeration or when its handler fails
+    (``OSError``) while the path is still there. In both cases, it is reconnected as soon as
+    a device with the same USB serial number is present.
+
+    A chip that re-enumerates at the same path between two checks keeps its path in the enumeration.
+    To notice it, every check sends a status command to the devices that are not in use at that moment
+    (if ``probe`` is enabled). A stale handler fails and the device is reconnected right away.
+
+    Parameters:
+        devices (list of Device, optional): devices to watch. Default is all the devices opened so far.
+        interval (float, optional): seconds between checks. Default is 0.5.
+        on_removed (callable, optional): called with the device when it is lost.
+        on_reconnected (callable, optional): called with the device after it is reconnected.
+        probe (bool, optional): check idle devices with a status command. Default is ``True``.
+    """
+
+    def __init__(self, devices = None, interval = 0.5, on_removed = None, on_reconnected = None, probe = True):
+        self.interval = interval
+        self.on_removed = on_removed
+        self.on_reconnected = on_reconnected
+        self.probe = probe
+
+        self.devices = []
+        self.removed = set()
+        # Reentrant: callbacks may call watch() or unwatch()
+        self.lock = threading.RLock()
+        self.thread = None
+        self.stop_event = threading.Event()
+
+        for mcp in (list(Device._catalog.values()) if devices is None else devices):
+            self.watch(mcp)
+
+
+    def watch(self, mcp):
+        """ Start watching a device. Its USB serial number is read now if not known yet. """
+        mcp.usbserial  # needed to find it later
+
+        with self.lock:
+            if mcp not in self.devices:
+                self.devices.append(mcp)
+
+
+    def unwatch(self, mcp):
+        """ Stop watching a device. """
+        with self.lock:
+            if mcp in self.devices:
+                self.devices.remove(mcp)
+            self.removed.discard(mcp)
+
+
+    def start(self):
+        """ Check periodically in a background thread. """
+        self.stop_event.clear()
+        self.thread = threading.Thread(target = self._run, name = "EasyMCP2221-hotplug", daemon = True)
+        self.thread.start()
+
+
+    def stop(self):
+        """ Stop the background thread. """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                pass  # try again next time
+
+
+    def _handler_works(self, mcp):
+        """ Send a status command to an idle device. Return ``False`` if its handler is stale. """
+        # In use by another thread: it will notice
+        if not mcp._lock.acquire(blocking = False):
+            return True
+
+        try:
+            mcp.send_cmd([CMD_POLL_STATUS_SET_PARAMETERS])
+        except OSError:
+            return False
+        finally:
+            mcp._lock.release()
+
+        return True
+
+
+    def poll(self):
+        """ Check all watched devices once. Return the list of devices reconnected. """
+        with self.lock:
+            return self._poll(list(self.devices))
+
+
+    def _poll(self, devices):
+        groups = {}
+        for mcp in devices:
+            groups.setdefault((mcp.transport, mcp.parm_VID, mcp.parm_PID), []).append(mcp)
+
+        reconnected = []
+
+        for (transport, VID, PID), group in groups.items():
+            enumeration = Device._enumerate(transport, VID, PID, refresh = True)
+            paths = [device["path"] for device in enumeration]
+
+            for mcp in group:
+                if mcp in self.removed:
+                    continue
+
+                if (mcp.usbpath not in paths or mcp.status["usb_error"] or
+                        (self.probe and not self._handler_works(mcp))):
+                    self.removed.add(mcp)
+                    if self.on_removed:
+                        self.on_removed(mcp)
+
+            missing = [mcp for mcp in group if mcp in self.removed]
+            if not missing:
+                continue
+
+            # Paths not in use by devices that are working
+            owned = {path for path, obj in Device._catalog.items() if obj not in self.removed}
+
+            for device in enumeration:
+                if device["path"] in owned:
+                    continue
+
+                serial = device.get("serial_number") or Device._probe_serial(transport, device["path"], 1000)
+
+                for mcp in missing:
+                    if mcp.usbserial != serial:
+                        continue
+
+                    try:
+                        mcp.reconnect(device["path"])
+                    except Exception:
+                        continue
+
+                    self.removed.discard(mcp)
+                    missing.remove(mcp)
+                    reconnected.append(mcp)
+
+                    if self.on_reconnected:
+                        self.on_reconnected(mcp)
+                    break
+
+        return reconnected
@@ -0,0 +1,167 @@
+""" Drive many MCP2221 devices in parallel.
+
+:class:`DevicePool` opens all the devices with the given VID/PID (or a list of USB serial numbers)
+and gives each one its own worker thread. USB host controllers can serve several devices
+in the same frame, so running the same operation on all of them takes about the same time
+as running it on one.
+"""
+import concurrent.futures
+
+import hid
+
+from .Constants import DEV_DEFAULT_VID, DEV_DEFAULT_PID
+from .MCP2221 import Device
+
+
+class DevicePool:
+    """ A group of :class:`EasyMCP2221.Device` with one worker thread each.
+
+    Parameters:
+        VID (int, optional): Vendor Id (default is ``0x04D8``)
+        PID (int, optional): Product Id (default is ``0x00DD``)
+        usbserials (list of str, optional): Open only these devices, in this order.
+            Default is all devices found with ``VID`` and ``PID``.
+        **kwargs: other parameters for :class:`EasyMCP2221.Device` (e.g. ``read_timeout``).
+
+    Raises:
+        RuntimeError: if no device found or some device cannot be opened.
+
+    Example:
+        >>> from EasyMCP2221.pool import DevicePool
+        >>> pool = DevicePool()
+        >>> len(pool)
+        4
+        >>> results, errors = pool.broadcast("ADC_read")
+        >>> results
+        [(0, 512, 1023), (0, 515, 1023), (0, 509, 1023), None]
+        >>> errors
+        [None, None, None, RuntimeError('ADC read error.')]
+    """
+
+    def __init__(self, VID = DEV_DEFAULT_VID, PID = DEV_DEFAULT_PID, usbserials = None, **kwargs):
+        if usbserials is None:
+            transport = kwargs.get("transport") or hid
+            count = len(Device._enumerate(transport, VID, PID))
+
+            if not count:
+                raise RuntimeError("No devices found with VID %04X and PID %04X." % (VID, PID))
+
+            self.devices = [Device(VID, PID, devnum = i, **kwargs) for i in range(count)]
+
+        else:
+            self.devices = [Device(VID, PID, usbserial = s, **kwargs) for s in usbserials]
+
+        self.workers = [
+            concurrent.futures.ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "EasyMCP2221-%d" % i)
+            for i in range(len(self.devices))]
+
+
+    def __len__(self):
+        return len(self.devices)
+
+
+    def __getitem__(self, index):
+        return self.devices[index]
+
+
+    def __iter__(self):
+        return iter(self.devices)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def close(self):
+        """ Stop the worker threads after their pending work. Devices remain open. """
+        for worker in self.workers:
+            worker.shutdown(wait = True)
+
+
+    def submit(self, index, func, *args, **kwargs):
+        """ Run a function in the worker thread of one device.
+
+        Calls to the same device run in order.
+
+        Parameters:
+            index (int): device position in the pool.
+            func (str or callable): name of a :class:`EasyMCP2221.Device` method, or
+                a callable receiving the device as first argument.
+            *args, **kwargs: other arguments for the function.
+
+        Return:
+            concurrent.futures.Future
+        """
+        mcp = self.devices[index]
+
+        if isinstance(func, str):
+            return self.workers[index].submit(getattr(mcp, func), *args, **kwargs)
+        else:
+            return self.workers[index].submit(func, mcp, *args, **kwargs)
+
+
+    def _gather(self, futures):
+        """ Wait for all futures. Return results and errors lists. """
+        results = [None] * len(futures)
+        errors  = [None] * len(futures)
+
+        for i, future in enumerate(futures):
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                errors[i] = e
+
+        return results, errors
+
+
+    def broadcast(self, func, *args, **kwargs):
+        """ Run the same function with the same arguments on all devices in parallel.
+
+        Parameters:
+            func (str or callable): name of a :class:`EasyMCP2221.Device` method, or
+                a callable receiving the device as first argument.
+            *args, **kwargs: other arguments for the function.
+
+        Return:
+            tuple: list of results and list of errors, in device order.
+            For each device, either the result or the error is ``None``.
+
+        Example:
+            Write the same image to the EEPROM of every device:
+
+            >>> def program(mcp, image):
+            ...     for pos in range(0, len(image), 64):
+            ...         mcp.I2C_write(0x50, pos.to_bytes(2, "big") + image[pos:pos+64])
+            ...         time.sleep(0.005)
+            >>> results, errors = pool.broadcast(program, image)
+        """
+        return self._gather([self.submit(i, func, *args, **kwargs) for i in range(len(self))])
+
+
+    def map(self, func, args_list):
+        """ Run a function on all devices in parallel, with different arguments for each one.
+
+        Parameters:
+            func (str or callable): name of a :class:`EasyMCP2221.Device` method, or
+                a callable receiving the device as first argument.
+            args_list (list of tuple): positional arguments for each device, in device order.
+
+        Return:
+            tuple: list of results and list of errors, in device order.
+
+        Raises:
+            ValueError: if ``args_list`` length is not the number of devices.
+
+        Example:
+            >>> results, errors = pool.map("DAC_write", [(0,), (10,), (20,), (31,)])
+        """
+        args_list = list(args_list)
+
+        if len(args_list) != len(self):
+            raise ValueError("Expected %d argument tuples, got %d." % (len(self), len(args_list)))
+
+        return self._gather([self.submit(i, func, *args) for i, args in enumerate(args_list)])
@@ -3,6 +3,87 @@ import EasyMCP2221
 
 I2C_SMBUS_BLOCK_MAX = 255  # len is one byte only
 
+I2C_M_RD = 0x0001  # read message flag
+
+class i2c_msg(object):
+
+    """ Single I2C message for :func:`SMBus.i2c_rdwr`. Compatible with ``smbus2.i2c_msg``.
+
+    Do not create it directly, use :func:`read` and :func:`write` instead.
+
+    Example:
+
+        .. code-block:: python
+
+            from EasyMCP2221 import SMBus, i2c_msg
+
+            bus = SMBus()
+
+            # Read 64 bytes from EEPROM position 0
+            write = i2c_msg.write(0x50, [0, 0])
+            read  = i2c_msg.read(0x50, 64)
+            bus.i2c_rdwr(write, read)
+
+            print(bytes(read))
+    """
+
+    def __init__(self, addr, flags, buf):
+        self.addr  = addr
+        self.flags = flags
+        self.buf   = bytes(buf)
+
+
+    @property
+    def len(self):
+        """ Message length. """
+        return len(self.buf)
+
+
+    def __iter__(self):
+        return iter(self.buf)
+
+
+    def __bytes__(self):
+        return self.buf
+
+
+    def __repr__(self):
+        return "i2c_msg(%d,%d,%r)" % (self.addr, self.flags, self.buf)
+
+
+    @staticmethod
+    def read(address, length):
+        """
+        Prepares an i2c read transaction.
+
+        :param address: Slave address.
+        :type address: int
+        :param length: Number of bytes to read.
+        :type length: int
+        :return: New :class:`i2c_msg` instance for read operation.
+        :rtype: :class:`i2c_msg`
+        """
+        return i2c_msg(address, I2C_M_RD, bytes(length))
+
+
+    @staticmethod
+    def write(address, buf):
+        """
+        Prepares an i2c write transaction.
+
+        :param address: Slave address.
+        :type address: int
+        :param buf: Bytes to write. Either list of values or str.
+        :type buf: list
+        :return: New :class:`i2c_msg` instance for write operation.
+        :rtype: :class:`i2c_msg`
+        """
+        if type(buf) == str:
+            buf = [ord(c) for c in buf]
+
+        return i2c_msg(address, 0, buf)
+
+
 class SMBus(object):
 
     """ Initialize and open an I2C bus connection. See :class:`EasyMCP2221.Device` initialization for details.
@@ -50,17 +131,10 @@ class SMBus(object):
 
     def _read_register(self, addr, register, length = 1, reg_bytes = 1, reg_byteorder = 'big'):
         """ Generic read from a register. See description in I2C_Slave class. """
-        self.mcp.I2C_write(
+        return self.mcp.I2C_write_read(
             addr,
             register.to_bytes(reg_bytes, byteorder = reg_byteorder),
-            kind = 'nonstop')
-
-        data = self.mcp.I2C_read(
-            addr,
-            length,
-            kind = 'restart')
-
-        return data
+            length)
 
 
     def _read(self, addr, length = 1):
@@ -227,9 +301,7 @@ class SMBus(object):
         :rtype: int
         """
         data = pack("h", value)
-        self.mcp.I2C_write(i2c_addr, register + data, kind = 'nonstop')
-
-        data = self.mcp.I2C_read(i2c_addr, length = 2, kind = 'restart')
+        data = self.mcp.I2C_write_read(i2c_addr, bytes([register]) + data, 2)
         return unpack("h", data)[0]
 
 
@@ -289,9 +361,7 @@ class SMBus(object):
         :rtype: list
         """
         length = len(data)
-        self.mcp.I2C_write(i2c_addr, register + bytes([length]) + data, kind = 'nonstop')
-
-        out = self.mcp.I2C_read(i2c_addr, length = I2C_SMBUS_BLOCK_MAX, kind = 'restart')
+        out = self.mcp.I2C_write_read(i2c_addr, bytes([register, length]) + bytes(data), I2C_SMBUS_BLOCK_MAX)
         length = out[0]
         return out[1:1+length]
 
@@ -337,3 +407,48 @@ class SMBus(object):
             raise ValueError("Data length cannot exceed %d bytes" % I2C_SMBUS_BLOCK_MAX)
 
         self._write_register(i2c_addr, register, data)
+
+
+    def i2c_rdwr(self, *i2c_msgs):
+        """
+        Combine a series of i2c read and write operations in a single
+        transaction (with repeated start bits but no stop bits in between).
+
+        MCP2221 cannot send a repeated start after a write that is not the first message.
+        In that case, a stop is sent after the write and the next message begins with a new start.
+
+        Messages are sent back-to-back using :func:`EasyMCP2221.Device.I2C_transaction`.
+
+        :param i2c_msgs: One or more i2c_msg class instances.
+        :type i2c_msgs: i2c_msg
+        :rtype: None
+        """
+        segments = []
+        stopped = True  # bus is free before the first message
+
+        for n, msg in enumerate(i2c_msgs):
+            last = n == len(i2c_msgs) - 1
+
+            if msg.flags & I2C_M_RD:
+                kind = "regular" if stopped else "restart"
+                segments.append(("read", msg.addr, msg.len, kind))
+                stopped = True
+
+            else:
+                if stopped:
+                    kind = "regular" if last else "nonstop"
+                    stopped = last
+                else:
+                    kind = "restart"
+                    stopped = True
+                segments.append(("write", msg.addr, msg.buf, kind))
+
+        results, errors = self.mcp.I2C_transaction(segments)
+
+        for error in errors:
+            if error is not None:
+                raise error
+
+        for msg, data in zip(i2c_msgs, results):
+            if msg.flags & I2C_M_RD:
+                msg.buf = data
@@ -0,0 +1,178 @@
+""" USB command statistics for :class:`EasyMCP2221.Device`.
+
+Enable them with ``collect_stats = True`` and read them with :func:`EasyMCP2221.Device.stats`.
+"""
+from . import Constants
+
+# Command code to name, e.g. 0x10 -> "CMD_POLL_STATUS_SET_PARAMETERS"
+CMD_NAMES = {value: name for name, value in vars(Constants).items() if name.startswith("CMD_")}
+
+
+class Histogram:
+    """ Latency histogram with logarithmic buckets (HDR style).
+
+    Values are integers (microseconds). Each power of two is split into 16 linear sub-buckets,
+    so the error of any reported value is below 6.25% of the value. Values below 32 are exact.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count   = 0
+        self.total   = 0
+        self.min     = None
+        self.max     = None
+
+
+    @staticmethod
+    def _index(value):
+        """ Bucket index for a value. """
+        if value < 32:
+            return value
+
+        # keep 5 significant bits
+        shift = value.bit_length() - 5
+        return (shift << 4) + (value >> shift)
+
+
+    @staticmethod
+    def _lowest(index):
+        """ Lowest value that falls into a bucket. """
+        if index < 32:
+            return index
+
+        shift = (index >> 4) - 1
+        return (index - (shift << 4)) << shift
+
+
+    def record(self, value):
+        """ Add a value to the histogram. """
+        index = self._index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+        self.count += 1
+        self.total += value
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+
+    def percentile(self, p):
+        """ Value below which ``p`` percent of the samples fall. ``None`` if empty. """
+        if not self.count:
+            return None
+
+        target = self.count * p / 100
+        seen = 0
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(max(self._lowest(index), self.min), self.max)
+
+        return self.max
+
+
+    def summary(self):
+        """ Dictionary with min, mean, p50, p90, p99 and max values. """
+        if not self.count:
+            return {}
+
+        return {
+            "min"  : self.min,
+            "mean" : round(self.total / self.count),
+            "p50"  : self.percentile(50),
+            "p90"  : self.percentile(90),
+            "p99"  : self.percentile(99),
+            "max"  : self.max,
+        }
+
+
+
+class CommandStats:
+    """ Counters for a single command code. """
+
+    def __init__(self):
+        self.count     = 0  # commands sent
+        self.retries   = 0  # re-sent after a failure
+        self.failures  = 0  # raised an exception (USB error or timeout)
+        self.rejected  = 0  # response status not OK (e.g. I2C engine busy)
+        self.bytes_out = 0  # I2C data accepted by write commands
+        self.bytes_in  = 0  # I2C data received in get data responses
+        self.latency   = Histogram()
+
+
+
+class Stats:
+    """ Collect per-command counters and latency histograms of :func:`EasyMCP2221.Device.send_cmd`. """
+
+    def __init__(self):
+        self.commands = {}
+
+
+    def _get(self, cmd):
+        stats = self.commands.get(cmd)
+
+        if stats is None:
+            stats = self.commands[cmd] = CommandStats()
+
+        return stats
+
+
+    def record(self, cmd, latency_us, response):
+        """ Add a completed command. ``response`` is ``None`` for commands without response. """
+        stats = self._get(cmd)
+        stats.count += 1
+        stats.latency.record(latency_us)
+
+        if response is not None:
+            if response[Constants.RESPONSE_STATUS_BYTE] != Constants.RESPONSE_RESULT_OK:
+                stats.rejected += 1
+
+            # I2C data in this chunk
+            elif cmd == Constants.CMD_I2C_READ_DATA_GET_I2C_DATA and response[3] <= Constants.I2C_CHUNK_SIZE:
+                stats.bytes_in += response[3]
+
+
+    def i2c_sent(self, cmd, nbytes):
+        """ A write command has accepted ``nbytes`` of I2C data. """
+        self._get(cmd).bytes_out += nbytes
+
+
+    def retry(self, cmd):
+        """ A command is being sent again. """
+        self._get(cmd).retries += 1
+
+
+    def failure(self, cmd):
+        """ A command raised an exception. """
+        stats = self._get(cmd)
+        stats.count    += 1
+        stats.failures += 1
+
+
+    def snapshot(self):
+        """ Return all the statistics as a dictionary, by command name. """
+        out = {}
+
+        for cmd, stats in sorted(self.commands.items()):
+            name = CMD_NAMES.get(cmd, "0x%02X" % cmd)
+
+            out[name] = {
+                "count"      : stats.count,
+                "retries"    : stats.retries,
+                "failures"   : stats.failures,
+                "rejected"   : stats.rejected,
+                "bytes_out"  : stats.bytes_out,
+                "bytes_in"   : stats.bytes_in,
+                "latency_us" : stats.latency.summary(),
+            }
+
+        return out
+
+
+    def reset(self):
+        """ Clear all counters. """
+        self.commands = {}
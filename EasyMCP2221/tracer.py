@@ -0,0 +1,234 @@
+""" Binary USB packet tracer for :class:`EasyMCP2221.Device`.
+
+Unlike ``trace_packets``, which prints every packet as it is sent, :class:`PacketTracer`
+stores raw commands and responses in a pre-allocated ring buffer. It keeps the timing
+of the bus almost unchanged, so it can be left enabled to capture field problems.
+
+Dump the buffer to a file with :func:`PacketTracer.dump` and decode it later with::
+
+    python -m EasyMCP2221.tracer trace.bin
+"""
+import struct
+import sys
+import time
+
+from . import Constants
+
+# Timestamps in nanoseconds
+try:
+    now_ns = time.perf_counter_ns
+except AttributeError:  # Python < 3.7
+    now_ns = lambda: int(time.perf_counter() * 1e9)
+
+PACKET_SIZE = Constants.PACKET_SIZE
+
+# Record: command timestamp (ns), command, response timestamp (ns), response
+RECORD = struct.Struct("<Q%dsQ%ds" % (PACKET_SIZE, PACKET_SIZE))
+
+# Fields of a record, written in place by PacketTracer.record
+STAMP      = struct.Struct("<Q")
+CMD_OFFSET   = STAMP.size
+T_RES_OFFSET = CMD_OFFSET + PACKET_SIZE
+RES_OFFSET   = T_RES_OFFSET + STAMP.size
+
+ZERO_PACKET = memoryview(bytes(PACKET_SIZE))
+
+# File header: magic, format version, number of records
+MAGIC  = b"MCP2221T"
+HEADER = struct.Struct("<8sHI")
+VERSION = 1
+
+CMD_NAMES   = {v: k for k, v in vars(Constants).items() if k.startswith("CMD_")}
+I2C_ST_NAMES = {v: k for k, v in vars(Constants).items() if k.startswith("I2C_ST_")}
+
+# Commands whose response byte 2 is the I2C engine state
+I2C_COMMANDS = (
+    Constants.CMD_I2C_WRITE_DATA,
+    Constants.CMD_I2C_READ_DATA,
+    Constants.CMD_I2C_WRITE_DATA_REPEATED_START,
+    Constants.CMD_I2C_READ_DATA_REPEATED_START,
+    Constants.CMD_I2C_WRITE_DATA_NO_STOP,
+    Constants.CMD_I2C_READ_DATA_GET_I2C_DATA)
+
+
+class PacketTracer:
+    """ Ring buffer of raw USB commands and responses.
+
+    When full, the oldest packets are overwritten.
+
+    Parameters:
+        capacity (int, optional): how many command/response pairs to keep (default 4096).
+
+    Example:
+        >>> from EasyMCP2221.tracer import PacketTracer
+        >>> tracer = PacketTracer()
+        >>> mcp = EasyMCP2221.Device(packet_tracer = tracer)
+        >>> mcp.I2C_read(0x50, 1)
+        b'\\xff'
+        >>> tracer.dump("trace.bin")
+    """
+
+    def __init__(self, capacity = 4096):
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1.")
+
+        self.capacity = capacity
+        self.buffer   = bytearray(RECORD.size * capacity)
+        self._view    = memoryview(self.buffer)
+        self.total    = 0   # packets recorded since creation or last clear
+
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+
+    def record(self, t_cmd, cmd, t_res, res):
+        """ Store a command and its response.
+
+        Packets are copied straight into their ring slot. Only lists are converted to bytes
+        first; the reused packet buffers of :class:`EasyMCP2221.Device` are not copied twice.
+
+        Parameters:
+            t_cmd (int): timestamp before sending the command (ns, ``perf_counter_ns``).
+            cmd (list, bytes or memoryview): command, without HID report number.
+            t_res (int): timestamp after receiving the response (ns).
+            res (list, bytes or memoryview): response, or ``None`` if the command has none.
+        """
+        offset = (self.total % self.capacity) * RECORD.size
+
+        STAMP.pack_into(self.buffer, offset, t_cmd)
+        self._store(offset + CMD_OFFSET, cmd)
+        STAMP.pack_into(self.buffer, offset + T_RES_OFFSET, t_res)
+        self._store(offset + RES_OFFSET, res if res is not None else b"")
+
+        self.total += 1
+
+
+    def _store(self, offset, data):
+        """ Copy a packet into the buffer at offset, padded with zeros. """
+        if isinstance(data, list):
+            data = bytes(data)
+
+        length = len(data)
+        if length > PACKET_SIZE:
+            raise ValueError("Packet longer than %d bytes." % PACKET_SIZE)
+
+        self._view[offset:offset+length] = data
+        self._view[offset+length:offset+PACKET_SIZE] = ZERO_PACKET[length:]
+
+
+    def records(self):
+        """ Return stored records, oldest first, as tuples ``(t_cmd, cmd, t_res, res)``. """
+        n = len(self)
+        first = self.total - n
+
+        return [RECORD.unpack_from(self.buffer, (i % self.capacity) * RECORD.size)
+                for i in range(first, first + n)]
+
+
+    def clear(self):
+        """ Forget all stored records. """
+        self.total = 0
+
+
+    def dump(self, file):
+        """ Write stored records to a binary file.
+
+        Parameters:
+            file (str or file): file name or binary file object.
+        """
+        if isinstance(file, str):
+            with open(file, "wb") as f:
+                return self.dump(f)
+
+        records = self.records()
+
+        file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+
+        for r in records:
+            file.write(RECORD.pack(*r))
+
+
+
+def load(file):
+    """ Read records from a file written by :func:`PacketTracer.dump`.
+
+    Parameters:
+        file (str or file): file name or binary file object.
+
+    Return:
+        List of tuples ``(t_cmd, cmd, t_res, res)``.
+
+    Raises:
+        ValueError: if the file is not a valid trace.
+    """
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            return load(f)
+
+    magic, version, count = HEADER.unpack(file.read(HEADER.size))
+
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a valid EasyMCP2221 trace file.")
+
+    return [RECORD.unpack(file.read(RECORD.size)) for i in range(count)]
+
+
+def _hex(data, minimum = 4):
+    """ Hex dump, without trailing zeros. """
+    data = data.rstrip(b"\x00")
+    data = data + b"\x00" * (minimum - len(data))
+    return " ".join("%02x" % i for i in data)
+
+
+def decode(records):
+    """ Translate records into human readable lines.
+
+    Parameters:
+        records (list): as returned by :func:`load` or :func:`PacketTracer.records`.
+
+    Return:
+        Iterator of str.
+    """
+    if not records:
+        return
+
+    t0 = records[0][0]
+
+    for t_cmd, cmd, t_res, res in records:
+        name = CMD_NAMES.get(cmd[0], "UNKNOWN_%02X" % cmd[0])
+        line = "%12.3f ms %7.3f ms  %-34s CMD: %s" % (
+            (t_cmd - t0) / 1e6,
+            (t_res - t_cmd) / 1e6,
+            name,
+            _hex(cmd))
+
+        yield line
+
+        if res.rstrip(b"\x00"):
+            info = "OK" if res[Constants.RESPONSE_STATUS_BYTE] == Constants.RESPONSE_RESULT_OK else "status %02x" % res[1]
+
+            if cmd[0] in I2C_COMMANDS:
+                info += ", " + I2C_ST_NAMES.get(res[Constants.I2C_INTERNAL_STATUS_BYTE], "I2C state %02x" % res[2])
+            elif cmd[0] == Constants.CMD_POLL_STATUS_SET_PARAMETERS:
+                info += ", " + I2C_ST_NAMES.get(res[Constants.I2C_POLL_RESP_STATUS], "I2C state %02x" % res[8])
+
+            yield "%30s %-34s RES: %s" % ("", info, _hex(res))
+
+
+def main(argv = None):
+    """ Print a trace file as text. """
+    argv = sys.argv[1:] if argv is None else argv
+
+    if len(argv) != 1:
+        print("Usage: python -m EasyMCP2221.tracer trace.bin")
+        return 1
+
+    for line in decode(load(argv[0])):
+        print(line)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+""" Record and replay USB HID traffic for :class:`EasyMCP2221.Device`.
+
+A transport is any object that behaves like the ``hid`` module: it has an
+``enumerate(VID, PID)`` function and a ``device()`` constructor returning an object
+with ``open_path``, ``write``, ``read`` and ``close`` methods.
+Pass it with the ``transport`` parameter of :class:`EasyMCP2221.Device`.
+
+:class:`Recorder` wraps a real transport and saves every call to a file.
+:class:`Replayer` serves the recorded responses back without hardware. Use it to
+benchmark the host side of the library or to reproduce a session exactly.
+
+Example:
+    Record a session with the real device:
+
+    >>> from EasyMCP2221.transport import Recorder, Replayer
+    >>> with Recorder("session.rec") as rec:
+    ...     mcp = EasyMCP2221.Device(transport = rec)
+    ...     mcp.I2C_read(0x50, 4)
+    b'\\x00\\x01\\x02\\x03'
+
+    Replay it later, no device needed:
+
+    >>> mcp = EasyMCP2221.Device(transport = Replayer("session.rec"))
+    >>> mcp.I2C_read(0x50, 4)
+    b'\\x00\\x01\\x02\\x03'
+"""
+import json
+import time
+
+import hid
+
+
+class ReplayError(RuntimeError):
+    """ The program did not issue the same USB calls that were recorded. """
+
+
+def _encode_path(path):
+    """ USB paths are bytes in hidapi. Make them JSON friendly. """
+    if isinstance(path, bytes):
+        return {"bytes": path.hex()}
+    return path
+
+
+def _decode_path(path):
+    if isinstance(path, dict):
+        return bytes.fromhex(path["bytes"])
+    return path
+
+
+class Recorder:
+    """ Transport that forwards calls to a real one and records them.
+
+    Each event is a JSON line with the operation, the device handle number, the time
+    (seconds since the recorder was created) and the data.
+
+    Parameters:
+        file (str or file): file name or text file object to write to.
+        transport (optional): transport to record. Default is the ``hid`` module.
+    """
+
+    def __init__(self, file, transport = hid):
+        if isinstance(file, str):
+            self.file = open(file, "w")
+            self.own_file = True
+        else:
+            self.file = file
+            self.own_file = False
+
+        self.transport = transport
+        self.handles = 0
+        self.t0 = time.perf_counter()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def _log(self, **event):
+        # Devices may be closed by the garbage collector after the recorder
+        if self.file.closed:
+            return
+
+        event["t"] = round(time.perf_counter() - self.t0, 6)
+        self.file.write(json.dumps(event) + "\n")
+
+
+    def enumerate(self, VID = 0, PID = 0):
+        devices = self.transport.enumerate(VID, PID)
+
+        self._log(
+            op = "enumerate",
+            vid = VID,
+            pid = PID,
+            devices = [{"path": _encode_path(d["path"]), "serial_number": d.get("serial_number")}
+                       for d in devices])
+
+        return devices
+
+
+    def device(self):
+        handle = self.handles
+        self.handles += 1
+        return _RecordedDevice(self, handle, self.transport.device())
+
+
+    def close(self):
+        """ Flush and close the record file. """
+        self.file.flush()
+        if self.own_file:
+            self.file.close()
+
+
+
+class _RecordedDevice:
+    """ Device handle of a :class:`Recorder`. """
+
+    def __init__(self, recorder, handle, dev):
+        self.recorder = recorder
+        self.handle   = handle
+        self.dev      = dev
+
+
+    def _call(self, op, func, *args, data = None):
+        """ Call the real device and log the result or the exception. """
+        try:
+            r = func(*args)
+        except Exception as e:
+            self.recorder._log(op = op, dev = self.handle, data = data, error = str(e))
+            raise
+
+        if op == "read":
+            data = bytes(r).hex()
+
+        self.recorder._log(op = op, dev = self.handle, data = data)
+        return r
+
+
+    def open_path(self, path):
+        return self._call("open", self.dev.open_path, path, data = _encode_path(path))
+
+
+    def write(self, data):
+        return self._call("write", self.dev.write, data, data = bytes(data).hex())
+
+
+    def read(self, size, timeout = -1):
+        return self._call("read", self.dev.read, size, timeout)
+
+
+    def close(self):
+        return self._call("close", self.dev.close)
+
+
+
+class Replayer:
+    """ Transport that serves responses from a file written by :class:`Recorder`.
+
+    Each device handle replays its own events in order. Written packets are compared
+    against the recorded ones.
+
+    Parameters:
+        file (str or file): file name or text file object to read from.
+        timing (bool, optional): Reproduce the original delay between a write and its response.
+            Default is ``False`` (respond immediately).
+        strict (bool, optional): Raise :class:`ReplayError` if a written packet differs from the
+            recorded one. Default is ``True``. Order of operations is always checked.
+
+    Raises:
+        ReplayError: when the calls do not match the recording.
+    """
+
+    def __init__(self, file, timing = False, strict = True):
+        if isinstance(file, str):
+            with open(file) as f:
+                events = [json.loads(line) for line in f if line.strip()]
+        else:
+            events = [json.loads(line) for line in file if line.strip()]
+
+        self.timing = timing
+        self.strict = strict
+
+        self.enumerations = [e for e in events if e["op"] == "enumerate"]
+        self.queues = {}
+        for e in events:
+            if e["op"] != "enumerate":
+                self.queues.setdefault(e["dev"], []).append(e)
+
+        self.handles = 0
+
+
+    def enumerate(self, VID = 0, PID = 0):
+        if not self.enumerations:
+            raise ReplayError("No enumerations recorded.")
+
+        # Enumerations may be cached by Device, so there can be more or fewer than
+        # recorded. Keep answering with the last one.
+        if len(self.enumerations) > 1:
+            e = self.enumerations.pop(0)
+        else:
+            e = self.enumerations[0]
+
+        if (e["vid"], e["pid"]) != (VID, PID):
+            raise ReplayError("Enumeration of %04X:%04X, recorded %04X:%04X." %
+                (VID, PID, e["vid"], e["pid"]))
+
+        return [{"path": _decode_path(d["path"]), "serial_number": d["serial_number"]}
+                for d in e["devices"]]
+
+
+    def device(self):
+        handle = self.handles
+        self.handles += 1
+        return _ReplayedDevice(self, self.queues.get(handle, []))
+
+
+
+class _ReplayedDevice:
+    """ Device handle of a :class:`Replayer`. """
+
+    def __init__(self, replayer, events):
+        self.replayer = replayer
+        self.events   = events
+        self.pos      = 0
+        self.last     = None  # last write: (time recorded, time replayed)
+
+
+    def _next(self, op, data = None):
+        """ Consume next event, check it and raise the recorded error if any. """
+        if self.pos >= len(self.events):
+            raise ReplayError("Unexpected %s, end of recording." % op)
+
+        e = self.events[self.pos]
+        self.pos += 1
+
+        if e["op"] != op:
+            raise ReplayError("Unexpected %s at event %d, recorded %s." % (op, self.pos, e["op"]))
+
+        if self.replayer.strict and data is not None and e["data"] != data:
+            raise ReplayError("Data mismatch on %s at event %d:\n  sent     %s\n  recorded %s" %
+                (op, self.pos, data, e["data"]))
+
+        if "error" in e:
+            raise OSError(e["error"])
+
+        return e
+
+
+    def open_path(self, path):
+        self._next("open", _encode_path(path))
+
+
+    def write(self, data):
+        e = self._next("write", bytes(data).hex())
+        self.last = (e["t"], time.perf_counter())
+        return len(data)
+
+
+    def read(self, size, timeout = -1):
+        e = self._next("read")
+
+        if self.replayer.timing and self.last:
+            wait = self.last[1] + (e["t"] - self.last[0]) - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+        return list(bytes.fromhex(e["data"]))[:size]
+
+
+    def close(self):
+        # Device closed twice (e.g. by __del__) or never opened
+        if self.pos < len(self.events) and self.events[self.pos]["op"] == "close":
+            self.pos += 1
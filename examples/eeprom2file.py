@@ -62,6 +62,9 @@ with open(args.file, 'wb') as f:
     start = time.perf_counter()
     index = 0
 
+    # Read into the same buffer every time
+    buffer = memoryview(bytearray(65535))
+
     while index < memsize:
         # MCP2221's max length for a I2C operation is 65535 bytes.
         if memsize - index > 65535:
@@ -69,8 +72,9 @@ with open(args.file, 'wb') as f:
         else:
             m = memsize - index
 
-        buffer = eeprom.read_register(index, m, reg_bytes=2)
-        f.write(buffer)
+        mcp.I2C_write(args.address, index.to_bytes(2, byteorder = 'big'), 'nonstop')
+        mcp.I2C_readinto(args.address, buffer[:m], 'restart')
+        f.write(buffer[:m])
         index = index + m
 
 end = time.perf_counter()
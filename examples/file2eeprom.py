@@ -86,11 +86,16 @@ print("Writing EEPROM...")
 
 start = time.perf_counter()
 
+# Same buffer for every page: 2 bytes position + page data
+buffer = memoryview(bytearray(2 + args.page))
+
 if args.delete:
+    buffer[2:] = b'\xff' * args.page
+
     for i in range(memsize//args.page):
         print("Bytes %d/%d." %((i+1) * args.page, memsize))
-        buffer = b'\xff' * args.page
-        eeprom.write_register(i * args.page, buffer, reg_bytes=2)
+        buffer[0:2] = (i * args.page).to_bytes(2, byteorder = 'big')
+        mcp.I2C_write(args.address, buffer)
 
         until = time.perf_counter() + args.wait / 1000
         while time.perf_counter() < until:
@@ -100,13 +105,14 @@ else:
     with open(args.file, 'rb') as f:
         for i in range(memsize//args.page):
             print("Bytes %d/%d." %((i+1) * args.page, memsize))
-            buffer = f.read(args.page)
+            n = f.readinto(buffer[2:])
 
-            if not buffer:
+            if not n:
                 print("End of file.")
                 break
 
-            eeprom.write_register(i * args.page, buffer, reg_bytes=2)
+            buffer[0:2] = (i * args.page).to_bytes(2, byteorder = 'big')
+            mcp.I2C_write(args.address, buffer[:2+n])
 
             until = time.perf_counter() + args.wait / 1000
             while time.perf_counter() < until:
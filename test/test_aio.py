@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import unittest
+
+import EasyMCP2221
+from EasyMCP2221.aio import AsyncDevice
+from EasyMCP2221.emulator import Emulator, EEPROM
+from EasyMCP2221.exceptions import *
+
+
+class Async(unittest.TestCase):
+    """AsyncDevice on the emulator."""
+
+    def setUp(self):
+        EasyMCP2221.Device._catalog = {}
+        self.emu = Emulator()
+        self.emu.chips[0].attach(EEPROM(0x50, write_time = 0))
+        self.mcp = EasyMCP2221.Device(transport = self.emu)
+        self.mcp.set_pin_function(gp0 = "GPIO_OUT", gp2 = "ADC", gp3 = "DAC")
+
+
+    def tearDown(self):
+        EasyMCP2221.Device._catalog = {}
+
+
+    def run_async(self, coro):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+
+    def test_calls(self):
+        """Results and exceptions."""
+        async def main():
+            async with AsyncDevice(self.mcp) as dev:
+                await dev.GPIO_write(gp0 = 1)
+                self.assertEqual((await dev.GPIO_read())[0], 1)
+
+                await dev.DAC_write(10)
+                self.assertEqual(self.emu.chips[0].dac_value, 10)
+
+                self.emu.chips[0].analog[1] = 300
+                self.assertEqual((await dev.ADC_read())[1], 300)
+
+                await dev.I2C_write(0x50, b"\x00\x00abc")
+                self.assertEqual(await dev.I2C_write_read(0x50, b"\x00\x00", 3), b"abc")
+
+                with self.assertRaises(NotAckError):
+                    await dev.I2C_read(0x51)
+
+                self.assertEqual(await dev.run("I2C_write_read", 0x50, b"\x00\x01", 2), b"bc")
+
+        self.run_async(main())
+
+
+    def test_order(self):
+        """Commands run in order, in a thread other than the event loop."""
+        threads = set()
+
+        def write(i):
+            threads.add(threading.current_thread())
+            self.mcp.GPIO_write(gp0 = i & 1)
+            return self.mcp.GPIO_read()[0]
+
+        async def main():
+            dev = AsyncDevice(self.mcp)
+            dev2 = AsyncDevice(self.mcp)
+            self.assertIs(dev._worker, dev2._worker)
+
+            futures = [(dev if i % 2 else dev2).run(write, i) for i in range(50)]
+            results = await asyncio.gather(*futures)
+
+            dev.close()
+            dev2.close()
+            return results
+
+        self.assertEqual(self.run_async(main()), [i & 1 for i in range(50)])
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+    def test_open(self):
+        """Open a new device without blocking."""
+        async def main():
+            EasyMCP2221.Device._catalog = {}
+            dev = await AsyncDevice.open(transport = self.emu)
+            self.assertIsNot(dev.mcp, self.mcp)
+            dev.close()
+
+            with self.assertRaises(RuntimeError):
+                await dev.GPIO_read()
+
+        self.run_async(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
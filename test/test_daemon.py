@@ -0,0 +1,207 @@
+import os
+import queue
+import socket
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+import EasyMCP2221
+from EasyMCP2221 import SMBus, i2c_msg
+from EasyMCP2221.daemon import *
+from EasyMCP2221.Constants import CMD_GET_GPIO_VALUES, CMD_SET_GPIO_OUTPUT_VALUES, GPIO_OUT_VAL_1
+from EasyMCP2221.emulator import Emulator, EEPROM
+from EasyMCP2221.exceptions import *
+
+
+class Daemon(unittest.TestCase):
+    """Broker and clients on the emulator."""
+
+    def setUp(self):
+        EasyMCP2221.Device._catalog = {}
+        self.emu = Emulator()
+        self.emu.chips[0].attach(EEPROM(0x50, write_time = 0))
+        self.emu.chips[0].analog[1] = 300
+        self.mcp = EasyMCP2221.Device(transport = self.emu)
+        self.mcp.set_pin_function(gp0 = "GPIO_OUT", gp2 = "ADC", gp3 = "DAC")
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "mcp.sock")
+        self.broker = Broker(self.path, self.mcp)
+        self.broker.start()
+
+
+    def tearDown(self):
+        self.broker.close()
+        self.tmp.cleanup()
+        EasyMCP2221.Device._catalog = {}
+
+
+    def test_calls(self):
+        """Results and exceptions are the same as in Device."""
+        with Client(self.path) as mcp:
+            mcp.GPIO_write(gp0 = 1)
+            self.assertEqual(mcp.GPIO_read(), (1, None, None, None))
+            self.assertEqual(mcp.ADC_read()[1], 300)
+
+            self.assertEqual(mcp.DAC_write(17), 17)
+            self.assertEqual(self.emu.chips[0].dac_value, 17)
+
+            # Same rounding and return value as Device.DAC_write
+            for out in (0, 0.33, 0.5, 0.99, 1):
+                self.assertEqual(mcp.DAC_write(out, norm = True), self.mcp.DAC_write(out, norm = True))
+            self.assertEqual(mcp.DAC_write(0.33, norm = True), 0.34375)
+            self.assertEqual(self.emu.chips[0].dac_value, 11)
+
+            with self.assertRaises(ValueError):
+                mcp.DAC_write(1.5, norm = True)
+
+            mcp.I2C_write(0x50, b"\x00\x10abc")
+            self.assertEqual(mcp.I2C_write_read(0x50, b"\x00\x10", 3), b"abc")
+            mcp.I2C_write(0x50, b"\x00\x11")
+            self.assertEqual(mcp.I2C_read(0x50, 2), b"bc")
+
+            with self.assertRaises(NotAckError):
+                mcp.I2C_read(0x51)
+
+            with self.assertRaises(ValueError):
+                mcp.I2C_write(0x50, b"\x00", kind = "other")
+
+            with self.assertRaises(ValueError):
+                mcp.I2C_read(0x50, 0)
+
+
+    def test_smbus(self):
+        """SMBus and I2C_Slave work through a client."""
+        with Client(self.path) as mcp:
+            bus = SMBus(mcp = mcp)
+            bus.write_i2c_block_data(0x50, 0, [0x20, 1, 2, 3])
+
+            write = i2c_msg.write(0x50, [0x00, 0x20])
+            read  = i2c_msg.read(0x50, 3)
+            bus.i2c_rdwr(write, read)
+            self.assertEqual(bytes(read), b"\x01\x02\x03")
+
+            with self.assertRaises(NotAckError):
+                bus.i2c_rdwr(i2c_msg.read(0x51, 1))
+
+            eeprom = mcp.I2C_Slave(0x50, reg_bytes = 2)
+            self.assertEqual(eeprom.read_register(0x20, 3), b"\x01\x02\x03")
+
+
+    def test_clients(self):
+        """Concurrent clients do not corrupt each other's transfers."""
+        errors = []
+
+        def worker(n):
+            try:
+                with Client(self.path) as mcp:
+                    pos = bytes([0, n * 16])
+                    for i in range(20):
+                        data = bytes([n, i] * 4)
+                        mcp.I2C_write(0x50, pos + data)
+                        if mcp.I2C_write_read(0x50, pos, 8) != data:
+                            errors.append(n)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target = worker, args = (n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+
+
+    def test_merge(self):
+        """Consecutive reads share one command, GPIO writes to different pins are merged."""
+        self.mcp.set_pin_function(gp0 = "GPIO_OUT", gp1 = "GPIO_OUT", gp2 = "ADC", gp3 = "DAC")
+        chip = self.emu.chips[0]
+        chip.commands.clear()
+
+        requests = [
+            (queue.Queue(), OP_GPIO_READ,  b""),
+            (queue.Queue(), OP_GPIO_READ,  b""),
+            (queue.Queue(), OP_GPIO_WRITE, bytes([1, NO_VALUE, NO_VALUE, NO_VALUE])),
+            (queue.Queue(), OP_GPIO_WRITE, bytes([NO_VALUE, 1, NO_VALUE, NO_VALUE])),
+            (queue.Queue(), OP_GPIO_WRITE, bytes([0, NO_VALUE, NO_VALUE, NO_VALUE])),
+            (queue.Queue(), OP_GPIO_READ,  b""),
+        ]
+        self.broker._run_batch(requests)
+
+        responses = [reply.get_nowait() for reply, op, payload in requests]
+        self.assertEqual(responses[0], responses[1])
+        self.assertEqual([status for status, data in responses], [ST_OK] * 6)
+        self.assertEqual(responses[5][1], bytes([0, 1, NO_VALUE, NO_VALUE]))
+        self.assertEqual(chip.commands[CMD_GET_GPIO_VALUES], 2)
+        self.assertEqual(chip.commands[CMD_SET_GPIO_OUTPUT_VALUES], 2)
+        self.assertEqual(self.broker.merged, 2)
+
+        # A failed merged write is run again one by one
+        requests = [
+            (queue.Queue(), OP_GPIO_WRITE, bytes([1, NO_VALUE, NO_VALUE, NO_VALUE])),
+            (queue.Queue(), OP_GPIO_WRITE, bytes([NO_VALUE, NO_VALUE, 1, NO_VALUE])),
+        ]
+        self.broker._run_batch(requests)
+        self.assertEqual(requests[0][0].get_nowait(), (ST_OK, b""))
+        self.assertEqual(requests[1][0].get_nowait()[0], ST_ERROR)
+        self.assertTrue(chip.gp[0] & GPIO_OUT_VAL_1)
+
+
+    def test_close(self):
+        """Clients see a closed broker."""
+        mcp = Client(self.path)
+        self.broker.close()
+        self.assertFalse(os.path.exists(self.path))
+
+        with self.assertRaises(OSError):
+            mcp.GPIO_read()
+
+        mcp.close()
+
+
+    def test_socket_file(self):
+        """Socket only for the user, a running broker is not replaced, stale sockets are."""
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+        with self.assertRaises(RuntimeError):
+            Broker(self.path, self.mcp)
+        self.assertEqual(Client(self.path).GPIO_read()[1], None)
+
+        # Left by a dead broker
+        stale = os.path.join(self.tmp.name, "stale.sock")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(stale)
+        sock.close()
+
+        # Already private when created, before mode is applied
+        created = []
+        chmod = os.chmod
+        def check_chmod(path, mode):
+            created.append(os.stat(path).st_mode & 0o777)
+            chmod(path, mode)
+
+        with unittest.mock.patch("os.chmod", check_chmod):
+            broker = Broker(stale, self.mcp, mode = 0o660)
+        self.assertEqual(created, [0o600])
+        broker.start()
+        with Client(stale) as mcp:
+            mcp.GPIO_write(gp0 = 1)
+        self.assertEqual(os.stat(stale).st_mode & 0o777, 0o660)
+        broker.close()
+
+        other = os.path.join(self.tmp.name, "file")
+        open(other, "w").close()
+        with self.assertRaises(RuntimeError):
+            Broker(other, self.mcp)
+        self.assertTrue(os.path.exists(other))
+
+        # Default path in the runtime directory
+        with unittest.mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": self.tmp.name}):
+            self.assertEqual(default_path(), os.path.join(self.tmp.name, "EasyMCP2221.sock"))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
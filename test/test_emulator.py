@@ -0,0 +1,624 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+import time
+
+import EasyMCP2221
+from EasyMCP2221.emulator import Emulator, EEPROM, ADS1115, PCF8591
+from EasyMCP2221.exceptions import *
+from EasyMCP2221.Constants import *
+
+
+class Emulated(unittest.TestCase):
+    """Run the library against the emulator. No hardware needed."""
+
+    def setUp(self):
+        EasyMCP2221.Device._catalog = {}
+        self.emu = Emulator()
+        self.chip = self.emu.chips[0]
+        self.eeprom = self.chip.attach(EEPROM(0x50))
+        self.mcp = EasyMCP2221.Device(transport = self.emu)
+
+
+    def tearDown(self):
+        EasyMCP2221.Device._catalog = {}
+
+
+    def test_device_presence(self):
+        """Flash strings and __repr__."""
+        data = json.loads(str(self.mcp))
+        self.assertEqual(data["USB Product"], "MCP2221 USB-I2C/UART Combo")
+        self.assertEqual(data["Factory Serial Number"], "00001000")
+
+
+    def test_gpio(self):
+        """GPIO outputs and inputs."""
+        self.mcp.set_pin_function(gp0 = "GPIO_OUT", out0 = 1, gp1 = "GPIO_IN")
+        self.chip.set_input(1, 1)
+        self.assertEqual(self.mcp.GPIO_read()[0:2], (1, 1))
+
+        self.mcp.GPIO_write(gp0 = 0)
+        self.chip.set_input(1, 0)
+        self.assertEqual(self.mcp.GPIO_read()[0:2], (0, 0))
+
+
+    def test_ioc(self):
+        """Interrupt flag on rising edge."""
+        self.mcp.set_pin_function(gp1 = "IOC")
+        self.mcp.IOC_config(edge = "rising")
+
+        self.chip.set_input(1, 1)
+        self.assertEqual(self.mcp.IOC_read(), 1)
+
+        self.mcp.IOC_clear()
+        self.chip.set_input(1, 0)
+        self.assertEqual(self.mcp.IOC_read(), 0)
+
+
+    def test_adc_dac(self):
+        """ADC inputs and DAC value."""
+        self.mcp.set_pin_function(gp2 = "ADC", gp3 = "DAC")
+        self.chip.analog[1] = 512
+        self.assertEqual(self.mcp.ADC_read()[1], 512)
+
+        self.mcp.DAC_write(17)
+        self.assertEqual(self.chip.dac_value, 17)
+
+
+    def test_eeprom(self):
+        """Write and read back more than one chunk."""
+        data = bytes(range(64))
+        self.mcp.I2C_write(0x50, b"\x00\x40" + data)
+        self.emu.sleep(0.01)
+
+        self.assertEqual(self.mcp.I2C_write_read(0x50, b"\x00\x40", 64), data)
+        self.assertEqual(self.eeprom.memory[0x40:0x80], data)
+
+        # Same data types as I2C_write
+        self.assertEqual(self.mcp.I2C_write_read(0x50, [0, 0x40], 2), data[0:2])
+        self.assertEqual(self.mcp.I2C_write_read(0x50, bytearray(b"\x00\x41"), 2), data[1:3])
+
+
+    def test_eeprom_busy(self):
+        """EEPROM does not acknowledge during its write cycle."""
+        self.mcp.I2C_write(0x50, b"\x00\x00\x55")
+
+        with self.assertRaises(NotAckError):
+            self.mcp.I2C_read(0x50)
+
+        self.emu.sleep(0.01)
+        self.mcp.I2C_read(0x50)
+
+
+    def test_no_device(self):
+        """NACK on a missing address."""
+        with self.assertRaises(NotAckError):
+            self.mcp.I2C_read(0x51)
+
+        with self.assertRaises(NotAckError):
+            self.mcp.I2C_write(0x51, b"\x00")
+
+        # NACK in the write phase, not in the read
+        with self.assertRaisesRegex(NotAckError, r"^Device did not ACK\.$"):
+            self.mcp.I2C_write_read(0x51, b"\x00\x00", 1)
+
+        self.assertEqual(len(self.mcp.I2C_write_read(0x50, b"\x00\x00", 1)), 1)
+
+
+    def test_i2c_known_state(self):
+        """No status read before a transfer when the engine state is known."""
+        self.eeprom.write_time = 0
+        self.mcp.set_pin_function(gp0 = "GPIO_OUT")
+        self.mcp.I2C_read(0x50, 1)
+
+        def packets(func, *args):
+            self.chip.commands.clear()
+            self.chip.transactions = 0
+            func(*args)
+            return self.chip.transactions, self.chip.commands.get(CMD_POLL_STATUS_SET_PARAMETERS, 0)
+
+        # State known from the last transfer
+        known_write = packets(self.mcp.I2C_write, 0x50, b"\x00\x00\x55")
+        known_read  = packets(self.mcp.I2C_read, 0x50, 1)
+
+        # GPIO commands may disturb the bus, the state is unknown
+        self.mcp.GPIO_write(gp0 = 1)
+        unknown_write = packets(self.mcp.I2C_write, 0x50, b"\x00\x00\x55")
+        self.mcp.GPIO_write(gp0 = 0)
+        unknown_read  = packets(self.mcp.I2C_read, 0x50, 1)
+
+        # Write: data, final status. Read: read command, get data.
+        self.assertEqual(known_write, (2, 1))
+        self.assertEqual(known_read, (2, 0))
+
+        # One more status read
+        self.assertEqual(unknown_write, (3, 2))
+        self.assertEqual(unknown_read, (3, 1))
+
+
+    def test_stuck_bus(self):
+        """SCL low."""
+        self.chip.scl = 0
+        with self.assertRaises(LowSCLError):
+            self.mcp.I2C_read(0x50)
+
+
+    def test_ads1115(self):
+        """Single-shot conversion on AIN0."""
+        adc = self.chip.attach(ADS1115(0x48))
+        adc.voltages[0] = 1.024
+
+        # AIN0 single ended, FSR 2.048V, single shot
+        self.mcp.I2C_write(0x48, b"\x01\xC5\x83")
+        raw = self.mcp.I2C_write_read(0x48, b"\x00", 2)
+        self.assertEqual(int.from_bytes(raw, "big"), 16384)
+
+
+    def test_pcf8591(self):
+        """DAC output and auto-increment reads."""
+        pcf = self.chip.attach(PCF8591(0x49))
+        pcf.inputs = [10, 20, 30, 40]
+
+        self.mcp.I2C_write(0x49, b"\x44\x80")
+        self.assertEqual(pcf.dac, 0x80)
+        # first byte is the previous conversion
+        self.assertEqual(self.mcp.I2C_read(0x49, 5)[1:], b"\x0a\x14\x1e\x28")
+
+
+    def test_many_chips(self):
+        """32 chips, each with its own EEPROM."""
+        for i in range(31):
+            self.emu.add_chip().attach(EEPROM(0x50, write_time = 0))
+
+        devices = [EasyMCP2221.Device(transport = self.emu, devnum = i) for i in range(1, 32)]
+        self.assertEqual(len(set(id(d) for d in devices)), 31)
+
+        for i, mcp in enumerate(devices):
+            mcp.I2C_write(0x50, b"\x00\x00" + bytes([i]))
+
+        for i, mcp in enumerate(devices):
+            self.assertEqual(mcp.I2C_write_read(0x50, b"\x00\x00", 1), bytes([i]))
+
+
+    def test_command_buffer(self):
+        """Reused command buffer is cleared, responses of list commands are kept."""
+        from EasyMCP2221.tracer import PacketTracer
+
+        self.mcp.packet_tracer = PacketTracer()
+        self.mcp.set_pin_function(gp0 = "GPIO_OUT")
+
+        settings = self.mcp.send_cmd([CMD_GET_SRAM_SETTINGS])
+        self.mcp.I2C_write(0x50, b"\x00\x00" + bytes(range(1, 61)))
+        self.mcp.GPIO_write(gp0 = 1)
+        self.mcp.send_cmd([CMD_READ_FLASH_DATA, FLASH_DATA_CHIP_SETTINGS])
+
+        self.assertEqual(settings[0], CMD_GET_SRAM_SETTINGS)
+
+        cmds = [cmd for t_cmd, cmd, t_res, res in self.mcp.packet_tracer.records()]
+        gpio = [c for c in cmds if c[0] == CMD_SET_GPIO_OUTPUT_VALUES][-1]
+        flash = cmds[-1]
+
+        self.assertEqual(gpio[2:4], b"\x01\x01")
+        self.assertEqual(gpio[4:], bytes(60))
+        self.assertEqual(flash[2:], bytes(62))
+
+        # Backend without readinto (like hidapi): responses are copied into the same buffer
+        self.mcp.hidhandler.readinto = None
+        response = self.mcp.send_cmd(self.mcp._cmd_buffer(CMD_GET_GPIO_VALUES))
+        self.assertIsInstance(response, memoryview)
+        self.assertEqual(response[2], 1)
+        self.assertIsInstance(self.mcp.send_cmd([CMD_GET_GPIO_VALUES]), list)
+
+
+    def test_threads(self):
+        """GPIO from one thread, I2C from another."""
+        self.eeprom.write_time = 0
+        self.mcp.set_pin_function(gp0 = "GPIO_OUT", gp1 = "GPIO_IN")
+        self.mcp.I2C_write(0x50, b"\x00\x00" + bytes(range(60)))
+        errors = []
+
+        def gpio():
+            try:
+                for i in range(200):
+                    self.mcp.GPIO_write(gp0 = i & 1)
+                    self.assertEqual(self.mcp.GPIO_read()[0], i & 1)
+            except Exception as e:
+                errors.append(e)
+
+        def i2c():
+            try:
+                for i in range(50):
+                    self.assertEqual(self.mcp.I2C_write_read(0x50, b"\x00\x00", 60), bytes(range(60)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target = gpio), threading.Thread(target = i2c)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        self.assertEqual(errors, [])
+
+
+    def test_open_shared(self):
+        """Opening a device in use by another thread returns it as it is."""
+        self.eeprom.write_time = 0
+        self.mcp.I2C_write(0x50, b"\x00\x00" + bytes(range(60)))
+        errors = []
+        opened = []
+
+        def i2c():
+            try:
+                for i in range(50):
+                    self.assertEqual(self.mcp.I2C_write_read(0x50, b"\x00\x00", 60), bytes(range(60)))
+            except Exception as e:
+                errors.append(e)
+
+        def open_again():
+            try:
+                for i in range(50):
+                    opened.append(EasyMCP2221.Device(transport = self.emu))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target = i2c), threading.Thread(target = open_again)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(all(mcp is self.mcp for mcp in opened))
+
+        # Nothing sent to the device
+        status = self.mcp.status
+        transactions = self.chip.transactions
+        self.assertIs(EasyMCP2221.Device(transport = self.emu), self.mcp)
+        self.assertIs(self.mcp.status, status)
+        self.assertEqual(self.chip.transactions, transactions)
+
+        # Opened again after a USB error
+        self.mcp.status["usb_error"] = True
+        self.assertIs(EasyMCP2221.Device(transport = self.emu), self.mcp)
+        self.assertFalse(self.mcp.status["usb_error"])
+        self.assertGreater(self.chip.transactions, transactions)
+
+
+    def test_transaction(self):
+        """Other threads wait until the transaction ends."""
+        self.mcp.set_pin_function(gp0 = "GPIO_OUT")
+        done = threading.Event()
+
+        def other():
+            self.mcp.GPIO_write(gp0 = 1)
+            done.set()
+
+        with self.mcp.transaction() as mcp:
+            self.assertIs(mcp, self.mcp)
+            t = threading.Thread(target = other)
+            t.start()
+            self.assertFalse(done.wait(0.1))
+            self.assertEqual(self.mcp.GPIO_read()[0], 0)
+
+        t.join()
+        self.assertEqual(self.mcp.GPIO_read()[0], 1)
+
+
+    def test_read_iter_lock(self):
+        """I2C_read_iter does not keep the device locked, other I2C operations cancel it."""
+        self.eeprom.write_time = 0
+        self.mcp.I2C_write(0x50, b"\x00\x00" + bytes(range(64)))
+        result = []
+
+        def other():
+            result.append(self.mcp.I2C_write_read(0x50, b"\x00\x00", 4))
+
+        def run(target):
+            t = threading.Thread(target = target)
+            t.start()
+            t.join(1)
+            self.assertFalse(t.is_alive())
+
+        # Whole iteration
+        self.mcp.I2C_write(0x50, b"\x00\x00", "nonstop")
+        chunks = self.mcp.I2C_read_iter(0x50, 64, "restart")
+        self.assertEqual(b"".join(chunks), bytes(range(64)))
+
+        # Another thread does not wait for an unfinished iterator, and cancels it
+        chunks = self.mcp.I2C_read_iter(0x50, 64)
+        self.assertEqual(len(next(chunks)), 60)
+        run(other)
+        self.assertEqual(result[-1], bytes(range(4)))
+        with self.assertRaises(RuntimeError):
+            next(chunks)
+
+        # The same thread also cancels it
+        chunks = self.mcp.I2C_read_iter(0x50, 64)
+        self.assertEqual(self.mcp.I2C_read(0x50, 2), bytes(range(4, 6)))
+        with self.assertRaises(RuntimeError):
+            next(chunks)
+
+        # Iterator started in a thread and closed in another one
+        chunks = self.mcp.I2C_read_iter(0x50, 64)
+        run(lambda: next(chunks))
+        chunks.close()
+        self.assertIsNone(self.mcp.status["i2c_reader"])
+        self.assertFalse(self.mcp.status["i2c_dirty"])
+        run(other)
+        self.assertEqual(result[-1], bytes(range(4)))
+
+
+    def test_virtual_time(self):
+        """I2C timing follows the bus speed, USB commands take two intervals."""
+        self.mcp.I2C_speed(100_000)
+        start = self.emu.now()
+        self.mcp.I2C_read(0x50, 60)
+        elapsed = self.emu.now() - start
+
+        # 61 bytes at 100kHz: 5.5ms
+        self.assertGreater(elapsed, 0.0055)
+        self.assertLess(elapsed, 0.0055 + 20 * self.emu.usb_interval)
+
+
+    def test_fast_open(self):
+        """Fewer commands to open, delayed work runs on first use."""
+        opened = self.chip.transactions
+
+        EasyMCP2221.Device._catalog = {}
+        self.chip.transactions = 0
+        mcp = EasyMCP2221.Device(transport = self.emu, fast_open = True)
+        self.assertLess(self.chip.transactions, opened)
+        self.assertLessEqual(self.chip.transactions, 2)
+
+        self.assertTrue(mcp.status["sram_reinforce"])
+        mcp.DAC_write(9)
+        self.assertFalse(mcp.status["sram_reinforce"])
+        self.assertEqual(self.chip.dac_value, 9)
+
+        self.assertEqual(mcp.usbserial, "0000000000")
+
+        self.eeprom.write_time = 0
+        mcp.I2C_write(0x50, b"\x00\x00\x5a")
+        self.assertEqual(mcp.I2C_write_read(0x50, b"\x00\x00", 1), b"\x5a")
+
+
+
+    def test_enumeration_cache(self):
+        """One enumeration per open, new devices are found anyway."""
+        calls = []
+        enumerate_ = self.emu.enumerate
+        self.emu.enumerate = lambda *args: calls.append(args) or enumerate_(*args)
+
+        EasyMCP2221.Device._catalog = {}
+        EasyMCP2221.Device.clear_enumeration_cache()
+        mcp = EasyMCP2221.Device(transport = self.emu, fast_open = True)
+        self.assertEqual(len(calls), 1)
+        self.assertIs(EasyMCP2221.Device(transport = self.emu), mcp)
+        self.assertEqual(len(calls), 1)
+
+        # Plugged after the enumeration
+        self.emu.add_chip()
+        mcp2 = EasyMCP2221.Device(transport = self.emu, devnum = 1, fast_open = True)
+        self.assertIsNot(mcp2, mcp)
+        self.assertEqual(len(calls), 2)
+
+        EasyMCP2221.Device.clear_enumeration_cache()
+        EasyMCP2221.Device(transport = self.emu)
+        self.assertEqual(len(calls), 3)
+
+
+
+    def test_flash_cache(self):
+        """Flash settings read once, invalidated by save_config."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "flash.json")
+            EasyMCP2221.Device._catalog = {}
+            mcp = EasyMCP2221.Device(transport = self.emu, flash_cache = path)
+
+            first = mcp.read_flash_info()
+            self.assertTrue(os.path.exists(path))
+
+            self.chip.transactions = 0
+            self.assertEqual(mcp.read_flash_info(), first)
+            self.assertEqual(self.chip.transactions, 1)
+
+            # Another object, same file
+            EasyMCP2221.Device._catalog = {}
+            mcp = EasyMCP2221.Device(transport = self.emu, flash_cache = path)
+            expected = str(self.mcp)
+            self.chip.transactions = 0
+            self.assertEqual(str(mcp), expected)
+            self.assertEqual(self.chip.transactions, 1)
+
+            mcp.enable_cdc_serial(True)
+            mcp.save_config()
+            self.assertEqual(mcp.read_flash_info()["CHIP_SETTINGS"]["cdcsnen"], "enabled")
+
+
+
+    def test_flash_cache_same_serial(self):
+        """Two chips with the same factory serial number do not share their cache entry."""
+        emu = Emulator(chips = 0)
+        first  = emu.add_chip(usb_serial = "AAAA", cdc_serial = True)
+        second = emu.add_chip(usb_serial = "BBBB", cdc_serial = True)
+        second.factory_serial = first.factory_serial
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "flash.json")
+            EasyMCP2221.Device._catalog = {}
+
+            mcp0 = EasyMCP2221.Device(transport = emu, devnum = 0, flash_cache = path)
+            mcp1 = EasyMCP2221.Device(transport = emu, devnum = 1, flash_cache = path)
+
+            self.assertEqual(mcp0.read_flash_info()["USB_SERIAL"], "AAAA")
+            self.assertEqual(mcp1.read_flash_info()["USB_SERIAL"], "BBBB")
+
+            # Both cached
+            second.transactions = 0
+            self.assertEqual(mcp1.read_flash_info()["USB_SERIAL"], "BBBB")
+            self.assertEqual(second.transactions, 1)
+
+            # Another chip with the same factory serial number in the same port
+            first.unplug()
+            second.unplug()
+            second.plug(first.path)
+            EasyMCP2221.Device._catalog = {}
+            EasyMCP2221.Device.clear_enumeration_cache()
+
+            mcp = EasyMCP2221.Device(transport = emu, flash_cache = path)
+            self.assertEqual(mcp.read_flash_info()["USB_SERIAL"], "BBBB")
+
+
+    def test_scan_serial(self):
+        """Scan all devices once, later opens use the serial numbers found."""
+        emu = Emulator(chips = 0)
+        for i in range(8):
+            emu.add_chip(usb_serial = "SN%d" % i)
+
+        EasyMCP2221.Device._catalog = {}
+        mcp = EasyMCP2221.Device(transport = emu, usbserial = "SN5", scan_serial = True)
+        self.assertEqual(mcp.usbserial, "SN5")
+        self.assertIs(mcp.hidhandler.chip, emu.chips[5])
+
+        for chip in emu.chips:
+            chip.commands.clear()
+
+        mcp = EasyMCP2221.Device(transport = emu, usbserial = "SN2", scan_serial = True)
+        self.assertEqual(mcp.usbserial, "SN2")
+        self.assertEqual(sum(chip.commands.get(CMD_READ_FLASH_DATA, 0) for chip in emu.chips), 1)
+
+        with self.assertRaises(RuntimeError):
+            EasyMCP2221.Device(transport = emu, usbserial = "SN9", scan_serial = True)
+
+        # Only used with scan_serial
+        with self.assertRaises(RuntimeError):
+            EasyMCP2221.Device(transport = emu, usbserial = "SN3")
+
+        # Another chip plugged at the same path is not taken for the old one
+        path = emu.chips[3].path
+        emu.chips[3].unplug()
+        EasyMCP2221.Device._enumerate(emu, DEV_DEFAULT_VID, DEV_DEFAULT_PID, refresh = True)
+        other = emu.add_chip(usb_serial = "OTHER")
+        other.unplug()
+        other.plug(path)
+
+        with self.assertRaises(RuntimeError):
+            EasyMCP2221.Device(transport = emu, usbserial = "SN3", scan_serial = True)
+        self.assertIs(EasyMCP2221.Device(transport = emu, usbserial = "OTHER", scan_serial = True).hidhandler.chip, other)
+
+
+    def test_fast_reset(self):
+        """Fast reset reopens the device without flash reads and loads power-up settings."""
+        emu = Emulator(chips = 0)
+        chip = emu.add_chip(usb_serial = "SN1", cdc_serial = True)
+        chip.attach(EEPROM(0x50, write_time = 0))
+
+        EasyMCP2221.Device._catalog = {}
+        mcp = EasyMCP2221.Device(transport = emu, usbserial = "SN1")
+        mcp.set_pin_function(gp0 = "GPIO_OUT", out0 = True)
+        mcp.DAC_write(10)
+        old_handler = mcp.hidhandler
+
+        chip.commands.clear()
+        start = time.perf_counter()
+        mcp.reset(fast = True)
+        self.assertLess(time.perf_counter() - start, 0.25)
+
+        self.assertEqual(chip.resets, 1)
+        self.assertEqual(chip.commands.get(CMD_READ_FLASH_DATA, 0), 1)  # serial probe only
+        self.assertIsNot(mcp.hidhandler, old_handler)
+        self.assertIs(EasyMCP2221.Device._catalog[mcp.usbpath], mcp)
+
+        # SRAM is back to flash defaults
+        self.assertEqual(mcp.status["dac_value"], chip.dac_value)
+        self.assertNotEqual(mcp.status["dac_value"], 10)
+        mcp.I2C_write(0x50, b"\x00\x00")
+
+        # With fast_open, back at another path
+        EasyMCP2221.Device._catalog = {}
+        mcp = EasyMCP2221.Device(transport = emu, usbserial = "SN1", fast_open = True)
+        power_up = chip.power_up
+        def power_up_moved():
+            power_up()
+            chip.path = b"emulated-moved"
+        chip.power_up = power_up_moved
+
+        mcp.reset(fast = True)
+        self.assertEqual(mcp.usbpath, b"emulated-moved")
+        self.assertIs(EasyMCP2221.Device._catalog[b"emulated-moved"], mcp)
+        mcp.I2C_write(0x50, b"\x00\x00")
+
+
+    def test_configure(self):
+        """Configuration calls inside configure() end in the same state with fewer SRAM commands."""
+        def setup(mcp):
+            mcp.set_pin_function(gp0 = "GPIO_OUT", out0 = True, gp1 = "CLK_OUT", gp2 = "DAC", gp3 = "ADC")
+            mcp.clock_config(50, "375kHz")
+            mcp.DAC_config(ref = "2.048V", out = 16)
+            mcp.ADC_config(ref = "4.096V")
+            mcp.IOC_config(edge = "none")
+
+        states = []
+        for coalesce in (False, True):
+            emu = Emulator(chips = 1)
+            chip = emu.chips[0]
+            EasyMCP2221.Device._catalog = {}
+            mcp = EasyMCP2221.Device(transport = emu)
+            chip.commands.clear()
+
+            if coalesce:
+                with mcp.configure():
+                    setup(mcp)
+            else:
+                setup(mcp)
+
+            states.append((chip.gp, chip.sram_clock, chip.dac_ref, chip.dac_value, chip.adc_ref, chip.ioc))
+            sram_writes = chip.commands[CMD_SET_SRAM_SETTINGS]
+
+        self.assertEqual(states[0], states[1])
+        self.assertEqual(sram_writes, 2)
+
+        # DAC reference change only: DAC off first
+        sram = []
+        set_sram = chip._set_sram
+        chip._set_sram = lambda buf, r: (sram.append(bytes(buf)), set_sram(buf, r))
+        mcp.apply_config({"dac": {"ref": "VDD", "out": 5}})
+        self.assertEqual(len(sram), 2)
+        self.assertEqual(sram[0][3], ALTER_DAC_REF | DAC_REF_VRM | DAC_VRM_OFF)
+        self.assertEqual((chip.dac_ref, chip.dac_value), (DAC_REF_VDD, 5))
+
+        # Nothing sent and settings kept on error
+        chip.commands.clear()
+        with self.assertRaises(ValueError):
+            mcp.apply_config({"pins": {"gp0": "GPIO_IN"}, "dac": {"ref": "3V"}})
+        with self.assertRaises(ValueError):
+            mcp.apply_config({"leds": {}})
+        self.assertEqual(chip.commands.get(CMD_SET_SRAM_SETTINGS, 0), 0)
+        self.assertEqual(mcp.status["GPIO"]["gp0"], chip.gp[0])
+        self.assertEqual(mcp.status["dac_ref"], DAC_REF_VDD)
+
+
+    def test_configure_ioc_clear(self):
+        """IOC_clear is not deferred by configure(), and does not send pending settings."""
+        self.mcp.set_pin_function(gp1 = "IOC")
+        self.mcp.IOC_config(edge = "rising")
+        self.chip.set_input(1, 1)
+        self.assertEqual(self.mcp.IOC_read(), 1)
+
+        with self.mcp.configure():
+            self.mcp.DAC_config(ref = "2.048V")
+            self.mcp.IOC_clear()
+            self.assertEqual(self.mcp.IOC_read(), 0)
+            self.assertNotEqual(self.chip.dac_ref, DAC_REF_VRM | DAC_VRM_2048)
+
+        self.assertEqual(self.chip.dac_ref, DAC_REF_VRM | DAC_VRM_2048)
+
+        # Edge setting kept
+        self.chip.set_input(1, 0)
+        self.chip.set_input(1, 1)
+        self.assertEqual(self.mcp.IOC_read(), 1)
+        self.assertEqual(self.chip.ioc, 0b01)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
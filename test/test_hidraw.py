@@ -0,0 +1,87 @@
+import os
+import socket
+import tempfile
+import unittest
+
+from EasyMCP2221 import hidraw
+from EasyMCP2221.Constants import *
+
+
+class Hidraw(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_root = hidraw.SYSFS_ROOT
+        hidraw.SYSFS_ROOT = self.tmp.name
+
+        self.node("hidraw10", "0003:000004D8:000000DD", "usb-0000:00:14.0-2/input2", "SERIAL2")
+        self.node("hidraw2",  "0003:000004D8:000000DD", "usb-0000:00:14.0-1/input2", "SERIAL1")
+        self.node("hidraw0",  "0003:0000046D:0000C52B", "usb-0000:00:14.0-3/input0", "")
+
+
+    def tearDown(self):
+        hidraw.SYSFS_ROOT = self.old_root
+        self.tmp.cleanup()
+
+
+    def node(self, name, hid_id, phys, uniq):
+        """Fake sysfs entry."""
+        path = os.path.join(self.tmp.name, name, "device")
+        os.makedirs(path)
+        with open(os.path.join(path, "uevent"), "w") as f:
+            f.write("DRIVER=hid-generic\nHID_ID=%s\nHID_NAME=Test\nHID_PHYS=%s\nHID_UNIQ=%s\n" %
+                (hid_id, phys, uniq))
+
+
+    def test_enumerate(self):
+        """Filter by VID/PID, numeric order."""
+        devices = hidraw.enumerate(DEV_DEFAULT_VID, DEV_DEFAULT_PID)
+
+        self.assertEqual([d["path"] for d in devices], [b"/dev/hidraw2", b"/dev/hidraw10"])
+        self.assertEqual([d["serial_number"] for d in devices], ["SERIAL1", "SERIAL2"])
+        self.assertEqual(devices[0]["interface_number"], 2)
+
+        self.assertEqual(len(hidraw.enumerate()), 3)
+
+
+    def test_read_write(self):
+        """One report per read and write."""
+        a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+
+        dev = hidraw.device()
+        dev.fd = a.detach()
+        dev.poller = hidraw.select.poll()
+        dev.poller.register(dev.fd, hidraw.select.POLLIN)
+
+        try:
+            dev.write([0x00, CMD_POLL_STATUS_SET_PARAMETERS] + [0] * 63)
+            self.assertEqual(b.recv(100), bytes([0, CMD_POLL_STATUS_SET_PARAMETERS]) + bytes(63))
+
+            # timeout
+            self.assertEqual(dev.read(PACKET_SIZE, 10), [])
+
+            b.send(bytes([CMD_POLL_STATUS_SET_PARAMETERS, 0]) + bytes(62))
+            first = dev.read(PACKET_SIZE, 1000)
+
+            b.send(bytes([CMD_GET_GPIO_VALUES, 0]) + bytes(62))
+            second = dev.read(PACKET_SIZE)
+
+            # responses are not overwritten by the next read
+            self.assertEqual(first[0], CMD_POLL_STATUS_SET_PARAMETERS)
+            self.assertEqual(second[0], CMD_GET_GPIO_VALUES)
+            self.assertEqual(len(first), PACKET_SIZE)
+
+            # read into a buffer
+            buffer = bytearray(PACKET_SIZE)
+            self.assertEqual(dev.readinto(buffer, 10), 0)
+            b.send(bytes([CMD_I2C_READ_DATA_GET_I2C_DATA, 0, 0x55]) + bytes(61))
+            self.assertEqual(dev.readinto(buffer, 1000), PACKET_SIZE)
+            self.assertEqual(buffer[0:3], bytes([CMD_I2C_READ_DATA_GET_I2C_DATA, 0, 0x55]))
+
+        finally:
+            dev.close()
+            b.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import threading
+import unittest
+
+import EasyMCP2221
+from EasyMCP2221.hotplug import HotplugMonitor
+from EasyMCP2221.emulator import Emulator, EEPROM
+from EasyMCP2221.exceptions import *
+from EasyMCP2221.Constants import CMD_POLL_STATUS_SET_PARAMETERS
+
+
+class Hotplug(unittest.TestCase):
+    """Reconnect emulated devices."""
+
+    def setUp(self):
+        EasyMCP2221.Device._catalog = {}
+        self.emu = Emulator(chips = 0)
+        self.chips = [self.emu.add_chip(usb_serial = "SN%d" % i) for i in range(2)]
+        for chip in self.chips:
+            chip.attach(EEPROM(0x50, write_time = 0))
+
+        self.devices = [EasyMCP2221.Device(transport = self.emu, devnum = i) for i in range(2)]
+        self.events = []
+        self.monitor = HotplugMonitor(
+            self.devices,
+            on_removed = lambda mcp: self.events.append(("removed", mcp)),
+            on_reconnected = lambda mcp: self.events.append(("reconnected", mcp)))
+
+
+    def tearDown(self):
+        self.monitor.stop()
+        EasyMCP2221.Device._catalog = {}
+
+
+    def test_new_path(self):
+        """Device comes back in another path, settings are restored."""
+        mcp, chip = self.devices[1], self.chips[1]
+        mcp.set_pin_function(gp0 = "GPIO_OUT", out0 = 1, gp2 = "ADC", gp3 = "DAC")
+        mcp.DAC_write(21)
+        mcp.I2C_speed(400_000)
+        gp, div = list(chip.gp), chip.i2c_div
+
+        chip.unplug()
+        self.assertEqual(self.monitor.poll(), [])
+        self.assertEqual(self.events, [("removed", mcp)])
+
+        with self.assertRaises(OSError):
+            mcp.GPIO_read()
+
+        chip.plug(b"emulator:9")
+        self.assertEqual(chip.dac_value, 0)
+        self.assertEqual(self.monitor.poll(), [mcp])
+        self.assertEqual(self.events[-1], ("reconnected", mcp))
+
+        self.assertEqual(mcp.usbpath, b"emulator:9")
+        self.assertIs(EasyMCP2221.Device._catalog[b"emulator:9"], mcp)
+        self.assertEqual(chip.gp, gp)
+        self.assertEqual(chip.dac_value, 21)
+        self.assertEqual(chip.i2c_div, div)
+
+        self.assertEqual(mcp.GPIO_read()[0], 1)
+        mcp.I2C_write(0x50, b"\x00\x00\x33")
+        self.assertEqual(mcp.I2C_write_read(0x50, b"\x00\x00", 1), b"\x33")
+
+        # The other one was not touched
+        self.assertEqual([e[1] for e in self.events], [mcp, mcp])
+
+
+    def test_glitch(self):
+        """Unplugged and plugged between two checks, same path."""
+        mcp, chip = self.devices[0], self.chips[0]
+
+        mcp.set_pin_function(gp0 = "GPIO_OUT", out0 = 1)
+        gp = list(chip.gp)
+
+        chip.unplug()
+        chip.plug()
+        self.assertNotEqual(chip.gp, gp)
+
+        # Found by the status check, before any command fails
+        self.assertEqual(self.monitor.poll(), [mcp])
+        self.assertEqual(self.events, [("removed", mcp), ("reconnected", mcp)])
+        self.assertEqual(chip.gp, gp)
+        self.assertEqual(mcp.GPIO_read()[0], 1)
+
+        # Only checked when idle
+        held, done = threading.Event(), threading.Event()
+
+        def busy():
+            with mcp.transaction():
+                held.set()
+                done.wait()
+
+        thread = threading.Thread(target = busy)
+        thread.start()
+        held.wait()
+        chip.commands.clear()
+        self.assertEqual(self.monitor.poll(), [])
+        self.assertEqual(chip.commands, {})
+        done.set()
+        thread.join()
+
+        self.assertEqual(self.monitor.poll(), [])
+        self.assertEqual(chip.commands[CMD_POLL_STATUS_SET_PARAMETERS], 1)
+
+
+    def test_swap(self):
+        """Both devices come back in each other's path."""
+        for chip in self.chips:
+            chip.unplug()
+        self.monitor.poll()
+
+        self.chips[0].plug(b"emulator:1")
+        self.chips[1].plug(b"emulator:0")
+        self.assertEqual(set(self.monitor.poll()), set(self.devices))
+
+        for mcp, chip in zip(self.devices, self.chips):
+            self.assertIs(mcp.hidhandler.chip, chip)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
 import unittest
 import json
+import io
 from random import randbytes
 from time import sleep
 
 import EasyMCP2221
+import EasyMCP2221.Constants
 from EasyMCP2221.exceptions import *
 
 
@@ -215,6 +217,213 @@ class I2C(unittest.TestCase):
             self.assertEqual(response, content)
 
 
+    def test_i2c_readinto(self):
+        """Read into a buffer in place, reusing it."""
+        content = randbytes(64)
+
+        self.mcp.I2C_write(self.i2caddr, b'\x00\x00' + content)
+        sleep(0.01)
+
+        buf = bytearray(100)
+        view = memoryview(buf)
+
+        for l in (1, 59, 60, 61, 64):
+            self.mcp.I2C_write(self.i2caddr, b'\x00\x00', "nonstop")
+            n = self.mcp.I2C_readinto(self.i2caddr, view[10:10+l], "restart")
+            self.assertEqual(n, l)
+            self.assertEqual(buf[10:10+l], content[:l])
+
+        with self.assertRaises(ValueError):
+            self.mcp.I2C_readinto(self.i2caddr, bytearray())
+
+
+    def test_i2c_read_iter(self):
+        """Read chunk by chunk."""
+        content = randbytes(64)
+
+        self.mcp.I2C_write(self.i2caddr, b'\x00\x00' + content)
+        sleep(0.01)
+
+        self.mcp.I2C_write(self.i2caddr, b'\x00\x00', "nonstop")
+        chunks = list(self.mcp.I2C_read_iter(self.i2caddr, 64, "restart"))
+
+        self.assertEqual([len(c) for c in chunks], [60, 4])
+        self.assertEqual(b''.join(chunks), content)
+
+
+    def test_i2c_read_iter_abandon(self):
+        """Stop reading before the end, next operation still works."""
+        it = self.mcp.I2C_read_iter(self.i2caddr, 1000)
+        next(it)
+        del it
+
+        self.mcp.I2C_read(self.i2caddr, 1)
+
+
+    def test_i2c_write_buffer(self):
+        """Write from a memoryview slice."""
+        content = randbytes(64)
+        buf = memoryview(bytearray(b'\x00\x00' + content + b'garbage'))
+
+        self.mcp.I2C_write(self.i2caddr, buf[:66])
+        sleep(0.01)
+
+        self.assertEqual(self.mcp.I2C_write_read(self.i2caddr, b'\x00\x00', 64), content)
+
+
+    def test_i2c_write_stream(self):
+        """Write from a file and from an iterator."""
+        content = randbytes(64)
+
+        self.mcp.I2C_write_stream(self.i2caddr, io.BytesIO(b'\x00\x00' + content + b'garbage'), 66)
+        sleep(0.01)
+
+        self.assertEqual(self.mcp.I2C_write_read(self.i2caddr, b'\x00\x00', 64), content)
+
+        content = randbytes(64)
+        pieces = (b'\x00', b'\x00' + content[:10], content[10:])
+
+        self.mcp.I2C_write_stream(self.i2caddr, pieces, 66)
+        sleep(0.01)
+
+        self.assertEqual(self.mcp.I2C_write_read(self.i2caddr, b'\x00\x00', 64), content)
+
+        content = randbytes(64)
+
+        self.mcp.I2C_write_stream(self.i2caddr, bytearray(b'\x00\x00' + content), 66)
+        sleep(0.01)
+
+        self.assertEqual(self.mcp.I2C_write_read(self.i2caddr, b'\x00\x00', 64), content)
+
+
+    def test_i2c_write_stream_short(self):
+        """Source has not enough data. Nothing is written if its length is known."""
+        content = randbytes(64)
+        self.mcp.I2C_write(self.i2caddr, b'\x00\x00' + content)
+        sleep(0.01)
+
+        for source in (io.BytesIO(b'\x00\x00' + bytes(98)), b'\x00\x00' + bytes(98)):
+            with self.assertRaises(ValueError):
+                self.mcp.I2C_write_stream(self.i2caddr, source, 130)
+
+        self.assertEqual(self.mcp.I2C_write_read(self.i2caddr, b'\x00\x00', 64), content)
+
+        # An iterator is only known to be short when it ends
+        with self.assertRaises(ValueError):
+            self.mcp.I2C_write_stream(self.i2caddr, iter([b'\x00\x00', bytes(98)]), 130)
+
+
+    def test_i2c_write_read_combined(self):
+        """Write position and read back in a single I2C_write_read call."""
+        content = randbytes(64)
+
+        self.mcp.I2C_write(self.i2caddr, b'\x00\x00' + content)
+        sleep(0.01)
+
+        for l in (1, 59, 60, 61, 64):
+            response = self.mcp.I2C_write_read(self.i2caddr, b'\x00\x00', l)
+            self.assertEqual(response, content[:l])
+
+
+    def test_i2c_write_read_combined_no_device(self):
+        """I2C_write_read from a wrong device address."""
+
+        with self.assertRaises(NotAckError):
+            self.mcp.I2C_write_read(self.NO_i2caddr, b'\x00\x00', 1)
+
+        with self.assertRaises(NotAckError):
+            self.mcp.I2C_write_read(self.NO_i2caddr, b'\x00' * 65, 1)
+
+
+    def test_i2c_transaction(self):
+        """Run several segments and read them back."""
+        content = randbytes(64)
+
+        self.mcp.I2C_write(self.i2caddr, b'\x00\x00' + content)
+        sleep(0.01)
+
+        results, errors = self.mcp.I2C_transaction([
+            ("write", self.i2caddr, b'\x00\x00', "nonstop"),
+            ("read",  self.i2caddr, 64, "restart"),
+            ("read",  self.i2caddr, 1),
+            ("write", self.i2caddr, b'\x00\x00')])
+
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual(results[:2], [None, content])
+        self.assertEqual(len(results[2]), 1)
+
+        # Same data types as I2C_write
+        results, errors = self.mcp.I2C_transaction([
+            ("write", self.i2caddr, [0, 0], "nonstop"),
+            ("read",  self.i2caddr, 2, "restart"),
+            ("write", self.i2caddr, bytearray(b'\x00\x01'), "nonstop"),
+            ("read",  self.i2caddr, 2, "restart")])
+
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual(results, [None, content[0:2], None, content[1:3]])
+
+
+    def test_i2c_transaction_errors(self):
+        """Errors are reported for the right segment."""
+        results, errors = self.mcp.I2C_transaction([
+            ("write", self.NO_i2caddr, b'1'),
+            ("write", self.i2caddr, b'\x00\x00', "nonstop"),
+            ("read",  self.i2caddr, 1, "restart"),
+            ("write", self.NO_i2caddr, b'\x00\x00', "nonstop"),
+            ("read",  self.NO_i2caddr, 1, "restart"),
+            ("write", self.NO_i2caddr, b'1')])
+
+        self.assertIsInstance(errors[0], NotAckError)
+        self.assertEqual(errors[1:3], [None, None])
+        self.assertEqual(len(results[2]), 1)
+        self.assertIsInstance(errors[3], NotAckError)
+        self.assertIs(errors[4], errors[3])
+        self.assertIsInstance(errors[5], NotAckError)
+
+
+    def test_i2c_transaction_invalid(self):
+        """Nothing is sent if a segment is not valid."""
+        with self.assertRaises(ValueError):
+            self.mcp.I2C_transaction([("read", self.i2caddr, 0)])
+
+        with self.assertRaises(ValueError):
+            self.mcp.I2C_transaction([
+                ("write", self.i2caddr, b'\x00', "nonstop"),
+                ("read",  self.i2caddr, 1)])
+
+
+    def test_i2c_adaptive_polling(self):
+        """Adaptive polling works and sends fewer commands at low speed."""
+        content = randbytes(64)
+
+        self.mcp.I2C_speed(47000)
+        self.mcp.I2C_write(self.i2caddr, b'\x00\x00' + content)
+        sleep(0.05)
+
+        count = {}
+        send_cmd = self.mcp.send_cmd
+
+        try:
+            for adaptive in (False, True):
+                self.mcp.adaptive_polling = adaptive
+                count[adaptive] = 0
+
+                def counter(buf):
+                    count[adaptive] += 1
+                    return send_cmd(buf)
+
+                self.mcp.send_cmd = counter
+                response = self.mcp.I2C_write_read(self.i2caddr, b'\x00\x00', 64)
+                del self.mcp.send_cmd
+
+                self.assertEqual(response, content)
+
+        finally:
+            self.mcp.adaptive_polling = False
+
+        self.assertLess(count[True], count[False])
+
+
     def test_i2c_write_1_byte_scl_down(self):
         """Try to write while SCL is down."""
         self.mcp.GPIO_write(gp0 = False)
@@ -331,6 +540,59 @@ class I2C(unittest.TestCase):
             self.mcp.I2C_read(self.NO_i2caddr, 1)
 
 
+    def test_i2c_known_state_no_status_check(self):
+        """Do not read I2C status before a transfer if the state is known."""
+        self.mcp.I2C_read(self.i2caddr, 1)
+
+        cmds = []
+        send_cmd = self.mcp.send_cmd
+        self.mcp.send_cmd = lambda buf: cmds.append(buf[0]) or send_cmd(buf)
+
+        try:
+            self.mcp.I2C_write(self.i2caddr, b'\x00\x00', "nonstop")
+            self.assertEqual(cmds[0], EasyMCP2221.Constants.CMD_I2C_WRITE_DATA_NO_STOP)
+
+            cmds.clear()
+            self.mcp.I2C_read(self.i2caddr, 1, "restart")
+            self.assertEqual(cmds[0], EasyMCP2221.Constants.CMD_I2C_READ_DATA_REPEATED_START)
+
+            # GPIO commands may disturb the bus, status must be read again
+            self.mcp.GPIO_write(gp1 = 1)
+            cmds.clear()
+            self.mcp.I2C_read(self.i2caddr, 1)
+            self.assertEqual(cmds[0], EasyMCP2221.Constants.CMD_POLL_STATUS_SET_PARAMETERS)
+
+        finally:
+            del self.mcp.send_cmd
+
+
+    def test_i2c_deferred_write_check(self):
+        """Errors of a deferred write are raised by the next I2C operation."""
+        self.mcp.deferred_write_check = True
+
+        try:
+            self.mcp.I2C_write(self.NO_i2caddr, b'A')
+
+            with self.assertRaises(NotAckError):
+                self.mcp.I2C_write(self.i2caddr, b'\x00\x00')
+
+            self.mcp.I2C_write(self.NO_i2caddr, b'A')
+
+            with self.assertRaises(NotAckError):
+                self.mcp.I2C_read(self.i2caddr, 1)
+
+            self.mcp.I2C_write(self.NO_i2caddr, b'A')
+
+            with self.assertRaises(NotAckError):
+                self.mcp.I2C_flush()
+
+            # Nothing pending
+            self.mcp.I2C_flush()
+
+        finally:
+            self.mcp.deferred_write_check = False
+
+
     def test_i2c_sartup_low_sda(self):
         """Recover from startup while SDA line was down."""
 
@@ -0,0 +1,78 @@
+import threading
+import unittest
+
+import EasyMCP2221
+from EasyMCP2221.pool import DevicePool
+from EasyMCP2221.emulator import Emulator, EEPROM
+from EasyMCP2221.exceptions import *
+
+
+class Pool(unittest.TestCase):
+    """DevicePool on 8 emulated chips."""
+
+    def setUp(self):
+        EasyMCP2221.Device._catalog = {}
+        self.emu = Emulator(chips = 8)
+
+        for i, chip in enumerate(self.emu.chips):
+            chip.analog[1] = i * 100
+            if i != 5:
+                chip.attach(EEPROM(0x50, write_time = 0))
+
+        self.pool = DevicePool(transport = self.emu)
+
+
+    def tearDown(self):
+        self.pool.close()
+        EasyMCP2221.Device._catalog = {}
+
+
+    def test_open(self):
+        """Open all devices, or by serial number."""
+        self.assertEqual(len(self.pool), 8)
+        self.assertEqual(len(set(id(mcp) for mcp in self.pool)), 8)
+
+        emu = Emulator(chips = 0)
+        for i in range(4):
+            emu.add_chip(usb_serial = "SN%d" % i, cdc_serial = True)
+
+        EasyMCP2221.Device._catalog = {}
+        with DevicePool(usbserials = ["SN3", "SN1"], transport = emu) as pool:
+            self.assertEqual([mcp.usbserial for mcp in pool], ["SN3", "SN1"])
+
+
+    def test_broadcast(self):
+        """Same call on all devices, per-device errors."""
+        self.pool.broadcast("set_pin_function", gp2 = "ADC")
+        results, errors = self.pool.broadcast("ADC_read")
+
+        self.assertEqual([r[1] for r in results], [i * 100 for i in range(8)])
+        self.assertEqual(errors, [None] * 8)
+
+        results, errors = self.pool.broadcast("I2C_write", 0x50, b"\x00\x00\x55")
+        self.assertIsInstance(errors[5], NotAckError)
+        self.assertEqual(results, [None] * 8)
+        self.assertEqual([e is None for e in errors].count(True), 7)
+
+
+    def test_map(self):
+        """Different arguments, callables receive the device."""
+        threads = set()
+
+        def write_read(mcp, value):
+            threads.add(threading.current_thread())
+            mcp.I2C_write(0x50, b"\x00\x00" + bytes([value]))
+            return mcp.I2C_write_read(0x50, b"\x00\x00", 1)[0]
+
+        results, errors = self.pool.map(write_read, [(i,) for i in range(8)])
+
+        self.assertEqual(results[:5] + results[6:], [0, 1, 2, 3, 4, 6, 7])
+        self.assertIsInstance(errors[5], NotAckError)
+        self.assertEqual(len(threads), 8)
+
+        with self.assertRaises(ValueError):
+            self.pool.map(write_read, [(1,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
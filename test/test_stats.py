@@ -0,0 +1,141 @@
+import threading
+import unittest
+
+import EasyMCP2221
+from EasyMCP2221 import stats
+from EasyMCP2221.emulator import Emulator, EEPROM
+from EasyMCP2221.Constants import *
+
+
+class FakeHID:
+    """Answer every command echoing the command code. Status byte from a list of results."""
+
+    def __init__(self, results = ()):
+        self.results = list(results)
+        self.last = None
+
+    def write(self, data):
+        self.last = data[1]
+
+    def read(self, size, timeout = -1):
+        r = [0] * size
+        r[0] = self.last
+        if self.results:
+            result = self.results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            r[1] = result
+        return r
+
+    def close(self):
+        pass
+
+
+def fake_device(hid):
+    """Device object without USB initialization."""
+    mcp = object.__new__(EasyMCP2221.Device)
+    mcp.status = {"i2c_state": None}
+    mcp.trace_packets = False
+    mcp.debug_messages = False
+    mcp.cmd_retries = 1
+    mcp.read_timeout = -1
+    mcp.hidhandler = hid
+    mcp._stats = stats.Stats()
+    mcp.packet_tracer = None
+    mcp._init_buffers()
+    mcp._lock = threading.RLock()
+    return mcp
+
+
+class Stats(unittest.TestCase):
+
+    def test_counters(self):
+        """Count commands, retries, rejected responses and failures."""
+        hid = FakeHID([0, 0, 1, 1, OSError("USB"), 0, OSError("USB"), OSError("USB")])
+        mcp = fake_device(hid)
+
+        mcp.send_cmd([CMD_I2C_READ_DATA_GET_I2C_DATA])
+        mcp.send_cmd([CMD_I2C_READ_DATA_GET_I2C_DATA])
+
+        # Not OK, retried once
+        mcp.send_cmd([CMD_POLL_STATUS_SET_PARAMETERS, 0, 0x10])
+
+        # USB error, retried once
+        mcp.send_cmd([CMD_GET_GPIO_VALUES])
+
+        with self.assertRaises(OSError):
+            mcp.send_cmd([CMD_GET_GPIO_VALUES])
+
+        s = mcp.stats()
+
+        self.assertEqual(s["CMD_I2C_READ_DATA_GET_I2C_DATA"]["count"], 2)
+        self.assertEqual(s["CMD_I2C_READ_DATA_GET_I2C_DATA"]["bytes_out"], 0)
+        self.assertEqual(s["CMD_I2C_READ_DATA_GET_I2C_DATA"]["bytes_in"], 0)
+
+        self.assertEqual(s["CMD_POLL_STATUS_SET_PARAMETERS"]["retries"], 1)
+        self.assertEqual(s["CMD_POLL_STATUS_SET_PARAMETERS"]["rejected"], 1)
+
+        self.assertEqual(s["CMD_GET_GPIO_VALUES"]["count"], 2)
+        self.assertEqual(s["CMD_GET_GPIO_VALUES"]["retries"], 2)
+        self.assertEqual(s["CMD_GET_GPIO_VALUES"]["failures"], 1)
+
+        self.assertEqual(
+            set(s["CMD_GET_GPIO_VALUES"]["latency_us"]),
+            {"min", "mean", "p50", "p90", "p99", "max"})
+
+        mcp.stats_reset()
+        self.assertEqual(mcp.stats(), {})
+
+
+    def test_i2c_bytes(self):
+        """Count I2C data, not USB packets."""
+        EasyMCP2221.Device._catalog = {}
+        emu = Emulator()
+        emu.chips[0].attach(EEPROM(0x50, write_time = 0))
+        mcp = EasyMCP2221.Device(transport = emu, collect_stats = True)
+        mcp.stats_reset()
+
+        mcp.I2C_write(0x50, b"\x00\x00" + bytes(100))
+        mcp.I2C_write(0x50, b"\x00\x00", "nonstop")
+        mcp.I2C_read(0x50, 100, "restart")
+
+        s = mcp.stats()
+        EasyMCP2221.Device._catalog = {}
+
+        self.assertEqual(s["CMD_I2C_WRITE_DATA"]["bytes_out"], 102)
+        self.assertEqual(s["CMD_I2C_WRITE_DATA_NO_STOP"]["bytes_out"], 2)
+        self.assertEqual(s["CMD_I2C_READ_DATA_GET_I2C_DATA"]["bytes_in"], 100)
+        self.assertEqual(s["CMD_POLL_STATUS_SET_PARAMETERS"]["bytes_in"], 0)
+
+
+    def test_disabled(self):
+        """Statistics not enabled."""
+        mcp = fake_device(FakeHID())
+        mcp._stats = None
+
+        mcp.send_cmd([CMD_GET_GPIO_VALUES])
+
+        with self.assertRaises(RuntimeError):
+            mcp.stats()
+
+
+    def test_histogram(self):
+        """Percentiles within 6.25% of the real value."""
+        h = stats.Histogram()
+
+        for v in range(1, 10001):
+            h.record(v)
+
+        self.assertEqual(h.min, 1)
+        self.assertEqual(h.max, 10000)
+
+        for p in (50, 90, 99):
+            self.assertAlmostEqual(h.percentile(p), p * 100, delta = p * 100 * 0.0625)
+
+        for v in range(1, 5000):
+            self.assertLessEqual(h._lowest(h._index(v)), v)
+            self.assertGreater(h._lowest(h._index(v) + 1), v)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import unittest
+
+import EasyMCP2221
+from EasyMCP2221 import tracer
+from EasyMCP2221.emulator import Emulator, EEPROM
+from EasyMCP2221.Constants import *
+
+
+class Tracer(unittest.TestCase):
+    """Packet tracer on an emulated device."""
+
+    def setUp(self):
+        EasyMCP2221.Device._catalog = {}
+        self.emu = Emulator()
+        self.emu.chips[0].attach(EEPROM(0x50, write_time = 0))
+        self.tracer = tracer.PacketTracer(capacity = 4)
+        self.mcp = EasyMCP2221.Device(transport = self.emu, packet_tracer = self.tracer)
+        self.tracer.clear()
+
+
+    def tearDown(self):
+        EasyMCP2221.Device._catalog = {}
+
+
+    def test_ring(self):
+        """Keep only the last packets."""
+        for i in range(6):
+            self.mcp.GPIO_read()
+
+        self.assertEqual(len(self.tracer), 4)
+        self.assertEqual(self.tracer.total, 6)
+
+        records = self.tracer.records()
+        self.assertEqual(len(records), 4)
+
+        for t_cmd, cmd, t_res, res in records:
+            self.assertLessEqual(t_cmd, t_res)
+            self.assertEqual(cmd, bytes([CMD_GET_GPIO_VALUES]) + bytes(PACKET_SIZE - 1))
+            self.assertEqual(res[0], CMD_GET_GPIO_VALUES)
+            self.assertEqual(len(res), PACKET_SIZE)
+
+        self.tracer.clear()
+        self.assertEqual(self.tracer.records(), [])
+
+
+    def test_i2c(self):
+        """Record the packets of a real I2C transaction."""
+        self.mcp.I2C_write(0x50, b"\x00\x00\x55")
+
+        records = self.tracer.records()
+        commands = [cmd[0] for t_cmd, cmd, t_res, res in records]
+
+        self.assertIn(CMD_I2C_WRITE_DATA, commands)
+        self.assertEqual(commands[-1], CMD_POLL_STATUS_SET_PARAMETERS)
+
+        t_cmd, cmd, t_res, res = records[commands.index(CMD_I2C_WRITE_DATA)]
+        self.assertEqual(cmd[0:7], bytes([CMD_I2C_WRITE_DATA, 3, 0, 0xa0, 0, 0, 0x55]))
+        self.assertEqual(res[RESPONSE_STATUS_BYTE], RESPONSE_RESULT_OK)
+
+
+    def test_dump_decode(self):
+        """Dump to a file, load and decode."""
+        self.mcp.I2C_write(0x50, b"\x00\x00\x55")
+
+        f = io.BytesIO()
+        self.tracer.dump(f)
+        f.seek(0)
+
+        records = tracer.load(f)
+        self.assertEqual(records, self.tracer.records())
+
+        text = "\n".join(tracer.decode(records))
+        self.assertIn("CMD_I2C_WRITE_DATA", text)
+        self.assertIn("CMD_POLL_STATUS_SET_PARAMETERS", text)
+        self.assertIn("CMD: 90 03 00 a0 00 00 55", text)
+
+
+    def test_bad_file(self):
+        """Reject unknown files."""
+        with self.assertRaises(ValueError):
+            tracer.load(io.BytesIO(b"\x00" * tracer.HEADER.size))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import unittest
+
+import EasyMCP2221
+from EasyMCP2221 import transport
+from EasyMCP2221.emulator import Emulator, EEPROM
+from EasyMCP2221.Constants import *
+
+
+class Transport(unittest.TestCase):
+    """Record a session on the emulator and replay it without it."""
+
+    def setUp(self):
+        EasyMCP2221.Device._catalog = {}
+
+
+    def tearDown(self):
+        EasyMCP2221.Device._catalog = {}
+
+
+    def session(self, mcp):
+        """Same calls for recording and replaying."""
+        mcp.set_pin_function(gp0 = "GPIO_OUT", out0 = 1)
+        gpio = mcp.GPIO_read()
+        mcp.I2C_write(0x50, b"\x00\x00\x12\x34")
+        mcp.I2C_write(0x50, b"\x00\x00")
+        data = mcp.I2C_read(0x50, 2)
+        return gpio, data
+
+
+    def record(self, unplug = False):
+        """Record a session, return the file contents and the results."""
+        emu = Emulator()
+        emu.chips[0].attach(EEPROM(0x50, write_time = 0))
+
+        f = io.StringIO()
+        rec = transport.Recorder(f, transport = emu)
+        mcp = EasyMCP2221.Device(transport = rec)
+        results = self.session(mcp)
+
+        if unplug:
+            emu.chips[0].unplug()
+            with self.assertRaises(OSError):
+                mcp.GPIO_read()
+
+        EasyMCP2221.Device._catalog = {}
+        return f.getvalue(), results
+
+
+    def test_replay(self):
+        """Replay the same responses through a Device."""
+        text, results = self.record()
+        self.assertEqual(results[1], b"\x12\x34")
+
+        mcp = EasyMCP2221.Device(transport = transport.Replayer(io.StringIO(text)))
+        self.assertEqual(self.session(mcp), results)
+
+        with self.assertRaises(transport.ReplayError):
+            mcp.GPIO_read()
+
+
+    def test_replay_errors(self):
+        """Recorded USB errors are raised again."""
+        text, results = self.record(unplug = True)
+
+        mcp = EasyMCP2221.Device(transport = transport.Replayer(io.StringIO(text)))
+        self.assertEqual(self.session(mcp), results)
+
+        with self.assertRaises(OSError):
+            mcp.GPIO_read()
+
+
+    def test_mismatch(self):
+        """Different commands than recorded."""
+        text, results = self.record()
+
+        mcp = EasyMCP2221.Device(transport = transport.Replayer(io.StringIO(text)))
+        mcp.set_pin_function(gp0 = "GPIO_OUT", out0 = 1)
+        with self.assertRaises(transport.ReplayError):
+            mcp.ADC_read()
+
+        EasyMCP2221.Device._catalog = {}
+        mcp = EasyMCP2221.Device(transport = transport.Replayer(io.StringIO(text), strict = False))
+        mcp.set_pin_function(gp0 = "GPIO_OUT", out0 = 0)
+        self.assertEqual(mcp.GPIO_read(), results[0])
+
+
+if __name__ == '__main__':
+    unittest.main()